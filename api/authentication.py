@@ -1,30 +1,308 @@
+"""JWT authentication with an access-token blacklist.
+
+Logging out blacklists the access token's `jti` until the token would have
+expired anyway. The authoritative record is the cache key
+`jwt_access_blacklist_<jti>`. Checking it costs a Redis round trip on every
+authenticated request, though almost no token is ever blacklisted.
+
+With the Redis cache backend, each worker therefore keeps `access_blacklist`,
+an in-memory mirror of every live blacklisted jti:
+
+- logout also ZADDs the jti (scored by expiry) to `jwt_access_blacklist` and
+  PUBLISHes it on the `jwt_access_blacklist` channel;
+- a daemon thread per worker subscribes to that channel, loads the sorted
+  set on (re)subscribe and re-reads it every `RESYNC_SECONDS` as a safety net;
+- while the mirror is in sync, a request is checked against it without
+  touching Redis. Until it is (worker startup, lost connection) every request
+  falls back to the per-token cache key, so logout is never missed.
+
+`StatelessJWTAuthentication` also drops the per-request `users` SELECT:
+`request.user` is a `ClaimsUser`, a lazy proxy that answers `id` / `pk` /
+`is_authenticated` from the token's claims and only loads the User on first
+access to anything else (a profile field, an FK assignment, an `isinstance`
+check). That load goes through `get_cached_user`, a short-TTL cache of the
+User row, without its password hash, dropped whenever the user is saved or
+deleted (api/signals.py)."""
+
+import logging
+import os
+import threading
+import time
+
 from drf_spectacular.extensions import OpenApiAuthenticationExtension
-from django.core.cache import cache
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ValidationError
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .instrumentation import record_cache
 
 
+logger = logging.getLogger(__name__)
+
 ACCESS_BLACKLIST_KEY_PREFIX = 'jwt_access_blacklist_'
+ACCESS_BLACKLIST_SET = 'jwt_access_blacklist'
+ACCESS_BLACKLIST_CHANNEL = 'jwt_access_blacklist'
+USER_CACHE_KEY_PREFIX = 'auth_user_row_'  # rows, not pickled Users
 
 
 def access_blacklist_key(jti: str) -> str:
     return f'{ACCESS_BLACKLIST_KEY_PREFIX}{jti}'
 
 
+class AccessBlacklistMirror:
+    """Per-process copy of the live access-token blacklist."""
+
+    RESYNC_SECONDS = 60
+    RECONNECT_SECONDS = 1
+
+    def __init__(self):
+        self._entries = {}  # jti -> exp (unix time)
+        self._lock = threading.Lock()
+        self._in_sync = threading.Event()
+        self._pid = None
+
+    @property
+    def ready(self):
+        return self._in_sync.is_set()
+
+    def add(self, jti, exp):
+        with self._lock:
+            self._entries[jti] = float(exp)
+
+    def replace(self, entries):
+        with self._lock:
+            self._entries = {jti: float(exp) for jti, exp in entries}
+
+    def __contains__(self, jti):
+        exp = self._entries.get(jti)
+        if exp is None:
+            return False
+        if exp <= time.time():
+            with self._lock:
+                self._entries.pop(jti, None)
+            return False
+        return True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def reset(self):
+        self._in_sync.clear()
+        self.replace([])
+
+    def ensure_syncing(self):
+        """Start the sync thread in this process if the cache is Redis.
+        Re-checked per call so a forked gunicorn worker starts its own."""
+        if self._pid == os.getpid():
+            return
+        backend = caches['default']
+        if not isinstance(backend, RedisCache):
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._in_sync.clear()
+            threading.Thread(
+                target=self._sync_forever, args=(backend,),
+                name='jwt-blacklist-sync', daemon=True,
+            ).start()
+
+    def _load(self, client, set_key):
+        now = time.time()
+        client.zremrangebyscore(set_key, '-inf', now)
+        rows = client.zrangebyscore(set_key, now, '+inf', withscores=True)
+        self.replace((jti.decode() if isinstance(jti, bytes) else jti, exp) for jti, exp in rows)
+
+    def handle_message(self, data):
+        """Apply one `"<jti> <exp>"` pub/sub payload."""
+        if isinstance(data, bytes):
+            data = data.decode()
+        jti, _, exp = data.partition(' ')
+        if jti and exp:
+            self.add(jti, exp)
+
+    def _sync_forever(self, backend):
+        set_key = backend.make_and_validate_key(ACCESS_BLACKLIST_SET)
+        while True:
+            pubsub = None
+            try:
+                client = backend._cache.get_client(write=True)
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(ACCESS_BLACKLIST_CHANNEL)
+                # Subscribe first, then load, so nothing published in
+                # between is missed.
+                self._load(client, set_key)
+                self._in_sync.set()
+                synced_at = time.monotonic()
+                while True:
+                    message = pubsub.get_message(timeout=5.0)
+                    if message and message['type'] == 'message':
+                        self.handle_message(message['data'])
+                    if time.monotonic() - synced_at > self.RESYNC_SECONDS:
+                        pubsub.ping()
+                        self._load(client, set_key)
+                        synced_at = time.monotonic()
+            except Exception:
+                self._in_sync.clear()
+                logger.warning('Access blacklist sync lost; falling back to per-request checks', exc_info=True)
+                time.sleep(self.RECONNECT_SECONDS)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+
+access_blacklist = AccessBlacklistMirror()
+
+
+def blacklist_access_token(jti, exp):
+    """Blacklist an access token until its `exp`, in every worker."""
+    ttl = int(exp - time.time())
+    if ttl <= 0:
+        return
+    cache.set(access_blacklist_key(jti), '1', timeout=ttl)
+    access_blacklist.add(jti, exp)
+
+    backend = caches['default']
+    if isinstance(backend, RedisCache):
+        set_key = backend.make_and_validate_key(ACCESS_BLACKLIST_SET)
+        pipe = backend._cache.get_client(write=True).pipeline()
+        pipe.zadd(set_key, {jti: exp})
+        pipe.zremrangebyscore(set_key, '-inf', time.time())
+        # Longest any entry can live; refreshed by each logout.
+        pipe.expire(set_key, int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()))
+        pipe.publish(ACCESS_BLACKLIST_CHANNEL, f'{jti} {exp}')
+        pipe.execute()
+
+
+def is_access_token_blacklisted(jti):
+    access_blacklist.ensure_syncing()
+    if access_blacklist.ready:
+        return jti in access_blacklist
+    return bool(cache.get(access_blacklist_key(jti)))
+
+
 class BlacklistAwareJWTAuthentication(JWTAuthentication):
     def get_validated_token(self, raw_token):
         validated_token = super().get_validated_token(raw_token)
         jti = validated_token.get('jti')
-        if jti and cache.get(access_blacklist_key(jti)):
+        if jti and is_access_token_blacklisted(jti):
             raise InvalidToken('Access token has been logged out.')
         return validated_token
 
 
+def user_cache_key(user_id) -> str:
+    return f'{USER_CACHE_KEY_PREFIX}{user_id}'
+
+
+# Never cached: anything that checks or sets the password reads the user
+# from the database.
+_UNCACHED_USER_FIELDS = {'password'}
+
+
+def get_cached_user(user_id):
+    """The User with primary key `user_id`, from the cache when possible.
+    Raises AuthenticationFailed if the account no longer exists.
+
+    The cache holds the row's columns minus the password hash, and the User
+    is rebuilt with `password` deferred: reading it queries the database,
+    and saving the instance leaves the stored hash alone."""
+    User = get_user_model()
+    key = user_cache_key(user_id)
+    row = cache.get(key)
+    record_cache('user', row is not None)
+    if row is None:
+        fields = [f.attname for f in User._meta.concrete_fields if f.attname not in _UNCACHED_USER_FIELDS]
+        row = User.objects.filter(pk=user_id).values(*fields).first()
+        if row is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        cache.set(key, row, timeout=getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+    return User.from_db(User.objects.db, list(row), list(row.values()))
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class ClaimsUser(SimpleLazyObject):
+    """`request.user` for `StatelessJWTAuthentication`. Attributes defined
+    here come from the token; anything else is read from the real User,
+    loaded (via `get_cached_user`) the first time it is needed."""
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, user_id):
+        # LazyObject forwards attribute writes to the wrapped object, so the
+        # claim goes straight into __dict__ as SimpleLazyObject does.
+        self.__dict__['_user_id'] = user_id
+        super().__init__(lambda: get_cached_user(user_id))
+
+    @property
+    def id(self):
+        return self._user_id
+
+    pk = id
+
+    @property
+    def is_loaded(self):
+        return self._wrapped is not empty
+
+    def __bool__(self):
+        # `request.user and request.user.is_authenticated` must not load it.
+        return True
+
+    def __eq__(self, other):
+        if isinstance(other, ClaimsUser):
+            return self._user_id == other._user_id
+        if isinstance(other, get_user_model()):
+            return self._user_id == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._user_id)
+
+    def __repr__(self):
+        return f'<ClaimsUser {self._user_id}>'
+
+    def __copy__(self):
+        return ClaimsUser(self._user_id)
+
+    def __deepcopy__(self, memo):
+        return ClaimsUser(self._user_id)
+
+
+class StatelessJWTAuthentication(BlacklistAwareJWTAuthentication):
+    """Blacklist-aware JWT auth whose `request.user` is a `ClaimsUser`:
+    authenticating a request costs no database query."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        try:
+            user_id = get_user_model()._meta.pk.to_python(user_id)
+        except ValidationError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        return ClaimsUser(user_id)
+
 
 class BlacklistAwareJWTScheme(OpenApiAuthenticationExtension):
     target_class = 'api.authentication.BlacklistAwareJWTAuthentication'
     name = 'jwtAuth'
-    match_subclasses = False
+    match_subclasses = True
     priority = 1
 
     def get_security_definition(self, auto_schema):
@@ -32,4 +310,4 @@ class BlacklistAwareJWTScheme(OpenApiAuthenticationExtension):
             'type': 'http',
             'scheme': 'bearer',
             'bearerFormat': 'JWT',
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,123 @@
+"""Per-request query, row and time measurement against committed budgets.
+
+`measure()` wraps one request (or any block) and records:
+
+- `queries`: statements sent to the database, counted by a
+  `connection.execute_wrapper`, so it works with DEBUG off;
+- `rows`: rows the ORM actually fetched from those statements — the cost an
+  unbounded prefetch or a missing LIMIT shows up in long before the query
+  count does;
+- `ms`: wall time of the block.
+
+`api/budgets.json` holds one budget per endpoint and method, checked by
+api/tests_budgets.py at two data volumes: a query count that must be the
+same at both, and row and time limits per volume, so rows that grow at the
+small volume aren't hidden under the large volume's limit. Regenerate it
+after an intended change with
+`RECORD_BUDGETS=1 python manage.py test api.tests_budgets`."""
+
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+BUDGET_FILE = Path(__file__).with_name('budgets.json')
+
+# Headroom recorded on top of the measured wall time; query and row budgets
+# are exact.
+TIME_HEADROOM = 4
+MIN_TIME_BUDGET_MS = 250
+
+
+class Measurement:
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.ms = 0.0
+        self.statements = []
+
+    def as_budget(self):
+        ms = max(MIN_TIME_BUDGET_MS, math.ceil(self.ms * TIME_HEADROOM / 50) * 50)
+        return {'queries': self.queries, 'rows': self.rows, 'ms': ms}
+
+    def over(self, budget, scale, time_factor=1.0):
+        """The budget lines this measurement exceeds at the data volume
+        called `scale`, as messages."""
+        problems = []
+        limits = budget[scale]
+        if self.queries > budget['queries']:
+            problems.append(f"{self.queries} queries > {budget['queries']}")
+        if self.rows > limits['rows']:
+            problems.append(f"{self.rows} rows > {limits['rows']}")
+        if self.ms > limits['ms'] * time_factor:
+            problems.append(f"{self.ms:.0f} ms > {limits['ms'] * time_factor:.0f} ms")
+        return problems
+
+
+class _Recorder:
+    """`execute_wrapper` that counts statements and, by wrapping the
+    cursor's fetch methods, the rows read back from them."""
+
+    def __init__(self, measurement):
+        self.measurement = measurement
+
+    def __call__(self, execute, sql, params, many, context):
+        self.measurement.queries += 1
+        self.measurement.statements.append(sql)
+        cursor = context['cursor']
+        if 'fetchmany' not in vars(cursor):
+            self._count_fetches(cursor)
+        return execute(sql, params, many, context)
+
+    def _count_fetches(self, cursor):
+        measurement = self.measurement
+        fetchone, fetchmany, fetchall = cursor.fetchone, cursor.fetchmany, cursor.fetchall
+
+        def counted_fetchone():
+            row = fetchone()
+            if row is not None:
+                measurement.rows += 1
+            return row
+
+        def counted_fetchmany(*args, **kwargs):
+            rows = fetchmany(*args, **kwargs)
+            measurement.rows += len(rows)
+            return rows
+
+        def counted_fetchall():
+            rows = fetchall()
+            measurement.rows += len(rows)
+            return rows
+
+        cursor.fetchone, cursor.fetchmany, cursor.fetchall = counted_fetchone, counted_fetchmany, counted_fetchall
+
+
+@contextmanager
+def measure(using=DEFAULT_DB_ALIAS):
+    """Measure the block; yields a Measurement filled in on exit."""
+    measurement = Measurement()
+    start = time.perf_counter()
+    with connections[using].execute_wrapper(_Recorder(measurement)):
+        yield measurement
+    measurement.ms = (time.perf_counter() - start) * 1e3
+
+
+def load_budgets(path=BUDGET_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_budgets(budgets, path=BUDGET_FILE):
+    with open(path, 'w') as f:
+        json.dump(dict(sorted(budgets.items())), f, indent=2)
+        f.write('\n')
+
+
+def time_factor():
+    """Multiplier for time budgets on slow machines (`BUDGET_TIME_FACTOR`)."""
+    return float(os.environ.get('BUDGET_TIME_FACTOR', '1'))
@@ -0,0 +1,115 @@
+"""Read-through cache of the specialization catalogue.
+
+The catalogue is tiny and only changes when `seed_specializations` runs or
+an admin edits it, yet it is read on every specialization list request and
+every question/post write (to validate spec IDs). It is cached at two levels:
+
+- the shared cache (Redis in production) holds the serialized catalogue under
+  a key that embeds a version token, plus the current version token itself;
+- each process keeps the last entry it loaded, and reuses it for as long as
+  the shared version token still matches.
+
+`invalidate_catalogue` swaps in a fresh version token, so every process
+rebuilds (once) on its next read. It runs from Specialization save/delete
+signals and at the end of `seed_specializations`."""
+
+import hashlib
+import json
+import uuid
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .instrumentation import record_cache
+from .models import Specialization
+
+
+CATALOGUE_VERSION_KEY = 'specialization_catalogue_version'
+CATALOGUE_KEY_PREFIX = 'specialization_catalogue_'
+CATALOGUE_TIMEOUT = 60 * 60 * 24
+
+_FIELDS = ('id', 'name', 'description')
+
+
+class Catalogue(NamedTuple):
+    version: str
+    etag: str
+    results: list
+    by_id: dict
+
+    def _row(self, pk):
+        try:
+            return self.by_id.get(uuid.UUID(str(pk)))
+        except (TypeError, ValueError, AttributeError):
+            return None
+
+    def get(self, pk):
+        """Return the Specialization with primary key `pk`, built from the
+        cached row without a query, or None if it isn't in the catalogue."""
+        row = self._row(pk)
+        if row is None:
+            return None
+        return Specialization.from_db(
+            DEFAULT_DB_ALIAS, list(_FIELDS), [row[f] for f in _FIELDS],
+        )
+
+    def __contains__(self, pk):
+        return self._row(pk) is not None
+
+
+_local = None
+
+
+def _current_version():
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        # First reader after a cold start or cache flush. `add` makes racing
+        # processes agree on one token.
+        cache.add(CATALOGUE_VERSION_KEY, uuid.uuid4().hex, timeout=CATALOGUE_TIMEOUT)
+        version = cache.get(CATALOGUE_VERSION_KEY)
+    return version
+
+
+def _load_results():
+    from .serializers import SpecializationSerializer
+
+    data = SpecializationSerializer(Specialization.objects.all(), many=True).data
+    return [dict(row) for row in data]
+
+
+def _build(version, results):
+    etag = '"%s"' % hashlib.sha1(
+        json.dumps(results, sort_keys=True).encode(),
+    ).hexdigest()
+    by_id = {
+        uuid.UUID(row['id']): {**row, 'id': uuid.UUID(row['id'])}
+        for row in results
+    }
+    return Catalogue(version=version, etag=etag, results=results, by_id=by_id)
+
+
+def get_catalogue():
+    """Return the current Catalogue: from this process if its version is
+    still current, else from the shared cache, else from the database."""
+    global _local
+    version = _current_version()
+    if _local is not None and _local.version == version:
+        record_cache('catalogue', True)
+        return _local
+
+    key = f'{CATALOGUE_KEY_PREFIX}{version}'
+    results = cache.get(key)
+    record_cache('catalogue', results is not None)
+    if results is None:
+        results = _load_results()
+        cache.set(key, results, timeout=CATALOGUE_TIMEOUT)
+    _local = _build(version, results)
+    return _local
+
+
+def invalidate_catalogue():
+    """Retire the current catalogue in every process."""
+    global _local
+    cache.set(CATALOGUE_VERSION_KEY, uuid.uuid4().hex, timeout=CATALOGUE_TIMEOUT)
+    _local = None
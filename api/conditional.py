@@ -0,0 +1,166 @@
+"""Conditional GET for the question, post, answer and comment detail pages.
+
+Clients re-poll open threads, and most polls find nothing new. Each detail
+endpoint has a validator: one query over the row's `updated_at` and counter
+columns, its author's `updated_at` (and its specializations', whose names
+questions and posts embed), and the latest `updated_at` and count of the
+children and attachments it renders. Each child aggregate is its own
+correlated scalar subquery, so a thread with hundreds of answers costs a few
+index lookups rather than a GROUP BY over every answer × attachment ×
+specialization combination. It changes whenever
+the rendered body can change, so a matching `If-None-Match` gets an empty 304
+before the detail queryset, prefetches and serializer run.
+
+The validator becomes the response's `ETag`; `Last-Modified` is the newest
+of its timestamps. Only `If-None-Match` is honoured: deleting a child or an
+attachment changes the ETag but moves no timestamp forward.
+
+Question and post details also go through the response cache
+(api/response_cache.py), which stores the validator with the body."""
+
+from typing import NamedTuple
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, IntegerField, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Answer, Attachment, Comment, Post, PostReaction, Question, Specialization
+from .response_cache import _etag, _not_modified, personalized_etag, response_headers
+
+
+class Validator(NamedTuple):
+    etag: str
+    last_modified: object  # datetime, or None
+    # Viewer-specific part, in the shape the view's `personalize` hook
+    # reports it (see cached_read); empty when there is none.
+    extra: dict
+
+
+def _child(model, group_by, aggregate, *conditions, **filters):
+    """Correlated `(SELECT <aggregate> FROM model WHERE ...)` for the outer
+    row. The filters pin `group_by` to one value, so it is one scalar and the
+    outer query never joins, and fans out over, the children."""
+    return Subquery(
+        model.objects
+        .filter(*conditions, **filters)
+        .order_by()
+        .values(group_by)
+        .annotate(value=aggregate)
+        .values('value')
+    )
+
+
+def _child_max(model, group_by, field, **filters):
+    return _child(model, group_by, Max(field), **filters)
+
+
+def _child_count(model, group_by, *conditions, **filters):
+    return Coalesce(_child(model, group_by, Count('pk'), *conditions, **filters), 0, output_field=IntegerField())
+
+
+def _attachment_counts(owner, prefix='attachments', **filters):
+    # Attachments show up in the body with their thumbnails, so both the
+    # number of attachments and how many have thumbnails so far count.
+    filters['content_type'] = ContentType.objects.get_for_model(owner)
+    return {
+        f'{prefix}_count': _child_count(Attachment, 'content_type', **filters),
+        f'{prefix}_ready': _child_count(Attachment, 'content_type', ~Q(variants={}), **filters),
+    }
+
+
+def _validator(queryset, pk, fields, extra=None, **aggregates):
+    rows = queryset.filter(pk=pk).order_by().annotate(**aggregates).values(*fields, *aggregates)
+    row = next(iter(rows), None)
+    if row is None:
+        return None
+    viewer = {key: row.pop(key) for key in (extra or ())}
+    stamps = [value for key, value in row.items() if key.endswith('updated_at') and value]
+    return Validator(
+        etag=_etag(queryset.model._meta.model_name, row),
+        last_modified=max(stamps) if stamps else None,
+        extra=viewer,
+    )
+
+
+def question_validator(request, pk):
+    """Question detail: the question, its answers and replies (all of them
+    count towards `answers_count`) and everyone's attachments."""
+    return _validator(
+        Question.objects, pk,
+        ['updated_at', 'answers_count', 'author__updated_at'],
+        answers_updated_at=_child_max(Answer, 'question', 'updated_at', question=OuterRef('pk')),
+        answer_authors_updated_at=_child_max(Answer, 'question', 'author__updated_at', question=OuterRef('pk')),
+        specializations_updated_at=_child_max(
+            Specialization, 'questions', 'updated_at', questions=OuterRef('pk'),
+        ),
+        **_attachment_counts(Question, object_id=OuterRef('pk')),
+        **_attachment_counts(
+            Answer, 'answers__attachments',
+            object_id__in=Answer.objects.filter(question=OuterRef(OuterRef('pk'))).values('pk'),
+        ),
+    )
+
+
+def post_validator(request, pk):
+    """Post detail: the post, its counters, comments and attachments, plus
+    the viewer's own reaction as `extra` (see _merge_my_reactions)."""
+    fields = ['updated_at', 'likes_count', 'dislikes_count', 'comments_count', 'author__updated_at']
+    aggregates = {
+        'comments_updated_at': _child_max(Comment, 'post', 'updated_at', post=OuterRef('pk')),
+        'comment_authors_updated_at': _child_max(Comment, 'post', 'author__updated_at', post=OuterRef('pk')),
+        'specializations_updated_at': _child_max(Specialization, 'posts', 'updated_at', posts=OuterRef('pk')),
+        **_attachment_counts(Post, object_id=OuterRef('pk')),
+    }
+    extra = ()
+    if request.user.is_authenticated:
+        fields.append('my_reaction')
+        extra = ('my_reaction',)
+        queryset = Post.objects.annotate(my_reaction=Subquery(
+            PostReaction.objects
+            .filter(post=OuterRef('pk'), user_id=request.user.pk)
+            .values('reaction')[:1]
+        ))
+    else:
+        queryset = Post.objects
+    validator = _validator(queryset, pk, fields, extra=extra, **aggregates)
+    if validator is not None and extra:
+        reaction = validator.extra['my_reaction']
+        validator = validator._replace(extra={str(pk): reaction} if reaction else {})
+    return validator
+
+
+def answer_validator(request, pk):
+    """Answer (or reply) detail: the answer, its reply count and attachments."""
+    return _validator(
+        Answer.objects, pk,
+        ['updated_at', 'author__updated_at'],
+        replies_count=_child_count(Answer, 'parent_answer', parent_answer=OuterRef('pk')),
+        **_attachment_counts(Answer, object_id=OuterRef('pk')),
+    )
+
+
+def comment_validator(request, pk):
+    """Comment (or reply) detail: the comment and its reply count."""
+    return _validator(
+        Comment.objects, pk,
+        ['updated_at', 'author__updated_at'],
+        replies_count=_child_count(Comment, 'parent_comment', parent_comment=OuterRef('pk')),
+    )
+
+
+def conditional_read(request, validator, render):
+    """Serve a GET whose body `render()` produces, answering a matching
+    `If-None-Match` with a 304 without rendering."""
+    current = validator(request)
+    if current is None:
+        return render()  # gone: let the view produce its 404
+    headers = response_headers(request, personalized_etag(current.etag, current.extra), current.last_modified)
+    if _not_modified(request, headers['ETag']):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response = render()
+    if response.status_code == status.HTTP_200_OK:
+        for header, value in headers.items():
+            response[header] = value
+    return response
@@ -0,0 +1,83 @@
+"""Denormalized counter columns on Question and Post.
+
+`Question.answers_count` and `Post.likes_count` / `dislikes_count` /
+`comments_count` are stored on the row so feed reads don't need to join and
+GROUP BY the child tables. The write paths (answer/comment create + delete,
+the like/dislike toggle) call `adjust_counters` inside the same transaction
+as the child-row change. `reconcile_counters` recomputes the true values and
+fixes any row that drifted (e.g. after a user was deleted from the admin and
+their answers/reactions cascaded away)."""
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Question, Answer, Post, PostReaction, Comment
+
+
+def adjust_counters(model, pk, **deltas):
+    """Add each delta to the named counter column on one row, in one UPDATE.
+
+    Uses F() expressions so concurrent writers never lose an increment, and
+    clamps at zero so a drifted counter can't violate the unsigned column."""
+    updates = {
+        field: Greatest(F(field) + delta, Value(0))
+        for field, delta in deltas.items()
+        if delta
+    }
+    if updates:
+        model.objects.filter(pk=pk).update(**updates)
+
+
+def _child_count(model, fk, **filters):
+    """Correlated `(SELECT COUNT(*) ...)` of `model` rows pointing at the outer row."""
+    return Coalesce(
+        Subquery(
+            model.objects
+            .filter(**{fk: OuterRef('pk')}, **filters)
+            .order_by()
+            .values(fk)
+            .annotate(n=Count('pk'))
+            .values('n'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def counter_expressions():
+    """Map of model → {counter field: expression computing its true value}."""
+    return {
+        Question: {
+            'answers_count': _child_count(Answer, 'question'),
+        },
+        Post: {
+            'likes_count': _child_count(PostReaction, 'post', reaction='like'),
+            'dislikes_count': _child_count(PostReaction, 'post', reaction='dislike'),
+            'comments_count': _child_count(Comment, 'post'),
+        },
+    }
+
+
+def reconcile_counters(dry_run=False):
+    """Recompute every counter and rewrite only the rows that drifted.
+
+    Returns a dict of `{model label: number of drifted rows}`."""
+    drifted = {}
+    for model, expressions in counter_expressions().items():
+        actual = {f'actual_{field}': expr for field, expr in expressions.items()}
+        rows = (
+            model.objects
+            .order_by()
+            .annotate(**actual)
+            .values('pk', *expressions.keys(), *actual.keys())
+        )
+        fixes = []
+        for row in rows.iterator():
+            if any(row[field] != row[f'actual_{field}'] for field in expressions):
+                fixes.append(model(pk=row['pk'], **{
+                    field: row[f'actual_{field}'] for field in expressions
+                }))
+        if fixes and not dry_run:
+            model.objects.bulk_update(fixes, list(expressions.keys()), batch_size=500)
+        drifted[model._meta.label] = len(fixes)
+    return drifted
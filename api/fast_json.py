@@ -0,0 +1,80 @@
+"""JSON renderer and parser backed by orjson, with the stdlib as fallback.
+
+DRF's `JSONRenderer` runs `json.dumps` with a Python-level `default()` hook
+for every UUID, datetime and Decimal, and feed pages are full of them (ids,
+authors, specializations, attachments, timestamps). orjson encodes in C and
+writes UUIDs natively; `FastJSONRenderer` hands it everything else through
+DRF's own `JSONEncoder.default`, so the output means exactly what it did:
+
+- UUIDs render as `str(uuid)`;
+- datetimes, dates and times go through DRF's encoder (`isoformat()`, with
+  `+00:00` written as `Z`), not orjson's own formatting;
+- Decimals become floats, as DRF does. Floats are written in the shortest
+  form that round-trips, like the stdlib, except that exponents are spelled
+  `1e16` rather than `1e+16`. orjson writes NaN and infinities as `null`
+  where the stdlib would refuse them; the API has no float fields.
+
+Anything orjson refuses — integers beyond 64 bits, non-string dict keys —
+falls back to the stock renderer, which either handles it the old way or
+raises the old error. Indented output (browsable API, `; indent=4`) and
+`UNICODE_JSON = False` use the stock renderer too. Without orjson installed
+both classes behave exactly like DRF's."""
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# DRF escapes these so that the output is also valid JavaScript.
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+class FastJSONRenderer(JSONRenderer):
+    """`JSONRenderer` that encodes with orjson when it can."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for raw, escaped in _LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """`JSONParser` that decodes UTF-8 bodies with orjson."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        # orjson only reads UTF-8 and always rejects NaN and Infinity, as
+        # STRICT_JSON does.
+        if orjson is None or not self.strict or encoding.lower() not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
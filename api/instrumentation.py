@@ -0,0 +1,188 @@
+"""Per-request SQL, timing and cache instrumentation.
+
+`RequestInstrumentationMiddleware` measures a sampled share of requests
+(`INSTRUMENTATION_SAMPLE_RATE`, 0 to 1) and records, per request:
+
+- `db`: statements sent and time spent waiting on the database, counted by
+  a `connection.execute_wrapper` on every configured connection;
+- `render`: time DRF's renderer takes to serialize `response.data` to bytes,
+  from the template-response hook to the post-render callback. Building
+  `response.data` (serializer `to_representation`) runs inside the view;
+- `app`: everything else — middleware, authentication, view and serializer
+  code;
+- `cache`: hits and misses of the read-through caches (response bodies,
+  users, the specialization catalogue, storage URLs), which report them
+  through `record_cache()`.
+
+The numbers go out as a `Server-Timing` header when
+`INSTRUMENTATION_SERVER_TIMING` is on (browsers show it in the network
+panel), and as one INFO record per sampled request on the `api.requests`
+logger, with every number as an `extra` attribute so a JSON formatter can
+emit them as fields.
+
+While `METRICS_ENABLED` is on every request is measured and fed to the
+metrics registry (api/metrics.py); sampling then only decides which
+requests are logged and get the header. With metrics off, an unsampled
+request costs one `random()` call.
+
+While slow-query capture is on (`SLOW_QUERY_THRESHOLD_MS` not negative),
+every request is timed as well, so statements over the threshold reach
+api/slow_queries.py with the route they ran for."""
+
+import logging
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, slow_queries
+
+
+logger = logging.getLogger('api.requests')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self, request=None):
+        self.request = request
+        self.queries = 0
+        self.db_ms = 0.0
+        self.render_ms = 0.0
+        self.total_ms = 0.0
+        self.cache = {}  # name -> [hits, misses]
+
+    @property
+    def app_ms(self):
+        return max(0.0, self.total_ms - self.db_ms - self.render_ms)
+
+    @property
+    def route(self):
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match else ''
+
+    @property
+    def cache_hits(self):
+        return sum(hits for hits, _ in self.cache.values())
+
+    @property
+    def cache_misses(self):
+        return sum(misses for _, misses in self.cache.values())
+
+    def server_timing(self):
+        entries = [
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f'render;dur={self.render_ms:.1f}',
+            f'app;dur={self.app_ms:.1f}',
+        ]
+        entries += [
+            f'cache-{name};desc="hits={hits} misses={misses}"'
+            for name, (hits, misses) in sorted(self.cache.items())
+        ]
+        entries.append(f'total;dur={self.total_ms:.1f}')
+        return ', '.join(entries)
+
+
+def current_metrics():
+    """The RequestMetrics of the request being measured, or None."""
+    return _current.get()
+
+
+def record_cache(name, hit):
+    """Count a hit or miss of the cache called `name` against the current
+    request; a no-op outside a sampled request."""
+    measured = _current.get()
+    if measured is not None:
+        counts = measured.cache.setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+
+
+class _QueryTimer:
+    def __init__(self, measured, slow_ms=None):
+        self.measured = measured
+        self.slow_ms = slow_ms
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            result = execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1e3
+            self.measured.queries += 1
+            self.measured.db_ms += elapsed_ms
+        if self.slow_ms is not None and elapsed_ms >= self.slow_ms:
+            slow_queries.capture(context['connection'], sql, params, many, elapsed_ms, self.measured.route)
+        return result
+
+
+def _sampled():
+    rate = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0.0)
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+class RequestInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sampled = _sampled()
+        collecting = metrics.enabled()
+        slow_ms = slow_queries.threshold_ms()
+        if not (sampled or collecting or slow_ms is not None):
+            return self.get_response(request)
+
+        measured = RequestMetrics(request)
+        token = _current.set(measured)
+        if collecting:
+            metrics.IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_QueryTimer(measured, slow_ms)))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+            if collecting:
+                metrics.IN_FLIGHT.dec()
+        measured.total_ms = (time.perf_counter() - start) * 1e3
+
+        if collecting:
+            metrics.observe_request(request, response, measured)
+        if not sampled:
+            return response
+        if getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', False):
+            response['Server-Timing'] = measured.server_timing()
+        logger.info(
+            '%s %s %s %.1fms, %d queries', request.method, request.path, response.status_code,
+            measured.total_ms, measured.queries,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'route': measured.route,
+                'status': response.status_code,
+                'duration_ms': round(measured.total_ms, 2),
+                'db_queries': measured.queries,
+                'db_ms': round(measured.db_ms, 2),
+                'render_ms': round(measured.render_ms, 2),
+                'app_ms': round(measured.app_ms, 2),
+                'cache_hits': measured.cache_hits,
+                'cache_misses': measured.cache_misses,
+            },
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        # Called just before the handler renders the response.
+        measured = _current.get()
+        if measured is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                measured.render_ms += (time.perf_counter() - started) * 1e3
+
+            response.add_post_render_callback(rendered)
+        return response
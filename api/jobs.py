@@ -0,0 +1,345 @@
+"""Background job queue.
+
+Slow side effects (outgoing email, image thumbnails) are pushed onto a queue
+instead of running inside the request. A job is just the dotted path of a
+function plus JSON-serializable keyword arguments:
+
+    enqueue('api.tasks.send_email', subject=..., message=..., recipient=...)
+
+Backends, picked by `settings.JOB_QUEUE['BACKEND']`:
+
+- `RedisJobQueue`: a Redis list (ready jobs), a sorted set (jobs waiting for a
+  retry, scored by due time) and a dead-letter list. Drained by one or more
+  `manage.py run_jobs` worker processes. A reserved job sits in the worker's
+  own processing list until it has run, so a worker that dies mid-job does
+  not lose it: the next `run_jobs` to start puts it back on the queue.
+- `InProcessJobQueue`: the same semantics in memory. A daemon thread in the
+  current process drains it, so local dev works without Redis or a worker;
+  tests build one with `autostart=False` and call `drain()` themselves.
+
+A job that raises is retried with exponential backoff
+(`backoff * 2 ** (attempt - 1)`, capped at `max_backoff`, plus jitter). After
+`max_attempts` failures it goes to the dead-letter list with its last error;
+`run_jobs --requeue-dead` puts those back on the queue. Dead letters expire
+`dead_letter_ttl` seconds after the last one was added, since they hold
+email bodies (OTPs included)."""
+
+import heapq
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+def _job_path(func):
+    if isinstance(func, str):
+        return func
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+class BaseJobQueue:
+    """Retry / dead-letter policy shared by every backend.
+
+    Subclasses store the jobs: `push`, `reserve`, `schedule`, `bury`,
+    `dead_letters`, `requeue_dead` and `__len__`, and may override `ack`
+    (a reserved job has finished), `recover` (requeue jobs reserved by
+    workers that died) and `stop`."""
+
+    def __init__(self, max_attempts=5, backoff=30, max_backoff=3600):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def enqueue(self, func, **kwargs):
+        job = {
+            'id': uuid.uuid4().hex,
+            'path': _job_path(func),
+            'kwargs': kwargs,
+            'attempts': 0,
+            'enqueued_at': time.time(),
+        }
+        self.push(json.dumps(job))
+        return job['id']
+
+    def retry_delay(self, attempts):
+        delay = min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+        return delay + random.uniform(0, delay / 10)
+
+    def run(self, raw):
+        """Execute one reserved job, rescheduling or burying it on failure.
+        Returns True if it succeeded."""
+        job = json.loads(raw)
+        try:
+            import_string(job['path'])(**job['kwargs'])
+        except Exception as exc:
+            job['attempts'] += 1
+            job['last_error'] = ''.join(
+                traceback.format_exception_only(type(exc), exc)
+            ).strip()
+            if job['attempts'] >= self.max_attempts:
+                logger.error(
+                    'Job %s (%s) failed %d times, moving to dead letters: %s',
+                    job['id'], job['path'], job['attempts'], job['last_error'],
+                )
+                job['failed_at'] = time.time()
+                self.bury(json.dumps(job))
+            else:
+                delay = self.retry_delay(job['attempts'])
+                logger.warning(
+                    'Job %s (%s) failed (attempt %d/%d), retrying in %.0fs: %s',
+                    job['id'], job['path'], job['attempts'], self.max_attempts,
+                    delay, job['last_error'],
+                )
+                self.schedule(json.dumps(job), time.time() + delay)
+            return False
+        return True
+
+    def ack(self, raw):
+        """`raw` has run (and been rescheduled or buried if it failed)."""
+
+    def recover(self):
+        """Requeue jobs that dead workers reserved but never finished.
+        Returns how many were requeued."""
+        return 0
+
+    def stop(self):
+        """A worker using this queue is shutting down cleanly."""
+
+    def work_one(self, timeout=5):
+        """Reserve and run one job. Returns None if nothing was ready within
+        `timeout` seconds, else whether the job succeeded."""
+        raw = self.reserve(timeout)
+        if raw is None:
+            return None
+        succeeded = self.run(raw)
+        self.ack(raw)
+        return succeeded
+
+    def drain(self):
+        """Run jobs until none are ready right now. Returns how many ran."""
+        ran = 0
+        while self.work_one(timeout=0) is not None:
+            ran += 1
+        return ran
+
+
+class InProcessJobQueue(BaseJobQueue):
+    """Jobs held in this process's memory. Lost on restart and invisible to
+    other processes — for local dev and tests only."""
+
+    def __init__(self, autostart=True, **kwargs):
+        super().__init__(**kwargs)
+        self.autostart = autostart
+        self._ready = deque()
+        self._delayed = []
+        self._dead = []
+        self._cond = threading.Condition()
+        self._worker = None
+
+    def push(self, raw):
+        with self._cond:
+            self._ready.append(raw)
+            self._cond.notify()
+        if self.autostart:
+            self._ensure_worker()
+
+    def schedule(self, raw, run_at):
+        with self._cond:
+            heapq.heappush(self._delayed, (run_at, raw))
+            self._cond.notify()
+
+    def bury(self, raw):
+        with self._cond:
+            self._dead.append(raw)
+
+    def _promote_due(self):
+        now = time.time()
+        while self._delayed and self._delayed[0][0] <= now:
+            self._ready.append(heapq.heappop(self._delayed)[1])
+
+    def reserve(self, timeout=5):
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                self._promote_due()
+                if self._ready:
+                    return self._ready.popleft()
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                if self._delayed:
+                    remaining = min(remaining, self._delayed[0][0] - time.time())
+                self._cond.wait(max(remaining, 0))
+
+    def dead_letters(self):
+        with self._cond:
+            return [json.loads(raw) for raw in self._dead]
+
+    def requeue_dead(self):
+        with self._cond:
+            dead, self._dead = self._dead, []
+        for raw in dead:
+            job = json.loads(raw)
+            job['attempts'] = 0
+            self.push(json.dumps(job))
+        return len(dead)
+
+    def __len__(self):
+        with self._cond:
+            return len(self._ready) + len(self._delayed)
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._cond:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._work_forever, name='job-queue', daemon=True,
+                )
+                self._worker.start()
+
+    def _work_forever(self):
+        while True:
+            try:
+                self.work_one(timeout=60)
+            except Exception:
+                logger.exception('In-process job worker crashed on a job')
+            finally:
+                close_old_connections()
+
+
+# Moves every delayed job whose due time has passed onto the ready list.
+_PROMOTE_DUE = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, job in ipairs(due) do
+    redis.call('ZREM', KEYS[1], job)
+    redis.call('LPUSH', KEYS[2], job)
+end
+return #due
+"""
+
+
+class RedisJobQueue(BaseJobQueue):
+    """Jobs in Redis, shared by every web process and `run_jobs` worker.
+
+    Keys: `<prefix>:ready` (list, LPUSH / BLMOVE), `<prefix>:delayed` (sorted
+    set of retries by due time), `<prefix>:dead` (list), and per worker
+    `<prefix>:processing:<worker>` (jobs it is running) with a
+    `<prefix>:alive:<worker>` heartbeat that expires `heartbeat_ttl` seconds
+    after its last reserve. Needs Redis 6.2+ for BLMOVE."""
+
+    def __init__(self, url=None, prefix='xbrain:jobs', worker_id=None, heartbeat_ttl=600,
+                 dead_letter_ttl=7 * 24 * 3600, **kwargs):
+        import redis
+
+        super().__init__(**kwargs)
+        self.redis = redis.Redis.from_url(url or settings.REDIS_URL)
+        self.prefix = prefix
+        self.ready_key = f'{prefix}:ready'
+        self.delayed_key = f'{prefix}:delayed'
+        self.dead_key = f'{prefix}:dead'
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.processing_key = f'{prefix}:processing:{self.worker_id}'
+        self.heartbeat_key = f'{prefix}:alive:{self.worker_id}'
+        self.heartbeat_ttl = heartbeat_ttl
+        self.dead_letter_ttl = dead_letter_ttl
+        self._promote = self.redis.register_script(_PROMOTE_DUE)
+
+    def push(self, raw):
+        self.redis.lpush(self.ready_key, raw)
+
+    def schedule(self, raw, run_at):
+        self.redis.zadd(self.delayed_key, {raw: run_at})
+
+    def bury(self, raw):
+        pipe = self.redis.pipeline()
+        pipe.lpush(self.dead_key, raw)
+        pipe.expire(self.dead_key, self.dead_letter_ttl)
+        pipe.execute()
+
+    def reserve(self, timeout=5):
+        self._promote(keys=[self.delayed_key, self.ready_key], args=[time.time()])
+        self.redis.set(self.heartbeat_key, 1, ex=self.heartbeat_ttl)
+        if timeout <= 0:
+            raw = self.redis.lmove(self.ready_key, self.processing_key, 'RIGHT', 'LEFT')
+        else:
+            # Wake up at least once a second so retries come due on time.
+            raw = self.redis.blmove(self.ready_key, self.processing_key, min(timeout, 1), 'RIGHT', 'LEFT')
+        return raw.decode() if isinstance(raw, bytes) else raw
+
+    def ack(self, raw):
+        self.redis.lrem(self.processing_key, 1, raw)
+
+    def recover(self):
+        moved = 0
+        for key in self.redis.scan_iter(match=f'{self.prefix}:processing:*'):
+            key = key.decode() if isinstance(key, bytes) else key
+            worker_id = key.rsplit(':processing:', 1)[1]
+            if worker_id != self.worker_id and self.redis.exists(f'{self.prefix}:alive:{worker_id}'):
+                continue
+            # Newest first onto the consuming end, so the oldest runs first.
+            while self.redis.lmove(key, self.ready_key, 'LEFT', 'RIGHT') is not None:
+                moved += 1
+        return moved
+
+    def stop(self):
+        self.redis.delete(self.heartbeat_key)
+
+    def dead_letters(self):
+        return [json.loads(raw) for raw in self.redis.lrange(self.dead_key, 0, -1)]
+
+    def requeue_dead(self):
+        moved = 0
+        while (raw := self.redis.rpop(self.dead_key)) is not None:
+            job = json.loads(raw)
+            job['attempts'] = 0
+            self.push(json.dumps(job))
+            moved += 1
+        return moved
+
+    def __len__(self):
+        return self.redis.llen(self.ready_key) + self.redis.zcard(self.delayed_key)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """The process-wide queue configured by `settings.JOB_QUEUE`."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                config = getattr(settings, 'JOB_QUEUE', {})
+                backend = import_string(config.get('BACKEND', 'api.jobs.InProcessJobQueue'))
+                _queue = backend(**config.get('OPTIONS', {}))
+    return _queue
+
+
+def enqueue(func, **kwargs):
+    """Queue `func(**kwargs)` to run in the background. `func` is a function
+    or its dotted path; kwargs must be JSON-serializable."""
+    return get_queue().enqueue(func, **kwargs)
+
+
+@receiver(setting_changed)
+def _reset_queue(setting, **kwargs):
+    global _queue
+    if setting == 'JOB_QUEUE':
+        _queue = None
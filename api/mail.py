@@ -0,0 +1,137 @@
+"""Pooled SMTP delivery.
+
+`django.core.mail.send_mail` opens a fresh connection per call: TCP connect,
+EHLO, STARTTLS, AUTH, one message, QUIT. For a handful of messages the
+handshake dominates. `SMTPConnectionPool` keeps up to `size` authenticated
+email-backend connections open between sends and hands them out one caller at
+a time:
+
+- a connection idle longer than `idle_timeout` is closed rather than reused
+  (servers drop idle sessions on their own, usually after a few minutes);
+- a connection idle longer than `health_check_after` is probed with NOOP
+  before reuse and replaced if the probe fails;
+- a connection that raised while sending is discarded, never returned.
+
+`send_messages` delivers a batch of EmailMessages over ONE connection. The
+job tasks in api/tasks.py send through the process-wide pool from
+`get_pool()`, sized by `settings.EMAIL_POOL`."""
+
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+class SMTPConnectionPool:
+    def __init__(self, size=2, idle_timeout=60, health_check_after=5, backend=None):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.backend = backend
+        self._idle = []  # [(backend instance, last used at)], most recent last
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _open(self):
+        connection = get_connection(self.backend, fail_silently=False)
+        connection.open()
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_healthy(connection):
+        smtp = getattr(connection, 'connection', None)
+        if smtp is None:
+            # Non-SMTP backends (locmem, console) have nothing to probe.
+            return not hasattr(connection, 'connection')
+        try:
+            return smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _take_idle(self):
+        """Pop the most recently used idle connection that is still usable."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, last_used = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout:
+                self._close(connection)
+                continue
+            if idle_for > self.health_check_after and not self._is_healthy(connection):
+                self._close(connection)
+                continue
+            return connection
+
+    @contextmanager
+    def connection(self):
+        """Borrow an open connection for the duration of the block. Blocks
+        while all `size` connections are in use."""
+        self._slots.acquire()
+        connection = None
+        try:
+            connection = self._take_idle() or self._open()
+            yield connection
+        except BaseException:
+            if connection is not None:
+                self._close(connection)
+            raise
+        else:
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def send_messages(self, messages):
+        """Send `messages` over a single pooled connection. Returns the number
+        sent; raises on SMTP errors so the caller (job queue) can retry."""
+        if not messages:
+            return 0
+        with self.connection() as connection:
+            return connection.send_messages(messages)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._close(connection)
+
+    def __len__(self):
+        """Number of idle, open connections."""
+        with self._lock:
+            return len(self._idle)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide pool configured by `settings.EMAIL_POOL`."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SMTPConnectionPool(**getattr(settings, 'EMAIL_POOL', {}))
+    return _pool
+
+
+@receiver(setting_changed)
+def _reset_pool(setting, **kwargs):
+    global _pool
+    if setting in ('EMAIL_POOL', 'EMAIL_BACKEND') and _pool is not None:
+        _pool.close_all()
+        _pool = None
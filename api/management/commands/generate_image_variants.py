@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from api.jobs import enqueue
+from api.models import Attachment, User
+
+
+class Command(BaseCommand):
+    help = 'Queues WebP thumbnail generation for images that have none yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Attachments per queued job')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = [
+            str(pk) for pk in
+            Attachment.objects.filter(kind='image', variants={}).values_list('pk', flat=True)
+        ]
+        for start in range(0, len(ids), batch_size):
+            enqueue('api.tasks.make_attachment_variants', attachment_ids=ids[start:start + batch_size])
+
+        users = User.objects.filter(profile_image_variants={}).exclude(profile_image='').exclude(profile_image=None)
+        queued_users = 0
+        for user_id, name in users.values_list('pk', 'profile_image'):
+            enqueue('api.tasks.make_profile_image_variants', user_id=str(user_id), name=name)
+            queued_users += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Queued variants for {len(ids)} attachment(s) and {queued_users} profile image(s)'
+        ))
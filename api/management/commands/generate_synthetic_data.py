@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.synthetic import DEFAULT_DISTRIBUTIONS, SYNTHETIC_PASSWORD, generate
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generates synthetic users, questions, posts and their threads for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--questions', type=int, default=2000)
+        parser.add_argument('--posts', type=int, default=2000)
+        for name, spec in DEFAULT_DISTRIBUTIONS.items():
+            parser.add_argument(
+                f"--{name.replace('_', '-')}", dest=name, default=spec, metavar='SPEC',
+                help=f'Per-item {name.replace("_", " ")} distribution (default {spec}).',
+            )
+        parser.add_argument('--author-skew', type=float, default=1.0,
+                            help='Zipf exponent for picking authors; 0 picks them uniformly.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread creation times over this many days before now.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per write batch')
+        parser.add_argument('--seed', type=int, help='Random seed, for repeatable shapes')
+        parser.add_argument('--tag', help='Four-digit run tag (random by default)')
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Use bulk_create even on PostgreSQL instead of COPY.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            tag, written = generate(
+                users=options['users'],
+                questions=options['questions'],
+                posts=options['posts'],
+                distributions={name: options[name] for name in DEFAULT_DISTRIBUTIONS},
+                author_skew=options['author_skew'],
+                days=options['days'],
+                batch_size=options['batch_size'],
+                seed=options['seed'],
+                tag=options['tag'],
+                use_copy=False if options['no_copy'] else None,
+                log=self.stdout.write,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        total = sum(written.values())
+        for model, rows in written.items():
+            self.stdout.write(f'{model._meta.db_table}: {rows}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {total} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s), tag {tag}. '
+            f'Users are synth{tag}.<n>@example.com with password {SYNTHETIC_PASSWORD!r}.'
+        ))
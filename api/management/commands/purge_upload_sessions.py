@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.upload_sessions import purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired upload sessions and the bytes stored for them'
+
+    def handle(self, *args, **options):
+        removed = purge_expired_sessions()
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} expired upload session(s)'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalized answer/like/dislike/comment counters and fixes any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted rows without writing the corrected values.',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        with transaction.atomic():
+            drifted = reconcile_counters(dry_run=dry_run)
+
+        for label, count in drifted.items():
+            if count:
+                verb = 'would fix' if dry_run else 'fixed'
+                self.stdout.write(self.style.WARNING(f'{label}: {verb} {count} drifted row(s)'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{label}: counters consistent'))
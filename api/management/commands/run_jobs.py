@@ -0,0 +1,73 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from api.jobs import InProcessJobQueue, get_queue
+
+
+class Command(BaseCommand):
+    help = 'Runs background jobs (outgoing email) from the configured job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once the queue has no ready jobs instead of waiting for more.',
+        )
+        parser.add_argument(
+            '--dead-letters',
+            action='store_true',
+            help='List jobs that exhausted their retries, then exit.',
+        )
+        parser.add_argument(
+            '--requeue-dead',
+            action='store_true',
+            help='Move every dead-lettered job back onto the queue, then exit.',
+        )
+
+    def handle(self, *args, **options):
+        queue = get_queue()
+        if isinstance(queue, InProcessJobQueue):
+            raise CommandError(
+                'JOB_QUEUE uses the in-process backend, which web workers drain '
+                'themselves. Set REDIS_URL to run a separate worker.'
+            )
+
+        if options['dead_letters']:
+            dead = queue.dead_letters()
+            for job in dead:
+                self.stdout.write(f"{job['id']} {job['path']} attempts={job['attempts']}: {job.get('last_error', '')}")
+            self.stdout.write(self.style.SUCCESS(f'{len(dead)} dead-lettered job(s)'))
+            return
+
+        if options['requeue_dead']:
+            moved = queue.requeue_dead()
+            self.stdout.write(self.style.SUCCESS(f'Requeued {moved} dead-lettered job(s)'))
+            return
+
+        recovered = queue.recover()
+        if recovered:
+            self.stdout.write(self.style.WARNING(f'Requeued {recovered} job(s) left running by a stopped worker'))
+
+        if options['burst']:
+            ran = queue.drain()
+            queue.stop()
+            self.stdout.write(self.style.SUCCESS(f'Ran {ran} job(s)'))
+            return
+
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(self.style.SUCCESS('Job worker started'))
+        while not stopping:
+            queue.work_one(timeout=5)
+            close_old_connections()
+        queue.stop()
+        self.stdout.write(self.style.SUCCESS('Job worker stopped'))
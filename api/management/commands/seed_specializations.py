@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from api.models import Specialization
+from api.catalogue import invalidate_catalogue
 
 class Command(BaseCommand):
     help = 'Seeds the database with initial specializations'
@@ -50,4 +51,5 @@ class Command(BaseCommand):
                 count += 1
                 self.stdout.write(self.style.SUCCESS(f'Created specialization: {obj.name}'))
 
+        invalidate_catalogue()
         self.stdout.write(self.style.SUCCESS(f'Successfully seeded {count} new specializations. Total: {Specialization.objects.count()}'))
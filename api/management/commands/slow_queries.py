@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.slow_queries import get_ring
+
+
+class Command(BaseCommand):
+    help = 'Dumps the captured slow queries (newest first), with the EXPLAIN plan of each new query shape'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fingerprint', help='Only show entries with this fingerprint.')
+        parser.add_argument('--limit', type=int, default=None, help='Show at most N entries.')
+        parser.add_argument('--json', action='store_true', help='Print one JSON object per line.')
+        parser.add_argument('--clear', action='store_true', help='Empty the buffer after dumping it.')
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        if limit is not None and limit < 1:
+            raise CommandError('--limit must be at least 1.')
+
+        ring = get_ring()
+        if not ring.shared:
+            self.stderr.write(self.style.WARNING(
+                'The default cache is not Redis, so the buffer lives in each process; '
+                'this only shows queries captured by this command.'
+            ))
+        entries = ring.entries()
+        if options['fingerprint']:
+            entries = [entry for entry in entries if entry['fingerprint'] == options['fingerprint']]
+        entries = entries[:limit]
+
+        for entry in entries:
+            if options['json']:
+                self.stdout.write(json.dumps(entry))
+                continue
+            self.stdout.write(self.style.WARNING(
+                f"{entry['at']}  {entry['duration_ms']:.1f} ms  {entry['route'] or '-'}  [{entry['fingerprint']}]"
+            ))
+            self.stdout.write(f"  {entry['sql']}")
+            if entry['params']:
+                self.stdout.write(f"  params: {entry['params']}")
+            if entry['plan']:
+                self.stdout.write('  plan:')
+                for line in entry['plan'].splitlines():
+                    self.stdout.write(f'    {line}')
+            elif entry['explain_error']:
+                self.stdout.write(f"  explain failed: {entry['explain_error']}")
+
+        if options['clear']:
+            ring.clear()
+        if not options['json']:
+            cleared = ' (buffer cleared)' if options['clear'] else ''
+            self.stdout.write(self.style.SUCCESS(f'{len(entries)} slow quer{"y" if len(entries) == 1 else "ies"}{cleared}'))
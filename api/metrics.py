@@ -0,0 +1,422 @@
+"""Prometheus-style metrics: counters, gauges and histograms, exposed at
+`/metrics` in the Prometheus text format.
+
+The request metrics below are fed by `RequestInstrumentationMiddleware`
+(api/instrumentation.py), which measures every request while
+`METRICS_ENABLED` is on:
+
+- `xbrain_http_requests_total{method,route,status}` and
+  `xbrain_http_request_duration_seconds{method,route}`;
+- `xbrain_db_queries_per_request{route}` and
+  `xbrain_db_time_per_request_seconds{route}`;
+- `xbrain_cache_requests_total{cache,result}` — read-through cache hits and
+  misses, for hit rates per cache;
+- `xbrain_http_requests_in_flight` and `xbrain_worker_threads` — busy and
+  total request threads, summed over live workers; their ratio is how
+  saturated the `workers` × `threads` in gunicorn.conf.py are.
+
+Each gunicorn worker is its own process, so a scrape that reaches one worker
+would only see that worker's numbers. With `METRICS_MULTIPROCESS_DIR` set,
+every process keeps its values in a memory-mapped file in that directory
+(one writer per file, so updates take no cross-process lock), and
+`/metrics` sums the files of all processes. Counters and histograms of
+exited workers are kept so totals never go backwards; gauge files are
+removed when gunicorn reaps the worker (`mark_process_dead`, called from
+gunicorn.conf.py). Without the setting, values live in this process only.
+
+`/metrics` is open under DEBUG. Otherwise it requires
+`Authorization: Bearer <METRICS_TOKEN>` and is a 404 when no token is
+configured."""
+
+import bisect
+import glob
+import hmac
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# Gauges describe live processes and go in their own file per process, so a
+# dead worker's in-flight count can be dropped without losing its totals.
+_TOTALS, _LIVE = 'totals', 'live'
+
+
+class _LocalValues:
+    """Values of this process only."""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+_HEADER = struct.Struct('q')
+_LENGTH = struct.Struct('i')
+_VALUE = struct.Struct('d')
+
+
+def _read_entries(data):
+    """`(key, value, offset of value)` for every entry of a values file."""
+    used = _HEADER.unpack_from(data, 0)[0]
+    pos = _HEADER.size
+    while pos < used:
+        length = _LENGTH.unpack_from(data, pos)[0]
+        key = bytes(data[pos + _LENGTH.size:pos + _LENGTH.size + length]).decode()
+        pos += _LENGTH.size + length
+        pos += -pos % 8
+        yield key, _VALUE.unpack_from(data, pos)[0], pos
+        pos += _VALUE.size
+
+
+class _MmapValues:
+    """Values of this process in a memory-mapped file other processes read.
+
+    Layout: an 8-byte count of bytes in use, then one entry per key —
+    4-byte key length, the UTF-8 key padded to 8 bytes, an 8-byte double.
+    A new entry is written in full before the count is moved past it."""
+
+    _INITIAL_SIZE = 1 << 16
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            self._file.truncate(self._INITIAL_SIZE)
+            size = self._INITIAL_SIZE
+        self._map = mmap.mmap(self._file.fileno(), size)
+        if _HEADER.unpack_from(self._map, 0)[0] == 0:
+            _HEADER.pack_into(self._map, 0, _HEADER.size)
+        self._positions = {key: pos for key, _, pos in _read_entries(self._map)}
+
+    def _position(self, key):
+        pos = self._positions.get(key)
+        if pos is None:
+            encoded = key.encode()
+            entry = _LENGTH.pack(len(encoded)) + encoded
+            entry += b'\0' * (-len(entry) % 8) + _VALUE.pack(0.0)
+            used = _HEADER.unpack_from(self._map, 0)[0]
+            if used + len(entry) > len(self._map):
+                size = len(self._map)
+                while used + len(entry) > size:
+                    size *= 2
+                self._map.close()
+                self._file.truncate(size)
+                self._map = mmap.mmap(self._file.fileno(), size)
+            self._map[used:used + len(entry)] = entry
+            _HEADER.pack_into(self._map, 0, used + len(entry))
+            pos = self._positions[key] = used + len(entry) - _VALUE.size
+        return pos
+
+    def inc(self, key, amount):
+        with self._lock:
+            pos = self._position(key)
+            _VALUE.pack_into(self._map, pos, _VALUE.unpack_from(self._map, pos)[0] + amount)
+
+    def set(self, key, value):
+        with self._lock:
+            _VALUE.pack_into(self._map, self._position(key), value)
+
+    def items(self):
+        with self._lock:
+            return [(key, value) for key, value, _ in _read_entries(self._map)]
+
+
+def _multiprocess_dir():
+    return getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+
+
+def _file_path(directory, kind, pid):
+    return os.path.join(directory, f'{kind}_{pid}.db')
+
+
+def mark_process_dead(pid, directory=None):
+    """Drop the gauges of an exited worker (its totals stay)."""
+    directory = directory or _multiprocess_dir()
+    if directory:
+        try:
+            os.remove(_file_path(directory, _LIVE, pid))
+        except FileNotFoundError:
+            pass
+
+
+def clear_multiprocess_dir(directory=None):
+    """Remove every values file; for server start, before any worker runs."""
+    directory = directory or _multiprocess_dir()
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            os.remove(path)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._stores = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name!r} is already registered.')
+        self._metrics[metric.name] = metric
+
+    def store(self, kind):
+        """This process's values of `kind`; reopened after a fork."""
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._stores = {}
+                    self._pid = pid
+        store = self._stores.get(kind)
+        if store is None:
+            with self._lock:
+                store = self._stores.get(kind)
+                if store is None:
+                    directory = _multiprocess_dir()
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                        store = _MmapValues(_file_path(directory, kind, pid))
+                    else:
+                        store = _LocalValues()
+                    self._stores[kind] = store
+        return store
+
+    def values(self):
+        """`{key: value}` summed over every process that reports here."""
+        directory = _multiprocess_dir()
+        if not directory:
+            return {key: value for kind in (_TOTALS, _LIVE) for key, value in self.store(kind).items()}
+        for kind in (_TOTALS, _LIVE):
+            self.store(kind)  # so this process's own file exists
+        totals = {}
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:  # a worker reaped mid-scrape
+                continue
+            if len(data) < _HEADER.size:
+                continue
+            for key, value, _ in _read_entries(data):
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def exposition(self):
+        """Every metric in the Prometheus text format."""
+        samples = {}
+        for key, value in self.values().items():
+            name, sample, labels = json.loads(key)
+            samples.setdefault(name, []).append((sample, labels, value))
+        lines = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            lines.append(f'# HELP {name} {_escape_help(metric.documentation)}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            lines += metric.render(samples.get(name, []))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def _escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = None
+    store_kind = _TOTALS
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        registry.register(self)
+
+    def _labels(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}, got {tuple(labels)}.')
+        return [[name, str(labels[name])] for name in self.labelnames]
+
+    def _key(self, sample, pairs):
+        return json.dumps([self.name, sample, pairs], separators=(',', ':'))
+
+    def _store(self):
+        return self.registry.store(self.store_kind)
+
+    def render(self, samples):
+        return [
+            f'{sample}{_format_labels(pairs)} {_format_value(value)}'
+            for sample, pairs, value in sorted(samples, key=lambda s: (s[0], s[1]))
+        ]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError('Counters only go up.')
+        self._store().inc(self._key(self.name, self._labels(labels)), amount)
+
+
+class Gauge(_Metric):
+    """A gauge; in multiprocess mode the values of live processes are
+    summed."""
+
+    kind = 'gauge'
+    store_kind = _LIVE
+
+    def inc(self, amount=1, **labels):
+        self._store().inc(self._key(self.name, self._labels(labels)), amount)
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        self._store().set(self._key(self.name, self._labels(labels)), value)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        if 'le' in labelnames:
+            raise ValueError('"le" is reserved for histogram buckets.')
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        pairs = self._labels(labels)
+        store = self._store()
+        # Per-bucket counts are stored; render() makes them cumulative.
+        le = self.buckets[bisect.bisect_left(self.buckets, value)]
+        store.inc(self._key(f'{self.name}_bucket', pairs + [['le', _format_value(le)]]), 1)
+        store.inc(self._key(f'{self.name}_sum', pairs), value)
+        store.inc(self._key(f'{self.name}_count', pairs), 1)
+
+    def render(self, samples):
+        series = {}
+        for sample, pairs, value in samples:
+            if sample.endswith('_bucket'):
+                le = float(pairs[-1][1])
+                pairs = pairs[:-1]
+                series.setdefault(tuple(map(tuple, pairs)), {}).setdefault('buckets', {})[le] = value
+            else:
+                series.setdefault(tuple(map(tuple, pairs)), {})[sample] = value
+        lines = []
+        for pairs in sorted(series):
+            entry = series[pairs]
+            counts = entry.get('buckets', {})
+            cumulative = 0
+            for le in self.buckets:
+                cumulative += counts.get(le, 0)
+                labels = _format_labels(list(pairs) + [('le', _format_value(le))])
+                lines.append(f'{self.name}_bucket{labels} {_format_value(cumulative)}')
+            lines.append(f'{self.name}_sum{_format_labels(pairs)} {_format_value(entry.get(f"{self.name}_sum", 0))}')
+            lines.append(f'{self.name}_count{_format_labels(pairs)} {_format_value(entry.get(f"{self.name}_count", 0))}')
+        return lines
+
+
+REQUESTS = Counter(
+    'xbrain_http_requests_total', 'HTTP requests served.', ('method', 'route', 'status'),
+)
+REQUEST_DURATION = Histogram(
+    'xbrain_http_request_duration_seconds', 'Time to serve a request, rendering included.',
+    ('method', 'route'),
+)
+DB_QUERIES = Histogram(
+    'xbrain_db_queries_per_request', 'SQL statements run by one request.', ('route',), buckets=QUERY_BUCKETS,
+)
+DB_TIME = Histogram(
+    'xbrain_db_time_per_request_seconds', 'Time one request spent waiting on the database.', ('route',),
+)
+CACHE_REQUESTS = Counter(
+    'xbrain_cache_requests_total', 'Read-through cache lookups by cache and result (hit / miss).',
+    ('cache', 'result'),
+)
+IN_FLIGHT = Gauge(
+    'xbrain_http_requests_in_flight', 'Requests being served right now, summed over live workers.',
+)
+WORKER_THREADS = Gauge(
+    'xbrain_worker_threads', 'Request threads of live web workers.',
+)
+
+
+def enabled():
+    return getattr(settings, 'METRICS_ENABLED', False)
+
+
+# Clients choose the method token; anything else shares one label so a
+# scanner can't mint a permanent series per made-up method.
+_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+
+def observe_request(request, response, measured):
+    """Record one finished request measured by the instrumentation middleware."""
+    match = getattr(request, 'resolver_match', None)
+    route = match.view_name if match else 'unmatched'
+    method = request.method if request.method in _METHODS else 'other'
+    REQUESTS.inc(method=method, route=route, status=response.status_code)
+    REQUEST_DURATION.observe(measured.total_ms / 1e3, method=method, route=route)
+    DB_QUERIES.observe(measured.queries, route=route)
+    DB_TIME.observe(measured.db_ms / 1e3, route=route)
+    for cache, (hits, misses) in measured.cache.items():
+        if hits:
+            CACHE_REQUESTS.inc(hits, cache=cache, result='hit')
+        if misses:
+            CACHE_REQUESTS.inc(misses, cache=cache, result='miss')
+
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    elif not settings.DEBUG:
+        raise Http404
+    return HttpResponse(REGISTRY.exposition(), content_type=CONTENT_TYPE)
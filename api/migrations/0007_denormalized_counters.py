@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-17 02:22
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count_subquery(model, fk, **filters):
+    return Coalesce(
+        Subquery(
+            model.objects
+            .filter(**{fk: OuterRef("pk")}, **filters)
+            .order_by()
+            .values(fk)
+            .annotate(n=Count("pk"))
+            .values("n"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def backfill_counters(apps, schema_editor):
+    Question = apps.get_model("api", "Question")
+    Answer = apps.get_model("api", "Answer")
+    Post = apps.get_model("api", "Post")
+    PostReaction = apps.get_model("api", "PostReaction")
+    Comment = apps.get_model("api", "Comment")
+
+    Question.objects.update(answers_count=_count_subquery(Answer, "question"))
+    Post.objects.update(
+        likes_count=_count_subquery(PostReaction, "post", reaction="like"),
+        dislikes_count=_count_subquery(PostReaction, "post", reaction="dislike"),
+        comments_count=_count_subquery(Comment, "post"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_comment"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comments_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="dislikes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="answers_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
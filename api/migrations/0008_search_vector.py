@@ -0,0 +1,71 @@
+# Generated by Django 5.2.5 on 2026-10-17 03:05
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Full-text + trigram search support for the ?q= filter (see api/search.py).
+# Everything below is PostgreSQL-only; on other backends (local SQLite dev)
+# the column is simply left NULL and search falls back to icontains.
+TABLES = ("questions", "posts")
+
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+]
+BACKWARD_SQL = []
+
+for table in TABLES:
+    FORWARD_SQL += [
+        f"""
+        CREATE TRIGGER {table}_search_vector_update
+        BEFORE INSERT OR UPDATE OF content ON {table}
+        FOR EACH ROW EXECUTE FUNCTION
+        tsvector_update_trigger(search_vector, 'pg_catalog.english', content)
+        """,
+        f"UPDATE {table} SET search_vector = to_tsvector('pg_catalog.english', COALESCE(content, ''))",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_search ON {table} USING gin (search_vector)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_content_trgm ON {table} USING gin (content gin_trgm_ops)",
+    ]
+    BACKWARD_SQL += [
+        f"DROP INDEX IF EXISTS idx_{table}_content_trgm",
+        f"DROP INDEX IF EXISTS idx_{table}_search",
+        f"DROP TRIGGER IF EXISTS {table}_search_vector_update ON {table}",
+    ]
+
+
+def _run_on_postgres(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_denormalized_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(
+            _run_on_postgres(FORWARD_SQL),
+            _run_on_postgres(BACKWARD_SQL),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-17 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_image_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='WebP thumbnails of the profile image, {width: storage name}'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-17 18:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='specialization',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='When the specialization was last edited (names are embedded in question and post payloads)'),
+            preserve_default=False,
+        ),
+    ]
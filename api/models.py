@@ -3,6 +3,7 @@ import re
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import RegexValidator, MinLengthValidator, MaxLengthValidator, URLValidator
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
@@ -131,6 +132,12 @@ class User(AbstractBaseUser, PermissionsMixin):
         null=True,
         help_text="User's profile image"
     )
+
+    profile_image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="WebP thumbnails of the profile image, {width: storage name}"
+    )
     
     specializations = models.ManyToManyField(
         'Specialization',
@@ -223,6 +230,11 @@ class Specialization(models.Model):
         max_length=500,
         help_text="Detailed description of the specialization"
     )
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When the specialization was last edited (names are embedded in question and post payloads)"
+    )
     
     class Meta:
         db_table = 'specializations'
@@ -391,6 +403,12 @@ class Question(models.Model):
     )
     is_resolved = models.BooleanField(default=False)
     resolved_at = models.DateTimeField(null=True, blank=True)
+    # Denormalized total of answers + replies, maintained by the answer
+    # create/delete paths. `manage.py reconcile_counters` repairs drift.
+    answers_count = models.PositiveIntegerField(default=0)
+    # tsvector of `content` for ?q= search. Written by a PostgreSQL trigger
+    # and GIN-indexed (migration 0008) — never set from Python.
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -486,6 +504,9 @@ class Attachment(models.Model):
     mime_type = models.CharField(max_length=100)
     size_bytes = models.BigIntegerField()
     original_filename = models.CharField(max_length=255)
+    # WebP thumbnails of image attachments, {width: storage name}; filled in
+    # by a background job (api/thumbnails.py).
+    variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -506,6 +527,40 @@ class Attachment(models.Model):
         return ct.get_object_for_this_type(pk=self.object_id)
 
 
+class UploadSession(models.Model):
+    """A large attachment uploaded ahead of its parent, straight to storage
+    (see api/upload_sessions.py). Once finalized, the parent's create request
+    references it by id in `uploads` and it becomes an Attachment."""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        'User',
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+    )
+    original_filename = models.CharField(max_length=255)
+    kind = models.CharField(max_length=10, choices=Attachment.KIND_CHOICES)
+    mime_type = models.CharField(max_length=100)
+    size_bytes = models.BigIntegerField(help_text="Declared total size")
+    received_bytes = models.BigIntegerField(default=0)
+    blob_name = models.CharField(max_length=255, help_text="Final storage name of the file")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'upload_sessions'
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.status} upload ({self.original_filename})"
+
+
 class Post(models.Model):
     """Knowledge-sharing post. Same shape as Question (no resolve flag),
     plus a like/dislike reaction system that distinguishes Posts from Q&A."""
@@ -521,6 +576,13 @@ class Post(models.Model):
         'Specialization',
         related_name='posts',
     )
+    # Denormalized counters, maintained by the reaction toggle and the comment
+    # create/delete paths. `manage.py reconcile_counters` repairs drift.
+    likes_count = models.PositiveIntegerField(default=0)
+    dislikes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    # Same trigger-maintained, GIN-indexed search column as Question.
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -0,0 +1,168 @@
+import base64
+import binascii
+import json
+import uuid
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Keyset ("seek") pagination over `(created_at, id)`, newest first.
+
+    Each page is fetched with a `WHERE (created_at, id) < (cursor)` range
+    predicate instead of OFFSET, so it walks the `-created_at` index and costs
+    the same no matter how deep the client has scrolled. No COUNT query is
+    issued — the response carries only opaque `next` / `previous` cursors."""
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        position = self.decode_cursor(request)
+
+        if position is None:
+            created_at, pk, reverse = None, None, False
+            queryset = queryset.order_by('-created_at', '-id')
+        else:
+            created_at, pk, reverse = position
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+                ).order_by('created_at', 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                ).order_by('-created_at', '-id')
+
+        # Fetch one extra row to learn whether another page exists.
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        last = self.page[-1]
+        return self.encode_cursor(last.created_at, last.pk, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Stepped past the end; going back restarts from the newest row.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        first = self.page[0]
+        return self.encode_cursor(first.created_at, first.pk, reverse=True)
+
+    def encode_cursor(self, created_at, pk, reverse):
+        payload = json.dumps([created_at.isoformat(), str(pk), int(reverse)])
+        token = base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = base64.urlsafe_b64decode(token.encode('ascii'))
+            created_at, pk, reverse = json.loads(payload)
+            created_at = parse_datetime(created_at)
+            pk = uuid.UUID(pk)
+        except (TypeError, ValueError, AttributeError, binascii.Error, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None or timezone.is_naive(created_at):
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk, bool(reverse)
+
+
+class FeedPagination(PageNumberPagination):
+    """Pagination for the question and post feeds.
+
+    Defaults to the regular `?page=` paging so existing clients are
+    unaffected. Clients that send `?paginate=cursor` (first page) or a
+    `?cursor=` token (every later page) get keyset pagination instead.
+
+    Keyset pages are ordered by `(created_at, id)`, which would silently
+    replace the relevance order of a `?q=` search, so that combination is
+    rejected with a 400."""
+
+    mode_query_param = 'paginate'
+    search_query_param = 'q'
+    search_with_cursor_message = 'Search results are ordered by relevance and cannot be cursor-paginated; use ?page=.'
+
+    def _use_keyset(self, request):
+        params = request.query_params
+        return (
+            params.get(self.mode_query_param) == 'cursor'
+            or KeysetPagination.cursor_query_param in params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = KeysetPagination() if self._use_keyset(request) else None
+        if self.keyset is not None:
+            if request.query_params.get(self.search_query_param):
+                raise ValidationError({self.search_query_param: self.search_with_cursor_message})
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': "Set to `cursor` to switch to keyset pagination (no `count`, opaque `next`/`previous`). Not allowed with `q`.",
+                'schema': {'type': 'string', 'enum': ['cursor']},
+            },
+            {
+                'name': KeysetPagination.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor taken from a previous `next`/`previous` link.',
+                'schema': {'type': 'string'},
+            },
+        ]
@@ -0,0 +1,161 @@
+"""Atomic counters for OTP throttling and login lockout.
+
+A read-modify-write (`cache.get` → +1 → `cache.set`) costs two round trips
+and races across gunicorn workers: N concurrent failed logins can all read
+"4 attempts" and all be let through. Every operation here is a single atomic
+step instead:
+
+- `incr(key, window)`: INCR + EXPIRE in one MULTI/EXEC;
+- `consume(key, limit, window)`: take one unit of a quota, refusing (without
+  counting) once `limit` is reached;
+- `throttle(cooldown_key, cooldown, count_key, limit, window)`: a cooldown
+  between sends plus a quota over a window, checked and taken together.
+
+With the Redis cache backend these run as one Redis command / Lua script.
+Any other backend (LocMemCache in local dev and tests) gets the same
+semantics under a process-wide lock — exact within one process, which is
+all LocMemCache can offer anyway.
+
+Keys go through the cache's own key function and counters are stored as
+plain integers, so `cache.get(key)` / `cache.delete(key)` keep working on
+them. Expiry is sliding: every counted hit restarts the window."""
+
+import threading
+import time
+from typing import NamedTuple
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+
+class Throttle(NamedTuple):
+    allowed: bool
+    retry_after: int   # seconds left on the cooldown, 0 if not cooling down
+    count: int         # hits counted in the current window
+
+
+_CONSUME = """
+local n = tonumber(redis.call('GET', KEYS[1]) or '0')
+if n >= tonumber(ARGV[1]) then
+    return {0, n}
+end
+n = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return {1, n}
+"""
+
+_THROTTLE = """
+local count = tonumber(redis.call('GET', KEYS[2]) or '0')
+local ttl = redis.call('TTL', KEYS[1])
+if ttl > 0 then
+    return {0, ttl, count}
+end
+if count >= tonumber(ARGV[2]) then
+    return {0, 0, count}
+end
+redis.call('SET', KEYS[1], 1, 'EX', ARGV[1])
+count = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return {1, 0, count}
+"""
+
+
+class RedisCounters:
+    def __init__(self, backend):
+        self.backend = backend
+        client = backend._cache.get_client(write=True)
+        self._consume = client.register_script(_CONSUME)
+        self._throttle = client.register_script(_THROTTLE)
+
+    def _client_and_key(self, key):
+        key = self.backend.make_and_validate_key(key)
+        return self.backend._cache.get_client(key, write=True), key
+
+    def incr(self, key, window):
+        client, key = self._client_and_key(key)
+        pipe = client.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, int(window))
+        count, _ = pipe.execute()
+        return count
+
+    def consume(self, key, limit, window):
+        client, key = self._client_and_key(key)
+        allowed, count = self._consume(keys=[key], args=[limit, int(window)], client=client)
+        return bool(allowed), count
+
+    def throttle(self, cooldown_key, cooldown, count_key, limit, window):
+        client, cooldown_key = self._client_and_key(cooldown_key)
+        count_key = self.backend.make_and_validate_key(count_key)
+        allowed, retry_after, count = self._throttle(
+            keys=[cooldown_key, count_key],
+            args=[int(cooldown), limit, int(window)],
+            client=client,
+        )
+        return Throttle(bool(allowed), retry_after, count)
+
+
+class LocalCounters:
+    """Same semantics on any Django cache, serialized by a process lock.
+    Cooldown keys store their own expiry time so the remaining wait can be
+    reported without backend-specific TTL access."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def incr(self, key, window):
+        with self._lock:
+            count = self.backend.get(key, 0) + 1
+            self.backend.set(key, count, timeout=window)
+            return count
+
+    def consume(self, key, limit, window):
+        with self._lock:
+            count = self.backend.get(key, 0)
+            if count >= limit:
+                return False, count
+            count += 1
+            self.backend.set(key, count, timeout=window)
+            return True, count
+
+    def throttle(self, cooldown_key, cooldown, count_key, limit, window):
+        with self._lock:
+            now = time.time()
+            count = self.backend.get(count_key, 0)
+            cooling_until = self.backend.get(cooldown_key)
+            if cooling_until is not None and cooling_until > now:
+                return Throttle(False, max(int(cooling_until - now), 1), count)
+            if count >= limit:
+                return Throttle(False, 0, count)
+            self.backend.set(cooldown_key, now + cooldown, timeout=cooldown)
+            count += 1
+            self.backend.set(count_key, count, timeout=window)
+            return Throttle(True, 0, count)
+
+
+def get_counters(alias='default'):
+    """Counters bound to the cache `alias`. Cache backends are per thread,
+    so the counters object is stored on the backend instance it wraps."""
+    backend = caches[alias]
+    counters = getattr(backend, '_atomic_counters', None)
+    if counters is None:
+        if isinstance(backend, RedisCache):
+            counters = RedisCounters(backend)
+        else:
+            counters = LocalCounters(backend)
+        backend._atomic_counters = counters
+    return counters
+
+
+def incr(key, window):
+    return get_counters().incr(key, window)
+
+
+def consume(key, limit, window):
+    return get_counters().consume(key, limit, window)
+
+
+def throttle(cooldown_key, cooldown, count_key, limit, window):
+    return get_counters().throttle(cooldown_key, cooldown, count_key, limit, window)
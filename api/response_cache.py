@@ -0,0 +1,162 @@
+"""Shared response cache for the question and post feeds and detail pages.
+
+`GET /api/questions/`, `/api/posts/` and their detail pages return the same
+body to every caller except for `my_reaction` on posts. Each one otherwise
+runs the annotated queryset, the prefetches and serialization. `cached_read`
+stores the viewer-independent body in the shared cache, keyed by:
+
+- the family's generation counter (`questions` or `posts`). Any write that
+  can change what those endpoints return bumps it — see api/signals.py — so
+  old entries simply stop being looked up and expire on their own;
+- the absolute URL with its query parameters normalized (sorted, blanks
+  dropped), so `?b=2&a=1` and `?a=1&b=2&q=` share an entry.
+
+The viewer-specific part is merged in per request: for posts, one query
+fetches the viewer's reactions to the posts on the page.
+
+Every response carries an `ETag` derived from the shared body (and the
+merged reactions), and `Cache-Control: no-cache`, so clients revalidate with
+`If-None-Match` and get an empty 304 while nothing has changed. The detail
+pages use their validator query for the ETag instead (api/conditional.py)."""
+
+import hashlib
+import json
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .instrumentation import record_cache
+
+
+GENERATION_KEY_PREFIX = 'response_generation_'
+RESPONSE_KEY_PREFIX = 'response_'
+
+QUESTIONS = 'questions'
+POSTS = 'posts'
+FAMILIES = (QUESTIONS, POSTS)
+
+
+def _generation_key(family):
+    return f'{GENERATION_KEY_PREFIX}{family}'
+
+
+def get_generation(family):
+    key = _generation_key(family)
+    generation = cache.get(key)
+    if generation is None:
+        # Seed from the clock rather than 0, so a counter that was evicted
+        # never comes back at a value whose entries may still be cached.
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def _bump(families):
+    for family in families:
+        try:
+            cache.incr(_generation_key(family))
+        except ValueError:
+            get_generation(family)  # missing: seeding it is already a new value
+
+
+def bump_generation(*families):
+    """Retire every cached response of `families` (all of them by default),
+    now and again on commit: another worker may re-cache the pre-commit state
+    in between."""
+    families = families or FAMILIES
+    _bump(families)
+    transaction.on_commit(lambda: _bump(families))
+
+
+def _normalized_url(request):
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+        if value != ''
+    )
+    url = request.build_absolute_uri(request.path)
+    return f'{url}?{urlencode(params)}' if params else url
+
+
+def _response_key(family, request):
+    digest = hashlib.sha1(_normalized_url(request).encode()).hexdigest()
+    return f'{RESPONSE_KEY_PREFIX}{family}_{get_generation(family)}_{digest}'
+
+
+def _etag(*parts):
+    payload = json.dumps(parts, cls=DjangoJSONEncoder, sort_keys=True)
+    return '"%s"' % hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _not_modified(request, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    client_etags = [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+    return '*' in client_etags or etag in client_etags
+
+
+def personalized_etag(etag, extra):
+    """`etag` with a viewer-specific summary folded in, if there is one."""
+    return _etag(etag, extra) if extra else etag
+
+
+def response_headers(request, etag, last_modified=None):
+    headers = {
+        'ETag': etag,
+        'Cache-Control': f'{"private" if request.user.is_authenticated else "public"}, no-cache',
+        'Vary': 'Authorization',
+    }
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified.timestamp())
+    return headers
+
+
+def cached_read(request, family, render, personalize=None, validator=None):
+    """Serve a GET from the response cache.
+
+    `render()` returns the viewer-independent Response; only 200s are
+    cached. For authenticated viewers `personalize(request, data)` returns
+    `(data, extra)`: the body with viewer-specific fields filled in (without
+    mutating `data`) and a JSON-able summary of them for the ETag.
+
+    With a `validator(request)` (see api/conditional.py) a cache miss first
+    runs the validator query: a matching `If-None-Match` is answered without
+    rendering, and the validator, not a hash of the body, becomes the ETag."""
+    key = _response_key(family, request)
+    entry = cache.get(key)
+    record_cache('response', entry is not None)
+    if entry is None:
+        current = validator(request) if validator is not None else None
+        if current is not None:
+            headers = response_headers(
+                request, personalized_etag(current.etag, current.extra), current.last_modified,
+            )
+            if _not_modified(request, headers['ETag']):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response = render()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        if current is not None:
+            entry = {'data': response.data, 'etag': current.etag, 'last_modified': current.last_modified}
+        else:
+            entry = {'data': response.data, 'etag': _etag(response.data)}
+        cache.set(key, entry, timeout=getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+
+    data, etag = entry['data'], entry['etag']
+    if request.user.is_authenticated and personalize is not None:
+        data, extra = personalize(request, data)
+        etag = personalized_etag(etag, extra)  # unchanged when the body is exactly the shared one
+
+    headers = response_headers(request, etag, entry.get('last_modified'))
+    if _not_modified(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(data, headers=headers)
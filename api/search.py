@@ -0,0 +1,42 @@
+"""Full-text search for the `?q=` filter on the question and post feeds.
+
+On PostgreSQL, `questions.search_vector` / `posts.search_vector` hold a
+`tsvector` of `content`, kept current by a `tsvector_update_trigger` and
+served by a GIN index (migration 0008). A search matches rows whose vector
+satisfies `websearch_to_tsquery(q)` OR whose content is a trigram
+word-match for `q` (pg_trgm, GIN-indexed), which covers prefixes like
+"djan" and short / misspelled terms the stemmer can't. Results are ordered
+by full-text rank plus trigram similarity.
+
+Other backends (local SQLite dev) fall back to a case-insensitive substring
+match so `?q=` keeps working without PostgreSQL."""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F, Q
+
+
+SEARCH_CONFIG = 'english'
+
+
+def apply_search(queryset, term):
+    """Filter `queryset` (Question or Post) down to rows matching `term`,
+    best matches first."""
+    term = term.strip()
+    if not term:
+        return queryset
+    if connection.vendor != 'postgresql':
+        return queryset.filter(content__icontains=term)
+
+    query = SearchQuery(term, search_type='websearch', config=SEARCH_CONFIG)
+    return (
+        queryset
+        .annotate(
+            search_rank=(
+                SearchRank(F('search_vector'), query)
+                + TrigramWordSimilarity(term, 'content')
+            ),
+        )
+        .filter(Q(search_vector=query) | Q(content__trigram_word_similar=term))
+        .order_by('-search_rank', '-created_at')
+    )
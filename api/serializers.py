@@ -4,7 +4,7 @@ from django.contrib.auth.password_validation import validate_password as django_
 from django.core.exceptions import ValidationError
 from .models import (
     User, Specialization, Certificate, PointsWallet,
-    Question, Answer, Attachment, Post, PostReaction, Comment,
+    Question, Answer, Attachment, Post, PostReaction, Comment, UploadSession,
 )
 from .utils import (
     validate_password_strength,
@@ -14,6 +14,15 @@ from .utils import (
     classify_and_validate_attachment,
     MAX_ATTACHMENTS_PER_PARENT,
 )
+from .threads import load_thread
+from .uploads import store_attachments, upload_scope
+from .upload_sessions import attach_uploads
+from .thumbnails import delete_variants, schedule_profile_image_variants, variant_urls
+from .storage_urls import file_url
+from .response_cache import bump_generation
+from .catalogue import get_catalogue, invalidate_catalogue
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema_field
 
 class UserRegistrationSerializer(serializers.Serializer):
@@ -144,10 +153,10 @@ class UserLoginSerializer(serializers.Serializer):
         identifier = data['identifier'].lower()
         password = data['password']
         
-        from .utils import is_account_locked, increment_login_attempts, reset_login_attempts
-        is_locked, attempts, max_attempts = is_account_locked(identifier)
+        from .utils import consume_login_attempt, reset_login_attempts
+        allowed, attempts, max_attempts = consume_login_attempt(identifier)
         
-        if is_locked:
+        if not allowed:
             raise serializers.ValidationError({
                 "error": f"Account locked due to too many failed login attempts. Please try again after 15 minutes."
             })
@@ -169,8 +178,7 @@ class UserLoginSerializer(serializers.Serializer):
             data['user'] = user
             return data
         else:
-            new_attempts = increment_login_attempts(identifier)
-            remaining = max_attempts - new_attempts
+            remaining = max_attempts - attempts
             
             if remaining > 0:
                 raise serializers.ValidationError({
@@ -207,6 +215,7 @@ class UserDetailSerializer(serializers.ModelSerializer):
     specializations = SpecializationSerializer(many=True, read_only=True)
     wallet = PointsWalletSerializer(read_only=True)
     profile_image_url = serializers.SerializerMethodField()
+    profile_image_variants = serializers.SerializerMethodField()
     specialization_form_completed_at = serializers.DateTimeField(read_only=True)
 
     class Meta:
@@ -220,6 +229,7 @@ class UserDetailSerializer(serializers.ModelSerializer):
             'phone_number',
             'bio',
             'profile_image_url',
+            'profile_image_variants',
             'specializations',
             'specialization_form_completed_at',
             'wallet',
@@ -231,11 +241,21 @@ class UserDetailSerializer(serializers.ModelSerializer):
     def get_profile_image_url(self, obj):
         if obj.profile_image:
             request = self.context.get('request')
+            url = file_url(obj.profile_image, request)
             if request:
-                return request.build_absolute_uri(obj.profile_image.url)
-            return obj.profile_image.url
+                return request.build_absolute_uri(url)
+            return url
         return None
 
+    def get_profile_image_variants(self, obj) -> dict[str, str]:
+        if not obj.profile_image:
+            return {}
+        request = self.context.get('request')
+        urls = variant_urls(obj.profile_image.storage, obj.profile_image_variants, request)
+        if request:
+            return {width: request.build_absolute_uri(url) for width, url in urls.items()}
+        return urls
+
 
 class UpdateProfileSerializer(serializers.ModelSerializer):
     profile_image = serializers.ImageField(required=False, allow_null=True)
@@ -265,6 +285,19 @@ class UpdateProfileSerializer(serializers.ModelSerializer):
             cleaned[field_name] = value
         return super().to_internal_value(cleaned)
 
+    def update(self, instance, validated_data):
+        new_image = 'profile_image' in validated_data
+        if new_image:
+            stale = (instance.profile_image.storage, instance.profile_image_variants)
+            instance.profile_image_variants = {}
+        instance = super().update(instance, validated_data)
+        if new_image:
+            delete_variants(*stale)
+            bump_generation()  # the avatar appears on every authored item
+            if instance.profile_image:
+                schedule_profile_image_variants(instance)
+        return instance
+
 
 class ResendOTPSerializer(serializers.Serializer):
     email = serializers.EmailField(required=True)
@@ -316,11 +349,18 @@ class UserSpecializationSerializer(serializers.Serializer):
         if not value:
             return value
 
-        existing_ids = set(Specialization.objects.filter(
-            id__in=value
-        ).values_list('id', flat=True))
+        catalogue = get_catalogue()
+        unknown = [vid for vid in value if vid not in catalogue]
+        if unknown:
+            # Not in the cached catalogue — the cache may just be stale.
+            found = set(Specialization.objects.filter(
+                id__in=unknown
+            ).values_list('id', flat=True))
+            if found:
+                invalidate_catalogue()
+            unknown = [vid for vid in unknown if vid not in found]
 
-        invalid_ids = set(str(vid) for vid in value) - set(str(eid) for eid in existing_ids)
+        invalid_ids = set(str(vid) for vid in unknown)
 
         if invalid_ids:
             raise serializers.ValidationError(
@@ -427,34 +467,43 @@ class ResetPasswordSerializer(serializers.Serializer):
 
 class AttachmentSerializer(serializers.ModelSerializer):
     """Read shape for an Attachment. Returned inline as a list under the parent
-    (Question / Answer / Reply / Post). The `url` is an Azure Blob URL."""
+    (Question / Answer / Reply / Post). The `url` is an Azure Blob URL;
+    `variants` maps widths to WebP thumbnails of image attachments."""
     url = serializers.SerializerMethodField()
+    variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Attachment
         fields = [
             'id', 'kind', 'mime_type', 'size_bytes',
-            'original_filename', 'url', 'created_at',
+            'original_filename', 'url', 'variants', 'created_at',
         ]
 
     def get_url(self, obj) -> str | None:
-        if obj.file:
-            return obj.file.url
-        return None
+        return file_url(obj.file, self.context.get('request'))
+
+    def get_variants(self, obj) -> dict[str, str]:
+        return variant_urls(obj.file.storage, obj.variants, self.context.get('request'))
 
 
 class PublicAuthorSerializer(serializers.ModelSerializer):
     """Compact public profile used as the nested 'author' on Q&A responses."""
     profile_image_url = serializers.SerializerMethodField()
+    profile_image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = User
-        fields = ['id', 'username', 'profile_image_url']
+        fields = ['id', 'username', 'profile_image_url', 'profile_image_variants']
 
     def get_profile_image_url(self, obj) -> str | None:
+        return file_url(obj.profile_image, self.context.get('request'))
+
+    def get_profile_image_variants(self, obj) -> dict[str, str]:
         if obj.profile_image:
-            return obj.profile_image.url
-        return None
+            return variant_urls(
+                obj.profile_image.storage, obj.profile_image_variants, self.context.get('request')
+            )
+        return {}
 
 
 class SpecializationCompactSerializer(serializers.ModelSerializer):
@@ -527,7 +576,10 @@ class TopLevelAnswerWithRepliesSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(AnswerSerializer(many=True))
     def get_replies(self, obj):
-        first_replies = obj.replies.all()[:2]
+        # Populated by load_thread(); fall back to a query otherwise.
+        first_replies = getattr(obj, 'first_replies', None)
+        if first_replies is None:
+            first_replies = obj.replies.all()[:2]
         return AnswerSerializer(first_replies, many=True, context=self.context).data
 
 
@@ -553,13 +605,9 @@ class QuestionDetailSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(TopLevelAnswerWithRepliesSerializer(many=True))
     def get_answers(self, obj):
-        from django.db.models import Count
-        top_level = (
-            obj.answers
-               .filter(parent_answer__isnull=True)
-               .annotate(replies_count=Count('replies'))
-               .order_by('created_at')[:10]
-        )
+        # One windowed query for the answers + their first replies (authors
+        # joined in), one more for every row's attachments.
+        top_level = load_thread(obj.answers.all(), 'parent_answer', prefetch=['attachments'])
         return TopLevelAnswerWithRepliesSerializer(top_level, many=True, context=self.context).data
 
 
@@ -586,22 +634,75 @@ class BinaryFileField(serializers.FileField):
 def _attach_files_to(parent, files):
     """Validate and persist a list of uploaded files as Attachment rows
     associated with the given parent (Question / Answer / Post). Caller is
-    expected to have already enforced any per-parent count cap."""
-    from django.contrib.contenttypes.models import ContentType
-    ct = ContentType.objects.get_for_model(parent.__class__)
-    for f in files:
-        kind, mime = classify_and_validate_attachment(f)
-        Attachment.objects.create(
-            content_type=ct,
-            object_id=parent.pk,
-            file=f,
-            kind=kind,
-            mime_type=mime,
-            size_bytes=f.size,
-            original_filename=f.name[:255],
+    expected to have already enforced any per-parent count cap. Uploads run
+    in parallel; see api/uploads.py."""
+    return store_attachments(parent, files)
+
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    """Declared facts about a file the client is about to upload. Checked
+    against the attachment limits before any bytes are sent."""
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.CharField(max_length=100)
+    size = serializers.IntegerField(min_value=1)
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Read shape for an upload session. `received_bytes` is where a
+    chunked upload resumes from."""
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'status', 'original_filename', 'kind', 'mime_type',
+            'size_bytes', 'received_bytes', 'expires_at', 'created_at',
+        ]
+        read_only_fields = fields
+
+
+@extend_schema_field(OpenApiTypes.UUID)
+class UploadSessionField(serializers.PrimaryKeyRelatedField):
+    """A finalized, unexpired upload session owned by the requesting user."""
+    default_error_messages = {
+        'does_not_exist': 'Upload "{pk_value}" is not a finished upload of yours.',
+    }
+
+    def get_queryset(self):
+        request = self.context.get('request')
+        owner_id = getattr(getattr(request, 'user', None), 'pk', None)
+        return UploadSession.objects.filter(
+            owner_id=owner_id, status='complete', expires_at__gt=timezone.now(),
         )
 
 
+def _uploads_field():
+    return UploadSessionField(
+        many=True,
+        required=False,
+        write_only=True,
+        help_text=(
+            'Optional list of finalized upload-session IDs (see /api/uploads/). '
+            f'Counts towards the limit of {MAX_ATTACHMENTS_PER_PARENT} attachments.'
+        ),
+    )
+
+
+def _validate_attachment_total(data):
+    total = len(data.get('attachments', [])) + len(data.get('uploads', []))
+    if total > MAX_ATTACHMENTS_PER_PARENT:
+        raise serializers.ValidationError(
+            {'uploads': f'At most {MAX_ATTACHMENTS_PER_PARENT} attachments in total.'}
+        )
+    return data
+
+
+def _attach_all(parent, files, uploads):
+    if files:
+        _attach_files_to(parent, files)
+    if uploads:
+        attach_uploads(parent, uploads)
+
+
 # Characters Swagger UI / users sometimes wrap UUIDs in.
 _QUOTE_CHARS = '"\'“”‘’'
 
@@ -616,6 +717,24 @@ def _split_csv_value(raw):
     return [p for p in parts if p]
 
 
+class CatalogueSpecializationField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField for specializations that resolves IDs from the
+    cached catalogue. Only IDs missing from the cache hit the database (and
+    invalidate the cache if they turn out to exist)."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Specialization.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        specialization = get_catalogue().get(data)
+        if specialization is not None:
+            return specialization
+        specialization = super().to_internal_value(data)
+        invalidate_catalogue()
+        return specialization
+
+
 class _CommaTolerantSpecsMixin:
     """ModelSerializer mixin that normalizes the `specializations` field when
     it arrives as a single comma-joined string (Swagger UI multipart quirk).
@@ -648,9 +767,8 @@ class QuestionCreateUpdateSerializer(_CommaTolerantSpecsMixin, serializers.Model
     Accepts the question's content, between one and three specialization UUIDs,
     optional file attachments (multipart/form-data only), and (on update) the
     resolved flag. The author is set by the view from the authenticated request."""
-    specializations = serializers.PrimaryKeyRelatedField(
+    specializations = CatalogueSpecializationField(
         many=True,
-        queryset=Specialization.objects.all(),
         required=True,
     )
     attachments = serializers.ListField(
@@ -664,10 +782,11 @@ class QuestionCreateUpdateSerializer(_CommaTolerantSpecsMixin, serializers.Model
             'and validated for size: image (5 MB), video (50 MB), audio (15 MB), pdf (10 MB).'
         ),
     )
+    uploads = _uploads_field()
 
     class Meta:
         model = Question
-        fields = ['id', 'content', 'specializations', 'is_resolved', 'attachments']
+        fields = ['id', 'content', 'specializations', 'is_resolved', 'attachments', 'uploads']
         read_only_fields = ['id']
 
     def validate_specializations(self, value):
@@ -688,15 +807,20 @@ class QuestionCreateUpdateSerializer(_CommaTolerantSpecsMixin, serializers.Model
             classify_and_validate_attachment(f)
         return real_files
 
+    def validate(self, data):
+        return _validate_attachment_total(data)
+
     def create(self, validated_data):
         files = validated_data.pop('attachments', [])
-        question = super().create(validated_data)
-        if files:
-            _attach_files_to(question, files)
+        uploads = validated_data.pop('uploads', [])
+        with upload_scope():
+            question = super().create(validated_data)
+            _attach_all(question, files, uploads)
         return question
 
     def update(self, instance, validated_data):
         validated_data.pop('attachments', None)
+        validated_data.pop('uploads', None)
         return super().update(instance, validated_data)
 
 
@@ -716,10 +840,11 @@ class AnswerCreateSerializer(serializers.ModelSerializer):
             'Send via multipart/form-data only.'
         ),
     )
+    uploads = _uploads_field()
 
     class Meta:
         model = Answer
-        fields = ['id', 'content', 'attachments']
+        fields = ['id', 'content', 'attachments', 'uploads']
         read_only_fields = ['id']
 
     def validate_content(self, value):
@@ -733,11 +858,15 @@ class AnswerCreateSerializer(serializers.ModelSerializer):
             classify_and_validate_attachment(f)
         return real_files
 
+    def validate(self, data):
+        return _validate_attachment_total(data)
+
     def create(self, validated_data):
         files = validated_data.pop('attachments', [])
-        answer = super().create(validated_data)
-        if files:
-            _attach_files_to(answer, files)
+        uploads = validated_data.pop('uploads', [])
+        with upload_scope():
+            answer = super().create(validated_data)
+            _attach_all(answer, files, uploads)
         return answer
 
 
@@ -810,13 +939,7 @@ class PostDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_comments(self, obj):
-        from django.db.models import Count
-        top_level = (
-            obj.comments
-               .filter(parent_comment__isnull=True)
-               .annotate(replies_count=Count('replies'))
-               .order_by('created_at')[:10]
-        )
+        top_level = load_thread(obj.comments.all(), 'parent_comment')
         return TopLevelCommentWithRepliesSerializer(top_level, many=True, context=self.context).data
 
 
@@ -825,9 +948,8 @@ class PostCreateUpdateSerializer(_CommaTolerantSpecsMixin, serializers.ModelSeri
 
     Mirrors QuestionCreateUpdateSerializer (no resolved flag). Accepts content,
     1–3 specializations, and optional attachments via multipart."""
-    specializations = serializers.PrimaryKeyRelatedField(
+    specializations = CatalogueSpecializationField(
         many=True,
-        queryset=Specialization.objects.all(),
         required=True,
     )
     attachments = serializers.ListField(
@@ -841,10 +963,11 @@ class PostCreateUpdateSerializer(_CommaTolerantSpecsMixin, serializers.ModelSeri
             'and validated for size: image (5 MB), video (50 MB), audio (15 MB), pdf (10 MB).'
         ),
     )
+    uploads = _uploads_field()
 
     class Meta:
         model = Post
-        fields = ['id', 'content', 'specializations', 'attachments']
+        fields = ['id', 'content', 'specializations', 'attachments', 'uploads']
         read_only_fields = ['id']
 
     def validate_specializations(self, value):
@@ -865,15 +988,20 @@ class PostCreateUpdateSerializer(_CommaTolerantSpecsMixin, serializers.ModelSeri
             classify_and_validate_attachment(f)
         return real_files
 
+    def validate(self, data):
+        return _validate_attachment_total(data)
+
     def create(self, validated_data):
         files = validated_data.pop('attachments', [])
-        post = super().create(validated_data)
-        if files:
-            _attach_files_to(post, files)
+        uploads = validated_data.pop('uploads', [])
+        with upload_scope():
+            post = super().create(validated_data)
+            _attach_all(post, files, uploads)
         return post
 
     def update(self, instance, validated_data):
         validated_data.pop('attachments', None)
+        validated_data.pop('uploads', None)
         return super().update(instance, validated_data)
 
 
@@ -921,7 +1049,10 @@ class TopLevelCommentWithRepliesSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(CommentSerializer(many=True))
     def get_replies(self, obj):
-        first_replies = obj.replies.all()[:2]
+        # Populated by load_thread(); fall back to a query otherwise.
+        first_replies = getattr(obj, 'first_replies', None)
+        if first_replies is None:
+            first_replies = obj.replies.all()[:2]
         return CommentSerializer(first_replies, many=True, context=self.context).data
 
 
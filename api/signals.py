@@ -1,9 +1,62 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import User, PointsWallet
+from django.contrib.contenttypes.models import ContentType
+from .models import (
+    User, PointsWallet, Specialization,
+    Question, Answer, Post, Comment, PostReaction, Attachment,
+)
+from .catalogue import invalidate_catalogue
+from .authentication import invalidate_cached_user
+from .response_cache import POSTS, QUESTIONS, bump_generation
 
 
 @receiver(post_save, sender=User)
 def create_user_wallet(sender, instance, created, **kwargs):
     if created:
         PointsWallet.objects.create(user=instance, balance=0)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    # Same now-and-on-commit pattern as the catalogue below.
+    invalidate_cached_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_cached_user(instance.pk))
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Specialization)
+def invalidate_specialization_catalogue(sender, **kwargs):
+    # Once now so this request sees its own change, and again on commit in
+    # case another worker re-cached the pre-commit rows in between.
+    invalidate_catalogue()
+    transaction.on_commit(invalidate_catalogue)
+    # Specialization names are embedded in question and post payloads.
+    bump_generation()
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def invalidate_question_responses(sender, **kwargs):
+    bump_generation(QUESTIONS)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=PostReaction)
+@receiver(post_delete, sender=PostReaction)
+def invalidate_post_responses(sender, **kwargs):
+    bump_generation(POSTS)
+
+
+@receiver(post_delete, sender=Attachment)
+def invalidate_attachment_parent_responses(sender, instance, **kwargs):
+    # Attachments are created with bulk_create alongside a parent save, which
+    # already bumps; only deletes need handling here.
+    model = ContentType.objects.get_for_id(instance.content_type_id).model
+    bump_generation(POSTS if model == 'post' else QUESTIONS)
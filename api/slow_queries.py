@@ -0,0 +1,252 @@
+"""Slow-query capture with sampled EXPLAIN.
+
+While a request is measured (api/instrumentation.py), every statement that
+takes `SLOW_QUERY_THRESHOLD_MS` or longer is recorded with:
+
+- its fingerprint: a hash of the statement with placeholders, literals and
+  `IN (...)` / `VALUES` lists collapsed, so `?specialization=` feeds with
+  different ids are one shape and the `.distinct()` variant is another;
+- the SQL and parameters (truncated), duration, route and time.
+
+The first time a fingerprint is seen — once per `EXPLAIN_TTL` across all
+workers, claimed with `cache.add` — a read-only SELECT is re-run under
+`EXPLAIN (ANALYZE, BUFFERS)` on PostgreSQL (`EXPLAIN QUERY PLAN` on SQLite)
+and the plan is stored with the entry. ANALYZE runs the statement a second
+time; that cost is paid once per shape, not per slow query. It is paid
+inline, in the request that hit the slow query, rather than on the job
+queue: the plan then reflects the same transaction and data the slow run
+saw. To keep that second run bounded, PostgreSQL gets a `SET LOCAL
+statement_timeout` of twice the captured duration (at least
+`MIN_EXPLAIN_TIMEOUT_MS`) first; a plan cut off by it is recorded as an
+`explain_error`. The EXPLAIN goes through a raw DB-API cursor, so it stays
+out of query counts and execute wrappers, and runs in a savepoint (its own
+transaction under autocommit) that is always rolled back, so neither a
+failure nor the timeout outlives it.
+
+Entries go to a ring buffer of the newest `SLOW_QUERY_LOG_SIZE`. With the
+Redis cache it is one Redis list (LPUSH + LTRIM) that all workers share.
+Otherwise it is a deque in this process. Staff read it at
+`GET /api/admin/slow-queries/`; `manage.py slow_queries` dumps it. Each
+capture is also logged at WARNING on `api.slow_queries`."""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+RING_KEY = 'slow_queries'
+EXPLAINED_KEY_PREFIX = 'slow_query_explained_'
+EXPLAIN_TTL = 24 * 3600
+MAX_SQL_CHARS = 4000
+MAX_PARAM_CHARS = 200
+MAX_PARAMS = 50
+EXPLAIN_TIMEOUT_FACTOR = 2
+MIN_EXPLAIN_TIMEOUT_MS = 1000
+
+_EXPLAIN_PREFIX = {
+    'postgresql': 'EXPLAIN (ANALYZE, BUFFERS) ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+_SAVEPOINT = 'slow_query_explain'
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w."])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_LIST = re.compile(r'\(\?(?:, \?)*\)')
+_ROWS = re.compile(r'\(\.\.\.\)(?:, \(\.\.\.\))+')
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """The shape of `sql`: literals and placeholders as `?`, lists of them
+    as `(...)`, whitespace collapsed."""
+    shape = _SPACE.sub(' ', sql).strip()
+    shape = _STRING.sub('?', shape)
+    shape = _NUMBER.sub('?', shape)
+    shape = _PLACEHOLDER.sub('?', shape)
+    shape = _LIST.sub('(...)', shape)
+    return _ROWS.sub('(...), ...', shape)
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:16]
+
+
+def threshold_ms():
+    """The capture threshold, or None when capture is off (negative)."""
+    threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None)
+    return None if threshold is None or threshold < 0 else threshold
+
+
+def _truncate(text, limit):
+    return text if len(text) <= limit else text[:limit] + '…'
+
+
+def _params(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: _truncate(repr(v), MAX_PARAM_CHARS) for k, v in list(params.items())[:MAX_PARAMS]}
+    return [_truncate(repr(v), MAX_PARAM_CHARS) for v in list(params)[:MAX_PARAMS]]
+
+
+def _explainable(sql, many):
+    head = sql.lstrip()[:6].upper()
+    upper = sql.upper()
+    return (
+        not many and head == 'SELECT'
+        and ' FOR UPDATE' not in upper and ' FOR SHARE' not in upper and ' FOR NO KEY UPDATE' not in upper
+    )
+
+
+def explain(connection, sql, params, timeout_ms=None):
+    """`(plan, error)` for `sql`, run on a raw cursor of `connection`, cut off
+    after `timeout_ms` on PostgreSQL."""
+    prefix = _EXPLAIN_PREFIX.get(connection.vendor)
+    if prefix is None:
+        return None, f'EXPLAIN is not supported on {connection.vendor}.'
+    in_transaction = not connection.get_autocommit()
+    timeout = timeout_ms is not None and connection.vendor == 'postgresql'
+    rows = error = None
+    cursor = connection.create_cursor()
+    try:
+        # SET LOCAL needs a transaction and survives RELEASE SAVEPOINT, so
+        # the EXPLAIN's savepoint or transaction is rolled back even when it
+        # succeeds; a read-only SELECT leaves nothing worth keeping.
+        if in_transaction:
+            cursor.execute(f'SAVEPOINT {_SAVEPOINT}')
+        elif timeout:
+            cursor.execute('BEGIN')
+        try:
+            if timeout:
+                cursor.execute(f'SET LOCAL statement_timeout = {int(timeout_ms)}')
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+        except connection.Database.Error as exc:
+            error = str(exc).strip()
+        if in_transaction:
+            cursor.execute(f'ROLLBACK TO SAVEPOINT {_SAVEPOINT}')
+            cursor.execute(f'RELEASE SAVEPOINT {_SAVEPOINT}')
+        elif timeout:
+            cursor.execute('ROLLBACK')
+    finally:
+        cursor.close()
+    if error is not None:
+        return None, error
+    # PostgreSQL returns one line per row; SQLite's detail is the last column.
+    return '\n'.join(str(row[-1]) for row in rows), None
+
+
+# fingerprint -> time.monotonic() of our last claim; saves a cache round
+# trip per repeat, and lapses with the shared claim so a shape whose plan
+# may have changed is explained again.
+_explained = {}
+
+
+def _first_sighting(shape_id):
+    now = time.monotonic()
+    claimed = _explained.get(shape_id)
+    if claimed is not None and now - claimed < EXPLAIN_TTL:
+        return False
+    if len(_explained) > 10000:
+        _explained.clear()
+    _explained[shape_id] = now
+    return cache.add(f'{EXPLAINED_KEY_PREFIX}{shape_id}', 1, timeout=EXPLAIN_TTL)
+
+
+def capture(connection, sql, params, many, duration_ms, route=''):
+    """Record one slow statement, explaining it if its shape is new."""
+    shape_id = fingerprint(sql)
+    plan = error = None
+    if getattr(settings, 'SLOW_QUERY_EXPLAIN', True) and _explainable(sql, many) and _first_sighting(shape_id):
+        timeout_ms = max(EXPLAIN_TIMEOUT_FACTOR * duration_ms, MIN_EXPLAIN_TIMEOUT_MS)
+        plan, error = explain(connection, sql, params, timeout_ms)
+    entry = {
+        'fingerprint': shape_id,
+        'statement': _truncate(normalize(sql), MAX_SQL_CHARS),
+        'sql': _truncate(sql, MAX_SQL_CHARS),
+        'params': None if many else _params(params),
+        'duration_ms': round(duration_ms, 2),
+        'route': route,
+        'database': connection.alias,
+        'at': timezone.now().isoformat(),
+        'plan': plan,
+        'explain_error': error,
+    }
+    get_ring().push(entry)
+    logger.warning(
+        'Slow query (%.0f ms, %s) on %s: %s', duration_ms, shape_id, route or '-', entry['statement'][:200],
+        extra={'fingerprint': shape_id, 'duration_ms': entry['duration_ms'], 'route': route},
+    )
+    return entry
+
+
+class LocalRing:
+    """The newest `size` entries, in this process."""
+
+    shared = False
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def push(self, entry):
+        with self._lock:
+            self._entries.appendleft(entry)
+
+    def entries(self):
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisRing:
+    """The newest `size` entries, in one Redis list shared by all workers."""
+
+    shared = True
+
+    def __init__(self, backend, size):
+        self.size = size
+        self._key = backend.make_and_validate_key(RING_KEY)
+        self._client = backend._cache.get_client(self._key, write=True)
+
+    def push(self, entry):
+        pipe = self._client.pipeline()
+        pipe.lpush(self._key, json.dumps(entry))
+        pipe.ltrim(self._key, 0, self.size - 1)
+        pipe.execute()
+
+    def entries(self):
+        return [json.loads(raw) for raw in self._client.lrange(self._key, 0, -1)]
+
+    def clear(self):
+        self._client.delete(self._key)
+
+
+_local_ring = None
+
+
+def get_ring():
+    global _local_ring
+    size = getattr(settings, 'SLOW_QUERY_LOG_SIZE', 200)
+    backend = caches['default']
+    if isinstance(backend, RedisCache):
+        return RedisRing(backend, size)
+    if _local_ring is None or _local_ring.size != size:
+        _local_ring = LocalRing(size)
+    return _local_ring
@@ -0,0 +1,127 @@
+"""Storage URL resolution for serializers.
+
+`FieldFile.url` calls the storage backend every time. With Azure and
+`AZURE_URL_EXPIRATION_SECS` set, that is a SAS signature per call: a feed
+page of 20 posts with 4 attachments each, plus an author avatar and thumbnail
+variants per row, signs well over a hundred URLs — many of them for the same
+few avatars.
+
+`storage_url()` resolves through two layers:
+
+- a per-request memo (kept on the request object), so each blob is resolved
+  once per response however many rows share it;
+- a process-wide TTL cache keyed by storage, blob name and the storage's
+  signed-URL expiry. A signed URL is reused for at most half its lifetime,
+  so whatever we hand out is valid for at least `expiry / 2` seconds.
+  Unsigned URLs (local storage, public containers) never change and live for
+  `STORAGE_URL_CACHE_TTL`.
+
+The cache is dropped whenever storage settings change."""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.functional import LazyObject, empty
+
+from .instrumentation import record_cache
+
+
+class URLCache:
+    """Thread-safe LRU of `key -> url` with a per-entry deadline."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            url, deadline = entry
+            if deadline <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return url
+
+    def set(self, key, url, ttl, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._entries[key] = (url, now + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+url_cache = URLCache(getattr(settings, 'STORAGE_URL_CACHE_SIZE', 10000))
+
+
+@receiver(setting_changed)
+def _clear_url_cache(setting, **kwargs):
+    if setting in ('STORAGES', 'MEDIA_URL', 'STORAGE_URL_CACHE_TTL') or setting.startswith('AZURE_'):
+        url_cache.clear()
+
+
+def _request_memo(request):
+    if request is None:
+        return None
+    memo = getattr(request, '_storage_urls', None)
+    if memo is None:
+        memo = {}
+        request._storage_urls = memo
+    return memo
+
+
+def _storage_key(storage):
+    # `default_storage` is a lazy proxy that outlives settings changes; key on
+    # the backend it currently wraps.
+    if isinstance(storage, LazyObject):
+        if storage._wrapped is empty:
+            storage._setup()
+        storage = storage._wrapped
+    return id(storage)
+
+
+def storage_url(storage, name, request=None):
+    """`storage.url(name)`, memoized per request and cached across requests
+    for as long as the URL stays valid."""
+    expiry = getattr(storage, 'expiration_secs', None)
+    key = (_storage_key(storage), name, expiry)
+
+    memo = _request_memo(request)
+    if memo is not None and key in memo:
+        return memo[key]
+
+    url = url_cache.get(key)
+    record_cache('storage_url', url is not None)
+    if url is None:
+        url = storage.url(name)
+        ttl = getattr(settings, 'STORAGE_URL_CACHE_TTL', 3600)
+        if expiry:
+            ttl = min(ttl, expiry / 2)
+        url_cache.set(key, url, ttl)
+
+    if memo is not None:
+        memo[key] = url
+    return url
+
+
+def file_url(field_file, request=None):
+    """URL of a FieldFile, or None if it is empty."""
+    if not field_file:
+        return None
+    return storage_url(field_file.storage, field_file.name, request)
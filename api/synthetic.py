@@ -0,0 +1,331 @@
+"""Synthetic data for load tests and query-plan work.
+
+`generate()` fills the database with users, questions, answers and replies,
+posts, reactions, comments and replies, and certificates, shaped like a
+live site rather than a uniform grid:
+
+- per-item fan-out (answers per question, likes per post, ...) is drawn
+  from a `Distribution` — `powerlaw` gives the long tail real traffic has,
+  where most posts get a handful of likes and a few get thousands;
+- authorship is Zipf-skewed, so a few prolific users own most content and
+  their profile / feed queries are the heavy ones;
+- timestamps are spread over a window ending now, children after parents.
+
+Rows are built in memory with explicit ids and timestamps and written in
+batches, parents before children. On PostgreSQL each batch goes through
+`COPY ... FROM STDIN` (search vectors are filled in by the insert trigger
+as usual); elsewhere it uses `bulk_create`. The denormalized counters are
+set from the generated fan-out, so `reconcile_counters` finds nothing to
+fix. Signals don't fire for bulk writes, so wallets are written here and
+the response-cache generations are bumped once at the end.
+
+Every generated user gets the same password and a `synth<tag>.` email
+prefix, so a run can be found (and deleted) again by its tag."""
+
+import io
+import itertools
+import json
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import (
+    Answer, Certificate, Comment, PointsWallet, Post, PostReaction, Question,
+    Specialization, User, UserSpecialization,
+)
+from .response_cache import bump_generation
+
+
+SYNTHETIC_PASSWORD = 'Synthetic-pass-1'
+
+_WORDS = (
+    'django api index query cache latency python postgres model view serializer '
+    'feed thread reply answer question deploy azure docker queue worker token '
+    'request response migration schema join plan vacuum replica pool timeout '
+    'frontend backend mobile design data security cloud test review release'
+).split()
+
+
+class Distribution:
+    """A non-negative integer distribution parsed from a spec string:
+
+    - `fixed:N` — always N;
+    - `uniform:LO:HI` — uniform over LO..HI inclusive;
+    - `powerlaw:ALPHA[:MAX]` — discrete Pareto with tail exponent ALPHA,
+      starting at 0 and capped at MAX. Smaller ALPHA means a heavier tail;
+      around 1.2 a few items take most of the mass."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        kind, _, rest = spec.partition(':')
+        args = [float(a) for a in rest.split(':')] if rest else []
+        if kind == 'fixed' and len(args) == 1:
+            n = int(args[0])
+            self._sample = lambda rng: n
+        elif kind == 'uniform' and len(args) == 2:
+            lo, hi = int(args[0]), int(args[1])
+            self._sample = lambda rng: rng.randint(lo, hi)
+        elif kind == 'powerlaw' and len(args) in (1, 2) and args[0] > 0:
+            alpha = args[0]
+            cap = int(args[1]) if len(args) == 2 else None
+            self._sample = lambda rng: _capped(int(rng.paretovariate(alpha)) - 1, cap)
+        else:
+            raise ValueError(
+                f'Bad distribution {spec!r}; expected fixed:N, uniform:LO:HI '
+                f'or powerlaw:ALPHA[:MAX].'
+            )
+
+    def sample(self, rng):
+        return self._sample(rng)
+
+    def __repr__(self):
+        return f'Distribution({self.spec!r})'
+
+
+def _capped(value, cap):
+    return value if cap is None else min(value, cap)
+
+
+DEFAULT_DISTRIBUTIONS = {
+    'answers': 'powerlaw:1.5:200',
+    'replies': 'powerlaw:2.2:20',
+    'comments': 'powerlaw:1.5:200',
+    'comment_replies': 'powerlaw:2.2:20',
+    'likes': 'powerlaw:1.2:5000',
+    'dislikes': 'powerlaw:2.0:500',
+    'certificates': 'uniform:0:3',
+    'specializations': 'uniform:1:3',
+}
+
+
+class _Writer:
+    """Buffers model instances and writes them in batches. Models are
+    flushed in the order they were first added, which is parent-first."""
+
+    def __init__(self, batch_size, use_copy):
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.pending = {}
+        self.written = {}
+        self._size = 0
+
+    def add(self, obj):
+        self.pending.setdefault(type(obj), []).append(obj)
+        self._size += 1
+        if self._size >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with transaction.atomic():
+            for model, objs in self.pending.items():
+                if not objs:
+                    continue
+                if self.use_copy:
+                    _copy(model, objs)
+                else:
+                    model.objects.bulk_create(objs, batch_size=self.batch_size)
+                self.written[model] = self.written.get(model, 0) + len(objs)
+                objs.clear()
+        self._size = 0
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        value = 't' if value else 'f'
+    elif isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    else:
+        value = str(value)
+    return (value.replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def _copy(model, objs):
+    """Write `objs` with PostgreSQL's COPY in text format. As with
+    `bulk_create`, rows whose auto-increment pk is unset leave that column
+    out, so the database assigns it."""
+    fields = model._meta.concrete_fields
+    auto = model._meta.auto_field
+    if auto is None:
+        _copy_rows(model, objs, fields)
+        return
+    with_pk = [obj for obj in objs if obj.pk is not None]
+    without_pk = [obj for obj in objs if obj.pk is None]
+    if with_pk:
+        _copy_rows(model, with_pk, fields)
+    if without_pk:
+        _copy_rows(model, without_pk, [f for f in fields if f is not auto])
+
+
+def _copy_rows(model, objs, fields):
+    buffer = io.StringIO()
+    for obj in objs:
+        buffer.write('\t'.join(_copy_value(f.get_prep_value(f.pre_save(obj, True))) for f in fields))
+        buffer.write('\n')
+    buffer.seek(0)
+    columns = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN', buffer)
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """Let `bulk_create` keep the generated created_at / updated_at instead
+    of stamping every row with now()."""
+    fields = [
+        (f, f.auto_now, f.auto_now_add)
+        for model in models
+        for f in model._meta.concrete_fields
+        if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+    ]
+    for f, _, _ in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in fields:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _zipf_weights(n, skew):
+    return list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(n)))
+
+
+def _text(rng, words):
+    return ' '.join(rng.choices(_WORDS, k=words)).capitalize() + '.'
+
+
+def generate(*, users, questions, posts, distributions=None, author_skew=1.0,
+             days=365, batch_size=5000, seed=None, tag=None, use_copy=None, log=None):
+    """Generate one synthetic data set; returns `(tag, {model: rows})`."""
+    rng = random.Random(seed)
+    dist = {
+        name: Distribution(spec)
+        for name, spec in {**DEFAULT_DISTRIBUTIONS, **(distributions or {})}.items()
+    }
+    tag = f'{rng.randrange(10_000):04d}' if tag is None else tag
+    if users <= 0 and (questions > 0 or posts > 0):
+        raise ValueError('Questions and posts need authors; generate at least one user.')
+    if not (len(tag) == 4 and tag.isdigit()):
+        raise ValueError(f'Tag must be four digits, got {tag!r}.')
+    if use_copy is None:
+        use_copy = connection.vendor == 'postgresql'
+    if User.objects.filter(email__startswith=f'synth{tag}.').exists():
+        raise ValueError(f'Synthetic data tagged {tag!r} already exists; pick another tag.')
+
+    log = log or (lambda message: None)
+    writer = _Writer(batch_size, use_copy)
+    now = timezone.now()
+    span = days * 86400
+    specs = list(Specialization.objects.values_list('pk', flat=True))
+    password = make_password(SYNTHETIC_PASSWORD)
+
+    def when(after=None):
+        start = now - timedelta(seconds=span) if after is None else after
+        return start + (now - start) * rng.random()
+
+    def pick_specs():
+        return rng.sample(specs, min(len(specs), dist['specializations'].sample(rng))) if specs else []
+
+    with _explicit_timestamps(User, Question, Answer, Post, PostReaction, Comment):
+        started = time.perf_counter()
+        user_ids = []
+        for n in range(users):
+            joined = when()
+            user = User(
+                email=f'synth{tag}.{n}@example.com',
+                username=f's{tag}{n:0>7x}', password=password,
+                first_name='Synthetic', last_name=f'User {n}',
+                phone_number=f'+19{tag}{n:08d}',
+                created_at=joined, updated_at=joined,
+            )
+            writer.add(user)
+            writer.add(PointsWallet(user=user, balance=0))
+            for spec in pick_specs():
+                writer.add(UserSpecialization(user=user, specialization_id=spec))
+            for _ in range(dist['certificates'].sample(rng)):
+                writer.add(Certificate(
+                    user=user, title=_text(rng, 4), issuer=rng.choice(_WORDS).title(),
+                    issue_date=joined.date(), certificate_url=f'https://certs.example.com/{uuid.uuid4()}',
+                ))
+            user_ids.append(user.pk)
+        log(f'users: {users} in {time.perf_counter() - started:.1f}s')
+
+        weights = _zipf_weights(len(user_ids), author_skew)
+
+        def authors(k=1):
+            return rng.choices(user_ids, cum_weights=weights, k=k)
+
+        started = time.perf_counter()
+        for _ in range(questions):
+            created = when()
+            question = Question(author_id=authors()[0], content=_text(rng, rng.randint(12, 80)),
+                                created_at=created, updated_at=created)
+            answers = []
+            for author in authors(dist['answers'].sample(rng)):
+                at = when(created)
+                answers.append(Answer(question=question, author_id=author, content=_text(rng, rng.randint(8, 60)),
+                                      created_at=at, updated_at=at))
+            replies = []
+            for answer in answers:
+                for author in authors(dist['replies'].sample(rng)):
+                    at = when(answer.created_at)
+                    replies.append(Answer(question=question, author_id=author, parent_answer=answer,
+                                          content=_text(rng, rng.randint(4, 30)), created_at=at, updated_at=at))
+            question.answers_count = len(answers) + len(replies)
+            writer.add(question)
+            for spec in pick_specs():
+                writer.add(Question.specializations.through(question=question, specialization_id=spec))
+            for answer in itertools.chain(answers, replies):
+                writer.add(answer)
+        log(f'questions: {questions} in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        for _ in range(posts):
+            created = when()
+            post = Post(author_id=authors()[0], content=_text(rng, rng.randint(12, 120)),
+                        created_at=created, updated_at=created)
+            likes = dist['likes'].sample(rng)
+            dislikes = dist['dislikes'].sample(rng)
+            reactors = rng.sample(user_ids, min(len(user_ids), likes + dislikes))
+            likes = min(likes, len(reactors))
+            comments = []
+            for author in authors(dist['comments'].sample(rng)):
+                at = when(created)
+                comments.append(Comment(post=post, author_id=author, content=_text(rng, rng.randint(4, 40)),
+                                        created_at=at, updated_at=at))
+            replies = []
+            for comment in comments:
+                for author in authors(dist['comment_replies'].sample(rng)):
+                    at = when(comment.created_at)
+                    replies.append(Comment(post=post, author_id=author, parent_comment=comment,
+                                           content=_text(rng, rng.randint(4, 25)), created_at=at, updated_at=at))
+            post.likes_count = likes
+            post.dislikes_count = len(reactors) - likes
+            post.comments_count = len(comments) + len(replies)
+            writer.add(post)
+            for spec in pick_specs():
+                writer.add(Post.specializations.through(post=post, specialization_id=spec))
+            for n, user_id in enumerate(reactors):
+                at = when(created)
+                writer.add(PostReaction(user_id=user_id, post=post, reaction='like' if n < likes else 'dislike',
+                                        created_at=at, updated_at=at))
+            for comment in itertools.chain(comments, replies):
+                writer.add(comment)
+        log(f'posts: {posts} in {time.perf_counter() - started:.1f}s')
+
+        writer.flush()
+
+    bump_generation()
+    return tag, writer.written
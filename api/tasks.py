@@ -0,0 +1,62 @@
+"""Functions run by the background job queue (see api/jobs.py).
+
+Jobs must raise on failure so the queue can retry them."""
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.utils import timezone
+
+from .authentication import invalidate_cached_user
+from .mail import get_pool
+from .models import Attachment, User
+from .response_cache import bump_generation
+from .thumbnails import delete_variants, render_variants
+
+
+def send_email(subject, message, recipient):
+    send_email_batch([
+        {'subject': subject, 'message': message, 'recipient': recipient},
+    ])
+
+
+def send_email_batch(emails):
+    """Send several `{subject, message, recipient}` emails over one pooled
+    SMTP connection."""
+    get_pool().send_messages([
+        EmailMessage(
+            subject=email['subject'],
+            body=email['message'],
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[email['recipient']],
+        )
+        for email in emails
+    ])
+
+
+def make_attachment_variants(attachment_ids):
+    """WebP thumbnails for image attachments (see api/thumbnails.py)."""
+    for attachment in Attachment.objects.filter(pk__in=attachment_ids, kind='image'):
+        if attachment.variants:
+            continue  # a retried batch; this one already finished
+        variants = render_variants(attachment.file)
+        if not Attachment.objects.filter(pk=attachment.pk).update(variants=variants):
+            delete_variants(attachment.file.storage, variants)  # deleted meanwhile
+    bump_generation()
+
+
+def make_profile_image_variants(user_id, name):
+    """WebP thumbnails for a profile image, unless it has been replaced since."""
+    user = User.objects.filter(pk=user_id, profile_image=name).first()
+    if user is None:
+        return
+    variants = render_variants(user.profile_image)
+    # `updated_at` moves too: it is part of the ETag of everything the user
+    # authored (api/conditional.py), and those bodies now carry the variants.
+    updated = User.objects.filter(pk=user_id, profile_image=name).update(
+        profile_image_variants=variants, updated_at=timezone.now(),
+    )
+    if updated:
+        invalidate_cached_user(user_id)
+        bump_generation()
+    else:
+        delete_variants(user.profile_image.storage, variants)
@@ -5,6 +5,8 @@ from rest_framework.test import APIClient
 from rest_framework import status
 from unittest.mock import patch
 from .models import User, Specialization, UserSpecialization, PointsWallet
+from .catalogue import get_catalogue
+from .tests_attachments import TempMediaRootMixin
 import uuid
 
 
@@ -774,11 +776,62 @@ class UserSpecializationTests(TestCase):
         # Should either succeed with 1 entry or return 400
         self.assertIn(response.status_code, [status.HTTP_200_OK, status.HTTP_400_BAD_REQUEST])
 
+    def test_put_keeps_rows_that_did_not_change(self):
+        """PUT only deletes removed IDs and inserts added ones"""
+        kept = UserSpecialization.objects.create(user=self.user, specialization=self.spec1)
+        UserSpecialization.objects.create(user=self.user, specialization=self.spec2)
+        self.client.force_authenticate(user=self.user)
+
+        data = {'specialization_ids': [str(self.spec1.id), str(self.spec3.id)]}
+        response = self.client.put(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [s['name'] for s in response.data['specializations']],
+            ['Backend Development', 'Machine Learning'],
+        )
+        self.assertTrue(UserSpecialization.objects.filter(pk=kept.pk).exists())
+        self.assertEqual(
+            set(self.user.specializations.values_list('id', flat=True)),
+            {self.spec1.id, self.spec3.id},
+        )
+
+    def test_put_query_count_does_not_grow_with_selection(self):
+        """Replacing 10 specializations costs the same statements as replacing 1"""
+        specs = [
+            Specialization.objects.create(name=f'Spec {i}', description='')
+            for i in range(10)
+        ]
+        UserSpecialization.objects.create(user=self.user, specialization=self.spec1)
+        self.client.force_authenticate(user=self.user)
+        get_catalogue()
+
+        # SAVEPOINT, DELETE, INSERT, UPDATE users, RELEASE SAVEPOINT
+        with self.assertNumQueries(5):
+            response = self.client.put(
+                self.url,
+                {'specialization_ids': [str(s.id) for s in specs]},
+                format='json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['specializations']), 10)
+        self.assertEqual(self.user.specializations.count(), 10)
+
+    def test_skip_clears_existing_specializations(self):
+        """PATCH skip leaves the user with no specializations"""
+        UserSpecialization.objects.create(user=self.user, specialization=self.spec1)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.patch(self.url, {'skip': True}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['specializations'], [])
+        self.assertEqual(self.user.specializations.count(), 0)
+
 
 # ============================================================
 # PROFILE UPDATE TESTS
 # ============================================================
-class ProfileUpdateTests(TestCase):
+class ProfileUpdateTests(TempMediaRootMixin, TestCase):
     """Tests for PATCH /api/users/me/"""
 
     def setUp(self):
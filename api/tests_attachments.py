@@ -8,8 +8,10 @@ Attachments are sent inline as part of multipart create requests on:
 The single new dedicated endpoint is DELETE /api/attachments/{id}/."""
 
 import io
+import shutil
+import tempfile
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -35,12 +37,42 @@ def _spec(name='Backend'):
     return Specialization.objects.get_or_create(name=name, defaults={'description': ''})[0]
 
 
+# Leading bytes of a real file of each type; attachments are sniffed.
+SIGNATURES = {
+    'image/jpeg': b'\xff\xd8\xff\xe0\x00\x10JFIF\x00',
+    'image/png': b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR',
+    'image/webp': b'RIFF\x00\x00\x00\x00WEBPVP8 ',
+    'video/mp4': b'\x00\x00\x00\x18ftypisom\x00\x00\x02\x00',
+    'video/quicktime': b'\x00\x00\x00\x14ftypqt  \x00\x00\x00\x00',
+    'audio/mpeg': b'ID3\x04\x00\x00\x00\x00\x00\x00',
+    'audio/mp4': b'\x00\x00\x00\x20ftypM4A \x00\x00\x00\x00',
+    'application/pdf': b'%PDF-1.7\n',
+    'application/x-msdownload': b'MZ\x90\x00\x03\x00',
+}
+
+
+class TempMediaRootMixin:
+    """Store the uploads a test class makes in a throwaway MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        cls.addClassCleanup(media.disable)
+
+
 def _file(name, content_type, size_bytes=1024):
-    """Build a SimpleUploadedFile of the given size and MIME type."""
-    return SimpleUploadedFile(name, b'x' * size_bytes, content_type=content_type)
+    """Build a SimpleUploadedFile of the given size and MIME type, starting
+    with that type's signature."""
+    signature = SIGNATURES.get(content_type, b'')
+    content = signature + b'x' * (size_bytes - len(signature))
+    return SimpleUploadedFile(name, content, content_type=content_type)
 
 
-class AttachmentImageTests(TestCase):
+class AttachmentImageTests(TempMediaRootMixin, TestCase):
     def setUp(self):
         cache.clear()
         self.client = APIClient()
@@ -84,7 +116,7 @@ class AttachmentImageTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
 
-class AttachmentVideoTests(TestCase):
+class AttachmentVideoTests(TempMediaRootMixin, TestCase):
     def setUp(self):
         cache.clear()
         self.client = APIClient()
@@ -121,7 +153,7 @@ class AttachmentVideoTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
 
-class AttachmentAudioTests(TestCase):
+class AttachmentAudioTests(TempMediaRootMixin, TestCase):
     def setUp(self):
         cache.clear()
         self.client = APIClient()
@@ -158,7 +190,7 @@ class AttachmentAudioTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
 
-class AttachmentPdfTests(TestCase):
+class AttachmentPdfTests(TempMediaRootMixin, TestCase):
     def setUp(self):
         cache.clear()
         self.client = APIClient()
@@ -191,7 +223,7 @@ class AttachmentPdfTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
 
-class AttachmentValidationTests(TestCase):
+class AttachmentValidationTests(TempMediaRootMixin, TestCase):
     def setUp(self):
         cache.clear()
         self.client = APIClient()
@@ -296,7 +328,7 @@ class AttachmentValidationTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class AttachmentDeleteTests(TestCase):
+class AttachmentDeleteTests(TempMediaRootMixin, TestCase):
     def setUp(self):
         cache.clear()
         self.client = APIClient()
@@ -350,7 +382,7 @@ class AttachmentDeleteTests(TestCase):
         self.assertFalse(Attachment.objects.filter(id=self.attachment_id).exists())
 
 
-class AttachmentReadIntegrationTests(TestCase):
+class AttachmentReadIntegrationTests(TempMediaRootMixin, TestCase):
     """Verify attachments are exposed correctly in question/answer/reply read responses."""
 
     def setUp(self):
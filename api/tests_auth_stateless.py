@@ -0,0 +1,158 @@
+"""Tests for StatelessJWTAuthentication: `request.user` built from token
+claims, with the User row loaded lazily through a short-TTL cache."""
+
+import copy
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import ClaimsUser, get_cached_user, user_cache_key
+from .models import Post, Specialization, User
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='StatelessPass123!',
+        first_name='S',
+        last_name='User',
+        phone_number=phone,
+    )
+
+
+def _user_queries(captured):
+    return [q['sql'] for q in captured.captured_queries if 'FROM "users"' in q['sql']]
+
+
+class ClaimsUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = _make_user('claims@example.com', 'claimsuser', '+1940000001')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_claims_are_answered_without_a_query(self):
+        proxy = ClaimsUser(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(proxy.id, self.user.pk)
+            self.assertEqual(proxy.pk, self.user.pk)
+            self.assertTrue(proxy)
+            self.assertTrue(proxy.is_authenticated)
+            self.assertFalse(proxy.is_anonymous)
+            self.assertEqual(proxy, self.user)
+            self.assertEqual(proxy, ClaimsUser(self.user.pk))
+            self.assertEqual(copy.copy(proxy).pk, self.user.pk)
+        self.assertFalse(proxy.is_loaded)
+
+    def test_other_attributes_load_the_user_once_then_hit_the_cache(self):
+        proxy = ClaimsUser(self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(proxy.username, 'claimsuser')
+            self.assertEqual(proxy.bio, '')
+        self.assertTrue(proxy.is_loaded)
+        self.assertIsInstance(proxy, User)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(ClaimsUser(self.user.pk).email, 'claims@example.com')
+
+    def test_saving_the_user_drops_the_cached_row(self):
+        get_cached_user(self.user.pk)
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+
+        self.user.bio = 'Updated'
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertEqual(ClaimsUser(self.user.pk).bio, 'Updated')
+
+    def test_password_hash_is_not_cached(self):
+        get_cached_user(self.user.pk)
+        cached = cache.get(user_cache_key(self.user.pk))
+        self.assertNotIn('password', cached)
+        self.assertNotIn(self.user.password, repr(cached))
+
+        user = get_cached_user(self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('StatelessPass123!'))
+
+    def test_saving_a_cached_user_keeps_the_password(self):
+        user = get_cached_user(self.user.pk)
+        user.bio = 'Saved from the cache'
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.bio, 'Saved from the cache')
+        self.assertTrue(self.user.check_password('StatelessPass123!'))
+
+    def test_deleted_user_fails_authentication_on_load(self):
+        pk = self.user.pk
+        get_cached_user(pk)
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            get_cached_user(pk)
+
+
+class StatelessAuthenticationAPITests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = _make_user('stateless@example.com', 'statelessuser', '+1940000002')
+        self.other = _make_user('other.sl@example.com', 'otherslusr', '+1940000003')
+        self.client = APIClient()
+        self._login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _login(self, user):
+        access = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_authenticated_list_does_not_select_the_user(self):
+        Post.objects.create(author=self.other, content='World')
+        with CaptureQueriesContext(connection) as captured:
+            res = self.client.get(reverse('api:posts'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(_user_queries(captured), [])
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+    def test_profile_loads_the_user_then_serves_it_from_cache(self):
+        with CaptureQueriesContext(connection) as first:
+            self.assertEqual(self.client.get(reverse('api:user-profile')).status_code, 200)
+        with CaptureQueriesContext(connection) as second:
+            res = self.client.get(reverse('api:user-profile'))
+        self.assertEqual(res.data['username'], 'statelessuser')
+        self.assertEqual(len(_user_queries(first)), 1)
+        self.assertEqual(_user_queries(second), [])
+
+    def test_profile_update_is_visible_on_the_next_request(self):
+        self.client.get(reverse('api:user-profile'))
+        res = self.client.patch(reverse('api:user-profile'), {'bio': 'Fresh bio'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.assertEqual(self.client.get(reverse('api:user-profile')).data['bio'], 'Fresh bio')
+
+    def test_writes_assign_the_real_user_and_permissions_use_the_claim(self):
+        spec = Specialization.objects.get_or_create(name='Backend', defaults={'description': ''})[0]
+        res = self.client.post(
+            reverse('api:posts'), {'content': 'Mine', 'specializations': [str(spec.id)]}, format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        post = Post.objects.get(pk=res.data['id'])
+        self.assertEqual(post.author_id, self.user.pk)
+
+        self._login(self.other)
+        res = self.client.patch(
+            reverse('api:post-detail', args=[post.pk]), {'content': 'Stolen'}, format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deleted_user_token_is_rejected_once_the_user_is_needed(self):
+        self.user.delete()
+        res = self.client.get(reverse('api:user-profile'))
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
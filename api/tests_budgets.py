@@ -0,0 +1,532 @@
+"""Query, row and latency budgets for every endpoint (api/budgets.py).
+
+Each URL in api/urls.py has at least one scenario below. Every scenario runs
+against two seeded data volumes, the second with larger pages and deeper
+threads, and must stay within its entry in api/budgets.json at both: the
+same query count at either volume, and that volume's row and time limits. Reads
+are measured with the response cache empty, so they pay for the full
+database path. After an intended change, regenerate the file with
+
+    RECORD_BUDGETS=1 python manage.py test api.tests_budgets
+
+and review the diff like any other change."""
+
+import datetime
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import URLPattern, reverse
+from rest_framework import status
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import slow_queries, urls
+from .budgets import load_budgets, measure, time_factor, write_budgets
+from .models import (
+    Answer, Attachment, Certificate, Comment, Post, PostReaction, Question, Specialization,
+    UploadSession, User,
+)
+from .pagination import KeysetPagination
+from .tests_attachments import SIGNATURES
+
+
+RECORD = os.environ.get('RECORD_BUDGETS') == '1'
+_recorded = {}
+
+PASSWORD = 'BudgetPass123!'
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password=PASSWORD,
+        first_name='B',
+        last_name='Budget',
+        phone_number=phone,
+    )
+
+
+def _attachments(parent, count):
+    content_type = ContentType.objects.get_for_model(parent)
+    return [
+        Attachment(
+            content_type=content_type,
+            object_id=parent.pk,
+            file=f'attachments/seed/{parent.pk}_{n}.png',
+            kind='image',
+            mime_type='image/png',
+            size_bytes=1024,
+            original_filename=f'{n}.png',
+            variants={'320': f'attachments/seed/{parent.pk}_{n}.w320.webp'},
+        )
+        for n in range(count)
+    ]
+
+
+def seed(scale):
+    """Seed `scale` worth of users, questions, posts and threads; returns
+    the objects scenarios point at."""
+    world = SimpleNamespace(scale=scale)
+    world.viewer = _make_user('viewer@example.com', 'budgetviewer', '+1230000001')
+    world.other = _make_user('other@example.com', 'budgetother', '+1230000002')
+    world.staff = _make_user('staff@example.com', 'budgetstaff', '+1230000003')
+    User.objects.filter(pk=world.staff.pk).update(is_staff=True)
+
+    password = make_password(PASSWORD)
+    people = User.objects.bulk_create([
+        User(
+            email=f'seed{n}@example.com', username=f'seeduser{n}', password=password,
+            first_name='S', last_name=f'Seed{n}', phone_number=f'+1231{n:06d}',
+        )
+        for n in range(scale['users'])
+    ])
+    authors = [world.viewer, world.other] + people
+
+    world.specs = [
+        Specialization.objects.get_or_create(name=name, defaults={'description': ''})[0]
+        for name in ('Backend', 'Frontend', 'Data')
+    ]
+    world.viewer.specializations.set(world.specs[:2])
+
+    questions = Question.objects.bulk_create([
+        Question(author=authors[n % len(authors)], content=f'Question {n} ' + 'x' * 200)
+        for n in range(scale['questions'])
+    ])
+    posts = Post.objects.bulk_create([
+        Post(author=authors[n % len(authors)], content=f'Post {n} ' + 'y' * 300)
+        for n in range(scale['posts'])
+    ])
+    Question.specializations.through.objects.bulk_create([
+        Question.specializations.through(question=q, specialization=world.specs[n % 3])
+        for n, q in enumerate(questions)
+    ])
+    Post.specializations.through.objects.bulk_create([
+        Post.specializations.through(post=p, specialization=world.specs[n % 3])
+        for n, p in enumerate(posts)
+    ])
+
+    # One deep thread per family; every other item gets a short one.
+    world.question = questions[-1]
+    world.post = posts[-1]
+    answers = Answer.objects.bulk_create([
+        Answer(question=world.question, author=authors[n % len(authors)], content=f'Answer {n}')
+        for n in range(scale['thread'])
+    ] + [
+        Answer(question=q, author=authors[n % len(authors)], content='Short answer')
+        for n, q in enumerate(questions[:-1])
+    ])
+    replies = Answer.objects.bulk_create([
+        Answer(question=world.question, author=authors[r % len(authors)], content=f'Reply {r}', parent_answer=a)
+        for a in answers[:scale['thread']]
+        for r in range(scale['replies'])
+    ])
+    comments = Comment.objects.bulk_create([
+        Comment(post=world.post, author=authors[n % len(authors)], content=f'Comment {n}')
+        for n in range(scale['thread'])
+    ] + [
+        Comment(post=p, author=authors[n % len(authors)], content='Short comment')
+        for n, p in enumerate(posts[:-1])
+    ])
+    Comment.objects.bulk_create([
+        Comment(post=world.post, author=authors[r % len(authors)], content=f'Reply {r}', parent_comment=c)
+        for c in comments[:scale['thread']]
+        for r in range(scale['replies'])
+    ])
+    PostReaction.objects.bulk_create([
+        PostReaction(user=user, post=post, reaction='like' if n % 3 else 'dislike')
+        for post in posts
+        for n, user in enumerate(authors[:scale['reactions']])
+    ])
+
+    thread = scale['thread'] * (1 + scale['replies'])
+    Question.objects.filter(pk=world.question.pk).update(answers_count=thread)
+    Question.objects.exclude(pk=world.question.pk).update(answers_count=1)
+    Post.objects.filter(pk=world.post.pk).update(comments_count=thread)
+    Post.objects.exclude(pk=world.post.pk).update(comments_count=1)
+
+    Attachment.objects.bulk_create(
+        [a for q in questions for a in _attachments(q, scale['attachments'])]
+        + [a for p in posts for a in _attachments(p, scale['attachments'])]
+        + [a for a_ in answers[:scale['thread']] + replies for a in _attachments(a_, 1)]
+    )
+    Certificate.objects.bulk_create([
+        Certificate(
+            user=user, title=f'Certificate {n}', issuer='Issuer',
+            issue_date=datetime.date(2024, 1, 1) + datetime.timedelta(days=n),
+            certificate_url=f'https://certs.example.com/{n}',
+        )
+        for user in (world.viewer, world.other)
+        for n in range(scale['certificates'])
+    ])
+
+    world.answer = answers[0]
+    world.comment = comments[0]
+    return world
+
+
+class Scenario:
+    """One request: `route` and `method` name the budget entry; `setup(test)`
+    prepares whatever it needs and returns `(url kwargs, body, headers)`."""
+
+    def __init__(self, route, method, setup, expect=status.HTTP_200_OK, auth=True, fmt='json', variant=None):
+        self.route = route
+        self.method = method
+        self.setup = setup
+        self.expect = expect
+        self.auth = auth
+        self.fmt = fmt
+        self.variant = variant
+
+    @property
+    def key(self):
+        key = f'{self.route} {self.method}'
+        return f'{key} ({self.variant})' if self.variant else key
+
+
+def _pk(obj):
+    return {'pk': obj.pk}
+
+
+# --- setups that need more than a seeded object ---------------------------
+
+def _pending_registration(test, email, phone):
+    test.client.post(reverse('api:register'), {
+        'email': email, 'username': email.split('@')[0], 'password': PASSWORD,
+        'first_name': 'New', 'last_name': 'User', 'phone_number': phone,
+    }, format='json')
+    return cache.get(f'otp_{email}')
+
+
+def _verify_email(test):
+    otp = _pending_registration(test, 'newcomer@example.com', '+1239999991')
+    return {}, {'email': 'newcomer@example.com', 'otp': otp}, {}
+
+
+def _resend_otp(test):
+    _pending_registration(test, 'resending@example.com', '+1239999992')
+    cache.delete('otp_last_sent_resending@example.com')
+    return {}, {'email': 'resending@example.com'}, {}
+
+
+def _reset_otp(test):
+    test.client.post(reverse('api:forgot-password'), {'email': test.world.other.email}, format='json')
+    return cache.get(f'reset_otp_{test.world.other.email}')
+
+
+def _verify_reset(test):
+    return {}, {'email': test.world.other.email, 'otp': _reset_otp(test)}, {}
+
+
+def _reset_password(test):
+    res = test.client.post(
+        reverse('api:verify-reset-otp'), {'email': test.world.other.email, 'otp': _reset_otp(test)}, format='json',
+    )
+    return {}, {'email': test.world.other.email, 'token': res.data['reset_token'], 'new_password': 'Another123!x'}, {}
+
+
+def _disposable_question(test):
+    question = Question.objects.create(author=test.world.viewer, content='Delete me')
+    answer = Answer.objects.create(question=question, author=test.world.other, content='a')
+    Answer.objects.create(question=question, author=test.world.viewer, content='r', parent_answer=answer)
+    return question
+
+
+def _disposable_post(test):
+    post = Post.objects.create(author=test.world.viewer, content='Delete me')
+    comment = Comment.objects.create(post=post, author=test.world.other, content='c')
+    Comment.objects.create(post=post, author=test.world.viewer, content='r', parent_comment=comment)
+    return post
+
+
+def _own_answer(test):
+    return Answer.objects.create(question=test.world.question, author=test.world.viewer, content='Mine')
+
+
+def _own_comment(test):
+    return Comment.objects.create(post=test.world.post, author=test.world.viewer, content='Mine')
+
+
+def _own_attachment(test):
+    answer = _own_answer(test)
+    return Attachment.objects.bulk_create(_attachments(answer, 1))[0]
+
+
+def _begin_upload(test, size=len(SIGNATURES['video/mp4'])):
+    res = test.client.post(
+        reverse('api:upload-sessions'),
+        {'filename': 'clip.mp4', 'content_type': 'video/mp4', 'size': size},
+        format='json',
+    )
+    return UploadSession.objects.get(pk=res.data['id'])
+
+
+def _upload_chunk(test):
+    clip = SIGNATURES['video/mp4']
+    session = _begin_upload(test)
+    headers = {'HTTP_CONTENT_RANGE': f'bytes 0-{len(clip) - 1}/{len(clip)}'}
+    return _pk(session), clip, headers
+
+
+def _finalize_upload(test):
+    kwargs, clip, headers = _upload_chunk(test)
+    test.client.put(
+        reverse('api:upload-session-detail', kwargs=kwargs), data=clip,
+        content_type='application/octet-stream', **headers,
+    )
+    return kwargs, None, {}
+
+
+def _as_staff(test):
+    token = RefreshToken.for_user(test.world.staff).access_token
+    test.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+def _slow_query_log(test):
+    _as_staff(test)
+    ring = slow_queries.get_ring()
+    ring.clear()
+    with test.assertLogs('api.slow_queries', 'WARNING'):
+        for n in range(test.world.scale['page_size']):
+            slow_queries.capture(connection, 'SELECT %s', [n], False, 250.0, 'api:posts')
+    return {}, None, {}
+
+
+def _staff_only(test):
+    _as_staff(test)
+    return {}, None, {}
+
+
+SCENARIOS = [
+    Scenario('register', 'POST', lambda t: ({}, {
+        'email': 'joiner@example.com', 'username': 'joiner01', 'password': PASSWORD,
+        'first_name': 'J', 'last_name': 'Oiner', 'phone_number': '+1238888888',
+    }, {}), auth=False),
+    Scenario('verify-email', 'POST', _verify_email, status.HTTP_201_CREATED, auth=False),
+    Scenario('login', 'POST', lambda t: ({}, {'identifier': t.world.other.email, 'password': PASSWORD}, {}), auth=False),
+    Scenario('resend-otp', 'POST', _resend_otp, auth=False),
+    Scenario('token-refresh', 'POST', lambda t: ({}, {'refresh': str(RefreshToken.for_user(t.world.viewer))}, {}),
+             auth=False),
+    Scenario('forgot-password', 'POST', lambda t: ({}, {'email': t.world.other.email}, {}), auth=False),
+    Scenario('verify-reset-otp', 'POST', _verify_reset, auth=False),
+    Scenario('reset-password', 'POST', _reset_password, auth=False),
+    Scenario('logout', 'POST', lambda t: ({}, {'refresh': str(RefreshToken.for_user(t.world.viewer))}, {}),
+             status.HTTP_205_RESET_CONTENT),
+
+    Scenario('user-profile', 'GET', lambda t: ({}, None, {})),
+    Scenario('user-profile', 'PATCH', lambda t: ({}, {'bio': 'Measuring things'}, {})),
+    Scenario('user-specializations', 'GET', lambda t: ({}, None, {})),
+    Scenario('user-specializations', 'PUT',
+             lambda t: ({}, {'specialization_ids': [str(s.pk) for s in t.world.specs]}, {})),
+    Scenario('specializations', 'GET', lambda t: ({}, None, {})),
+
+    Scenario('questions', 'GET', lambda t: ({}, None, {}), auth=False),
+    Scenario('questions', 'POST', lambda t: ({}, {
+        'content': 'How do budgets work?', 'specializations': [str(t.world.specs[0].pk)],
+    }, {}), status.HTTP_201_CREATED),
+    Scenario('question-detail', 'GET', lambda t: (_pk(t.world.question), None, {}), auth=False),
+    Scenario('question-detail', 'PATCH', lambda t: (_pk(_disposable_question(t)), {'content': 'Edited'}, {})),
+    Scenario('question-detail', 'DELETE', lambda t: (_pk(_disposable_question(t)), None, {}),
+             status.HTTP_204_NO_CONTENT),
+    Scenario('question-resolve', 'POST', lambda t: (_pk(_disposable_question(t)), None, {})),
+    Scenario('question-unresolve', 'POST', lambda t: (_pk(_disposable_question(t)), None, {})),
+    Scenario('question-answers', 'GET', lambda t: ({'question_id': t.world.question.pk}, None, {}), auth=False),
+    Scenario('question-answers', 'POST', lambda t: ({'question_id': t.world.question.pk}, {'content': 'Mine'}, {}),
+             status.HTTP_201_CREATED),
+    Scenario('answer-detail', 'GET', lambda t: (_pk(t.world.answer), None, {}), auth=False),
+    Scenario('answer-detail', 'PATCH', lambda t: (_pk(_own_answer(t)), {'content': 'Edited'}, {})),
+    Scenario('answer-detail', 'DELETE', lambda t: (_pk(_own_answer(t)), None, {}), status.HTTP_204_NO_CONTENT),
+    Scenario('answer-replies', 'GET', lambda t: (_pk(t.world.answer), None, {}), auth=False),
+    Scenario('answer-replies', 'POST', lambda t: (_pk(t.world.answer), {'content': 'Reply'}, {}),
+             status.HTTP_201_CREATED),
+    Scenario('attachment-delete', 'DELETE', lambda t: (_pk(_own_attachment(t)), None, {}),
+             status.HTTP_204_NO_CONTENT),
+
+    Scenario('upload-sessions', 'POST', lambda t: ({}, {
+        'filename': 'clip.mp4', 'content_type': 'video/mp4', 'size': 1024,
+    }, {}), status.HTTP_201_CREATED),
+    Scenario('upload-session-detail', 'GET', lambda t: (_pk(_begin_upload(t)), None, {})),
+    Scenario('upload-session-detail', 'PUT', _upload_chunk, fmt=None),
+    Scenario('upload-session-finalize', 'POST', _finalize_upload),
+
+    Scenario('posts', 'GET', lambda t: ({}, None, {}), auth=False),
+    Scenario('posts', 'GET', lambda t: ({}, None, {}), variant='signed in'),
+    Scenario('posts', 'POST', lambda t: ({}, {
+        'content': 'Budgets keep N+1 away', 'specializations': [str(t.world.specs[0].pk)],
+    }, {}), status.HTTP_201_CREATED),
+    Scenario('post-detail', 'GET', lambda t: (_pk(t.world.post), None, {}), auth=False),
+    Scenario('post-detail', 'PATCH', lambda t: (_pk(_disposable_post(t)), {'content': 'Edited'}, {})),
+    Scenario('post-detail', 'DELETE', lambda t: (_pk(_disposable_post(t)), None, {}), status.HTTP_204_NO_CONTENT),
+    Scenario('post-like', 'POST', lambda t: (_pk(t.world.post), None, {})),
+    Scenario('post-dislike', 'POST', lambda t: (_pk(t.world.post), None, {})),
+
+    Scenario('my-certificates', 'GET', lambda t: ({}, None, {})),
+    Scenario('my-certificates', 'POST', lambda t: ({}, {
+        'title': 'Budgeting', 'issuer': 'xBrain', 'issue_date': '2026-01-01',
+        'certificate_url': 'https://certs.example.com/new',
+    }, {}), status.HTTP_201_CREATED),
+    Scenario('my-certificate-delete', 'DELETE',
+             lambda t: (_pk(t.world.viewer.certificates.first()), None, {}), status.HTTP_204_NO_CONTENT),
+    Scenario('user-certificates', 'GET', lambda t: ({'user_id': t.world.other.pk}, None, {}), auth=False),
+
+    Scenario('post-comments', 'GET', lambda t: ({'post_id': t.world.post.pk}, None, {}), auth=False),
+    Scenario('post-comments', 'POST', lambda t: ({'post_id': t.world.post.pk}, {'content': 'Mine'}, {}),
+             status.HTTP_201_CREATED),
+    Scenario('comment-detail', 'GET', lambda t: (_pk(t.world.comment), None, {}), auth=False),
+    Scenario('comment-detail', 'PATCH', lambda t: (_pk(_own_comment(t)), {'content': 'Edited'}, {})),
+    Scenario('comment-detail', 'DELETE', lambda t: (_pk(_own_comment(t)), None, {}),
+             status.HTTP_204_NO_CONTENT),
+    Scenario('comment-replies', 'GET', lambda t: (_pk(t.world.comment), None, {}), auth=False),
+    Scenario('comment-replies', 'POST', lambda t: (_pk(t.world.comment), {'content': 'Reply'}, {}),
+             status.HTTP_201_CREATED),
+
+    Scenario('slow-queries', 'GET', _slow_query_log),
+    Scenario('slow-queries', 'DELETE', _staff_only, status.HTTP_204_NO_CONTENT),
+]
+
+
+class _BudgetTests:
+    """Runs every scenario at `scale`; subclasses pick the scale."""
+
+    scale = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media_root = tempfile.mkdtemp()
+        cls._staging = tempfile.mkdtemp()
+        cls._overrides = override_settings(
+            STORAGES={
+                'default': {
+                    'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                    'OPTIONS': {'location': cls._media_root},
+                },
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+            UPLOAD_SESSIONS={
+                'BACKEND': 'api.upload_sessions.LocalUploadBackend',
+                'OPTIONS': {'expiry': 600, 'location': cls._staging},
+            },
+            JOB_QUEUE={'BACKEND': 'api.jobs.InProcessJobQueue', 'OPTIONS': {'autostart': False}},
+        )
+        cls._overrides.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._overrides.disable()
+        shutil.rmtree(cls._media_root, ignore_errors=True)
+        shutil.rmtree(cls._staging, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.world = seed(cls.scale)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for pagination in (PageNumberPagination, KeysetPagination):
+            patcher = patch.object(pagination, 'page_size', self.scale['page_size'])
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _run(self, scenario):
+        cache.clear()  # cold reads, and no rate limits used up by earlier scenarios
+        token = RefreshToken.for_user(self.world.viewer).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        kwargs, body, headers = scenario.setup(self)
+        if not scenario.auth:
+            self.client.credentials()
+        url = reverse(f'api:{scenario.route}', kwargs=kwargs)
+        send = getattr(self.client, scenario.method.lower())
+        if scenario.fmt is None:
+            options = {'data': body, 'content_type': 'application/octet-stream'}
+        else:
+            options = {'data': body, 'format': scenario.fmt}
+        with measure() as measured:
+            res = send(url, **options, **headers)
+        self.assertEqual(res.status_code, scenario.expect, f'{scenario.key}: {getattr(res, "data", res)}')
+        return measured
+
+    def test_every_url_has_a_scenario(self):
+        routes = {p.name for p in urls.urlpatterns if isinstance(p, URLPattern)}
+        self.assertEqual(routes - {s.route for s in SCENARIOS}, set())
+
+    def test_endpoints_stay_within_budget(self):
+        budgets = {} if RECORD else load_budgets()
+        for scenario in SCENARIOS:
+            with self.subTest(scenario.key):
+                measured = self._run(scenario)
+                if RECORD:
+                    queries = _record(scenario.key, self.scale['name'], measured)
+                    if queries != measured.queries:
+                        self.fail(
+                            f"{scenario.key}: {measured.queries} queries at {self.scale['name']} scale but "
+                            f"{queries} at the other; the query count must not depend on data volume\n"
+                            + '\n'.join(measured.statements)
+                        )
+                    continue
+                self.assertIn(self.scale['name'], budgets.get(scenario.key, {}),
+                              f"no {self.scale['name']} budget for {scenario.key} in api/budgets.json")
+                problems = measured.over(budgets[scenario.key], self.scale['name'], time_factor())
+                if problems:
+                    self.fail('{} over budget at {} scale: {}\n{}'.format(
+                        scenario.key, self.scale['name'], ', '.join(problems),
+                        '\n'.join(measured.statements),
+                    ))
+
+
+def _record(key, scale, measured):
+    """Keep `measured` as the `scale` budget of `key`; returns the query
+    count recorded for `key` at whichever scale ran first."""
+    budget = measured.as_budget()
+    entry = _recorded.setdefault(key, {'queries': budget['queries']})
+    entry[scale] = {'rows': budget['rows'], 'ms': budget['ms']}
+    return entry['queries']
+
+
+def tearDownModule():
+    if not (RECORD and _recorded):
+        return
+    # Keep the other scale's limits when only one of the classes ran.
+    previous = load_budgets()
+    budgets = {}
+    for key in {scenario.key for scenario in SCENARIOS}:
+        old, new = previous.get(key, {}), _recorded.get(key, {})
+        entry = {'queries': new.get('queries', old.get('queries'))}
+        for scale in (SMALL['name'], LARGE['name']):
+            if scale in new or scale in old:
+                entry[scale] = new.get(scale, old.get(scale))
+        if entry['queries'] is not None:
+            budgets[key] = entry
+    write_budgets(budgets)
+
+
+SMALL = {
+    'name': 'small', 'page_size': 5, 'users': 6, 'questions': 12, 'posts': 12,
+    'thread': 4, 'replies': 2, 'reactions': 3, 'attachments': 1, 'certificates': 2,
+}
+LARGE = {
+    'name': 'large', 'page_size': 40, 'users': 40, 'questions': 90, 'posts': 90,
+    'thread': 40, 'replies': 8, 'reactions': 25, 'attachments': 3, 'certificates': 12,
+}
+
+
+class SmallBudgetTests(_BudgetTests, TestCase):
+    scale = SMALL
+
+
+class LargeBudgetTests(_BudgetTests, TestCase):
+    scale = LARGE
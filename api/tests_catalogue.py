@@ -0,0 +1,202 @@
+"""Tests for the cached specialization catalogue (api/catalogue.py).
+
+Covers the read path (GET /api/specializations/ with ETag / 304), the
+invalidation hooks (model signals + seed_specializations), and spec-ID
+validation on question/post/user-specialization writes."""
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from io import StringIO
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from . import catalogue
+from .catalogue import get_catalogue
+from .models import User, Specialization, Question
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='CatalogPass123!',
+        first_name='C',
+        last_name='User',
+        phone_number=phone,
+    )
+
+
+def _specialization_lookups(queries):
+    """Queries that fetch specializations by primary key."""
+    return [
+        q['sql'] for q in queries
+        if 'FROM "specializations" WHERE "specializations"."id"' in q['sql']
+    ]
+
+
+class SpecializationCatalogueListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('api:specializations')
+        self.user = _make_user('catalog@example.com', 'catalogue1', '+1910000001')
+        self.client.force_authenticate(user=self.user)
+        self.backend = Specialization.objects.create(name='Backend', description='Server-side')
+        self.frontend = Specialization.objects.create(name='Frontend', description='Client-side')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_second_request_runs_no_queries(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data['count'], 2)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+
+    def test_other_processes_reuse_the_shared_copy(self):
+        get_catalogue()
+        catalogue._local = None  # what a fresh worker process looks like
+        with self.assertNumQueries(0):
+            self.assertEqual(len(get_catalogue().results), 2)
+
+    def test_response_carries_etag(self):
+        res = self.client.get(self.url)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertEqual(res['Cache-Control'], 'private, no-cache')
+
+    def test_matching_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+
+    def test_weak_and_listed_etags_match(self):
+        etag = self.client.get(self.url)['ETag']
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"stale", W/{etag}')
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_stale_etag_gets_full_response(self):
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 2)
+
+    def test_create_invalidates_catalogue_and_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        Specialization.objects.create(name='DevOps', description='')
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 3)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_update_and_delete_invalidate_catalogue(self):
+        self.client.get(self.url)
+        self.backend.description = 'APIs and databases'
+        self.backend.save()
+        res = self.client.get(self.url)
+        self.assertIn('APIs and databases', [r['description'] for r in res.data['results']])
+
+        self.frontend.delete()
+        res = self.client.get(self.url)
+        self.assertEqual([r['name'] for r in res.data['results']], ['Backend'])
+
+    def test_etag_is_stable_across_unchanged_rebuilds(self):
+        etag = self.client.get(self.url)['ETag']
+        self.backend.save()  # invalidates, but content is identical
+        self.assertEqual(self.client.get(self.url)['ETag'], etag)
+
+    def test_seed_command_invalidates_catalogue(self):
+        self.client.get(self.url)
+        # bulk_create bypasses model signals, so only the command's own
+        # invalidation makes these visible.
+        Specialization.objects.bulk_create([Specialization(name='Quantum', description='')])
+        self.assertEqual(self.client.get(self.url).data['count'], 2)
+
+        call_command('seed_specializations', stdout=StringIO())
+        names = [r['name'] for r in self.client.get(self.url).data['results']]
+        self.assertIn('Quantum', names)
+        self.assertIn('Cybersecurity', names)
+
+
+class SpecializationCatalogueValidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = _make_user('catwriter@example.com', 'catwriter', '+1910000002')
+        self.client.force_authenticate(user=self.user)
+        self.backend = Specialization.objects.create(name='Backend', description='')
+        self.ml = Specialization.objects.create(name='ML', description='')
+
+    def tearDown(self):
+        cache.clear()
+
+    def _create_question(self, spec_ids):
+        return self.client.post(
+            reverse('api:questions'),
+            {'content': 'How do I scale?', 'specializations': spec_ids},
+            format='json',
+        )
+
+    def test_question_create_validates_specs_from_cache(self):
+        get_catalogue()
+        with CaptureQueriesContext(connection) as ctx:
+            res = self._create_question([str(self.backend.id), str(self.ml.id)])
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertEqual(_specialization_lookups(ctx.captured_queries), [])
+        question = Question.objects.get(pk=res.data['id'])
+        self.assertEqual(set(question.specializations.all()), {self.backend, self.ml})
+
+    def test_post_create_validates_specs_from_cache(self):
+        get_catalogue()
+        res = self.client.post(
+            reverse('api:posts'),
+            {'content': 'TIL', 'specializations': [str(self.ml.id)]},
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertEqual(res.data['specializations'][0]['name'], 'ML')
+
+    def test_unknown_spec_is_rejected(self):
+        res = self._create_question(['00000000-0000-0000-0000-000000000000'])
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('specializations', res.data)
+
+    def test_malformed_spec_is_rejected(self):
+        res = self._create_question(['not-a-uuid'])
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('specializations', res.data)
+
+    def test_spec_missing_from_stale_cache_falls_back_to_database(self):
+        get_catalogue()
+        [late] = Specialization.objects.bulk_create([Specialization(name='Late', description='')])
+        self.assertNotIn(late.id, get_catalogue())
+
+        res = self._create_question([str(late.id)])
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertIn(late.id, get_catalogue())
+
+    def test_user_specializations_put_uses_cache(self):
+        get_catalogue()
+        [late] = Specialization.objects.bulk_create([Specialization(name='Late', description='')])
+        res = self.client.put(
+            reverse('api:user-specializations'),
+            {'specialization_ids': [str(self.backend.id), str(late.id)]},
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.assertEqual(len(res.data['specializations']), 2)
+
+        res = self.client.put(
+            reverse('api:user-specializations'),
+            {'specialization_ids': ['00000000-0000-0000-0000-000000000000']},
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,178 @@
+"""Tests for conditional GET on the detail endpoints (api/conditional.py)."""
+
+from unittest.mock import patch
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import Answer, Attachment, Comment, Post, PostReaction, Question, Specialization, User
+from .tasks import make_profile_image_variants
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='CondPass123!',
+        first_name='C',
+        last_name='Cond',
+        phone_number=phone,
+    )
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.alice = _make_user('condalice@example.com', 'condalice', '+1220000001')
+        self.bob = _make_user('condbob@example.com', 'condbob', '+1220000002')
+        self.spec = spec = Specialization.objects.get_or_create(name='Backend', defaults={'description': ''})[0]
+
+        self.question = Question.objects.create(author=self.alice, content='Why 304?')
+        self.question.specializations.add(spec)
+        self.answer = Answer.objects.create(question=self.question, author=self.bob, content='Validators')
+        self.reply = Answer.objects.create(
+            question=self.question, author=self.alice, content='Thanks', parent_answer=self.answer,
+        )
+        self.attachment = Attachment.objects.create(
+            content_type=ContentType.objects.get_for_model(Answer),
+            object_id=self.answer.pk,
+            file='attachments/a.png',
+            kind='image',
+            mime_type='image/png',
+            size_bytes=1,
+            original_filename='a.png',
+        )
+
+        self.post = Post.objects.create(author=self.alice, content='Conditional requests')
+        self.post.specializations.add(spec)
+        self.comment = Comment.objects.create(post=self.post, author=self.bob, content='Nice')
+        Comment.objects.create(post=self.post, author=self.alice, content='Ty', parent_comment=self.comment)
+
+        self.urls = {
+            'question': reverse('api:question-detail', args=[self.question.pk]),
+            'answer': reverse('api:answer-detail', args=[self.answer.pk]),
+            'post': reverse('api:post-detail', args=[self.post.pk]),
+            'comment': reverse('api:comment-detail', args=[self.comment.pk]),
+        }
+
+    def tearDown(self):
+        cache.clear()
+
+    def _get(self, url, etag=None):
+        cache.clear()  # measure the database path, not the response cache
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, **headers)
+        return res, len(queries)
+
+    def test_304_runs_fewer_queries_than_a_full_get(self):
+        for name, url in self.urls.items():
+            with self.subTest(name):
+                full, full_queries = self._get(url)
+                self.assertEqual(full.status_code, status.HTTP_200_OK)
+                self.assertIn('Last-Modified', full)
+
+                res, queries = self._get(url, full['ETag'])
+                self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(res['ETag'], full['ETag'])
+                self.assertEqual(res.content, b'')
+                self.assertEqual(queries, 1)
+                self.assertLess(queries, full_queries)
+
+    def test_validators_do_not_join_children(self):
+        # Child aggregates are scalar subqueries; a GROUP BY over LEFT JOINs
+        # would multiply answers by attachments by specializations.
+        for name, url in self.urls.items():
+            with self.subTest(name):
+                full, _ = self._get(url)
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url, HTTP_IF_NONE_MATCH=full['ETag'])
+                self.assertNotIn('LEFT OUTER JOIN', queries[0]['sql'])
+
+    def test_validator_is_stable_across_unrelated_writes(self):
+        etag = self.client.get(self.urls['question'])['ETag']
+        Question.objects.create(author=self.bob, content='Another one')  # bumps the cache generation
+        res = self.client.get(self.urls['question'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_reply_edit_changes_question_etag(self):
+        etag = self.client.get(self.urls['question'])['ETag']
+        self.client.force_authenticate(user=self.alice)
+        self.client.patch(reverse('api:answer-detail', args=[self.reply.pk]), {'content': 'Edited'}, format='json')
+        self.client.force_authenticate(user=None)
+        res = self.client.get(self.urls['question'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_deleting_a_reply_changes_answer_etag(self):
+        etag = self.client.get(self.urls['answer'])['ETag']
+        self.reply.delete()
+        res = self.client.get(self.urls['answer'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['replies_count'], 0)
+
+    def test_thumbnails_becoming_ready_change_etags(self):
+        etags = {name: self.client.get(self.urls[name])['ETag'] for name in ('question', 'answer')}
+        Attachment.objects.filter(pk=self.attachment.pk).update(variants={'320': 'attachments/a.w320.webp'})
+        for name, etag in etags.items():
+            res, _ = self._get(self.urls[name], etag)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_author_thumbnails_becoming_ready_change_etags(self):
+        self.alice.profile_image = 'profile_images/alice.png'
+        self.alice.save()
+        etags = {name: self.client.get(self.urls[name])['ETag'] for name in ('question', 'post')}
+        with patch('api.tasks.render_variants', return_value={'320': 'profile_images/alice.w320.webp'}):
+            make_profile_image_variants(str(self.alice.pk), 'profile_images/alice.png')
+        for name, etag in etags.items():
+            res, _ = self._get(self.urls[name], etag)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertIn('320', res.data['author']['profile_image_variants'])
+
+    def test_renaming_a_specialization_changes_etags(self):
+        etags = {name: self.client.get(self.urls[name])['ETag'] for name in ('question', 'post')}
+        self.spec.name = 'Backend Engineering'
+        self.spec.save()
+        for name, etag in etags.items():
+            res, _ = self._get(self.urls[name], etag)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data['specializations'][0]['name'], 'Backend Engineering')
+
+    def test_post_etag_covers_the_viewers_reaction(self):
+        anonymous = self.client.get(self.urls['post'])['ETag']
+        self.client.force_authenticate(user=self.bob)
+        self.assertEqual(self.client.get(self.urls['post'])['ETag'], anonymous)
+
+        PostReaction.objects.create(user=self.bob, post=self.post, reaction='like')
+        full, _ = self._get(self.urls['post'])
+        self.assertEqual(full.data['my_reaction'], 'like')
+        self.assertNotEqual(full['ETag'], anonymous)
+        res, _ = self._get(self.urls['post'], full['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.client.get(self.urls['post'])  # now from the response cache
+        cached = self.client.get(self.urls['post'], HTTP_IF_NONE_MATCH=full['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.force_authenticate(user=self.alice)
+        res, _ = self._get(self.urls['post'], full['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_comment_edit_changes_comment_etag(self):
+        etag = self.client.get(self.urls['comment'])['ETag']
+        self.client.force_authenticate(user=self.bob)
+        self.client.patch(self.urls['comment'], {'content': 'Very nice'}, format='json')
+        res = self.client.get(self.urls['comment'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['content'], 'Very nice')
+
+    def test_missing_object_is_404(self):
+        url = reverse('api:answer-detail', args=['00000000-0000-0000-0000-000000000000'])
+        res = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,154 @@
+"""Tests for the denormalized counter columns on Question and Post.
+
+`Question.answers_count` and `Post.likes_count` / `dislikes_count` /
+`comments_count` are maintained by the write paths and can be repaired with
+`manage.py reconcile_counters`."""
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from .models import User, Question, Answer, Post, PostReaction, Comment
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='CountPass123!',
+        first_name='N',
+        last_name='User',
+        phone_number=phone,
+    )
+
+
+class QuestionAnswersCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = _make_user('cnt@example.com', 'cntuser1', '+1800000001')
+        self.question = Question.objects.create(author=self.user, content='Q')
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _answer(self, content='A'):
+        return self.client.post(
+            reverse('api:question-answers', args=[self.question.id]),
+            {'content': content}, format='json',
+        ).data['id']
+
+    def _reply(self, answer_id, content='R'):
+        return self.client.post(
+            reverse('api:answer-replies', args=[answer_id]),
+            {'content': content}, format='json',
+        ).data['id']
+
+    def _stored(self):
+        return Question.objects.values_list('answers_count', flat=True).get(pk=self.question.pk)
+
+    def test_answers_and_replies_increment_column(self):
+        a1 = self._answer()
+        self._reply(a1)
+        self._reply(a1)
+        self.assertEqual(self._stored(), 3)
+
+    def test_deleting_top_level_answer_removes_its_replies_from_total(self):
+        a1 = self._answer()
+        self._answer()
+        self._reply(a1)
+        self._reply(a1)
+        self.client.delete(reverse('api:answer-detail', args=[a1]))
+        self.assertEqual(self._stored(), 1)
+
+    def test_deleting_reply_decrements_by_one(self):
+        a1 = self._answer()
+        r1 = self._reply(a1)
+        self.client.delete(reverse('api:answer-detail', args=[r1]))
+        self.assertEqual(self._stored(), 1)
+
+    def test_list_reads_column_without_joining_answers(self):
+        self._answer()
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(reverse('api:questions'))
+        self.assertEqual(res.data['results'][0]['answers_count'], 1)
+        feed_sql = [q['sql'] for q in ctx.captured_queries if 'FROM "questions"' in q['sql']]
+        self.assertTrue(feed_sql)
+        for sql in feed_sql:
+            self.assertNotIn('"answers"', sql)
+
+
+class PostCountersTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.alice = _make_user('cnta@example.com', 'cntalice', '+1800000002')
+        self.bob = _make_user('cntb@example.com', 'cntbob01', '+1800000003')
+        self.post = Post.objects.create(author=self.alice, content='P')
+
+    def tearDown(self):
+        cache.clear()
+
+    def _stored(self):
+        return Post.objects.values('likes_count', 'dislikes_count', 'comments_count').get(pk=self.post.pk)
+
+    def test_toggle_transitions_keep_counters_in_step(self):
+        self.client.force_authenticate(user=self.bob)
+        self.client.post(reverse('api:post-like', args=[self.post.id]))
+        self.assertEqual(self._stored()['likes_count'], 1)
+
+        self.client.post(reverse('api:post-dislike', args=[self.post.id]))
+        stored = self._stored()
+        self.assertEqual((stored['likes_count'], stored['dislikes_count']), (0, 1))
+
+        self.client.post(reverse('api:post-dislike', args=[self.post.id]))
+        stored = self._stored()
+        self.assertEqual((stored['likes_count'], stored['dislikes_count']), (0, 0))
+
+    def test_comment_create_and_cascade_delete(self):
+        self.client.force_authenticate(user=self.bob)
+        c1 = self.client.post(
+            reverse('api:post-comments', args=[self.post.id]), {'content': 'c'}, format='json',
+        ).data['id']
+        for _ in range(2):
+            self.client.post(reverse('api:comment-replies', args=[c1]), {'content': 'r'}, format='json')
+        self.assertEqual(self._stored()['comments_count'], 3)
+
+        self.client.delete(reverse('api:comment-detail', args=[c1]))
+        self.assertEqual(self._stored()['comments_count'], 0)
+
+
+class ReconcileCountersCommandTests(TestCase):
+    def setUp(self):
+        self.user = _make_user('rec@example.com', 'recuser1', '+1800000004')
+        self.question = Question.objects.create(author=self.user, content='Q')
+        self.post = Post.objects.create(author=self.user, content='P')
+        # Rows written straight through the ORM bypass the counter paths.
+        answer = Answer.objects.create(question=self.question, author=self.user, content='a')
+        Answer.objects.create(question=self.question, author=self.user, content='r', parent_answer=answer)
+        PostReaction.objects.create(user=self.user, post=self.post, reaction='dislike')
+        Comment.objects.create(post=self.post, author=self.user, content='c')
+        Question.objects.filter(pk=self.question.pk).update(answers_count=7)
+
+    def test_dry_run_reports_without_writing(self):
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn('would fix 1', out.getvalue())
+        self.assertEqual(Question.objects.get(pk=self.question.pk).answers_count, 7)
+
+    def test_fixes_drift(self):
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(Question.objects.get(pk=self.question.pk).answers_count, 2)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual((post.likes_count, post.dislikes_count, post.comments_count), (0, 1, 1))
+
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertNotIn('fix', out.getvalue())
@@ -0,0 +1,88 @@
+"""Tests for the orjson-backed renderer and parser (api/fast_json.py)."""
+
+import datetime
+import decimal
+import io
+import uuid
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.functional import lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from .fast_json import FastJSONParser, FastJSONRenderer
+
+
+def _payload():
+    utc = datetime.timezone.utc
+    cairo = datetime.timezone(datetime.timedelta(hours=3))
+    return ReturnDict({
+        'id': uuid.UUID('6fd425d8-057f-4235-9c9b-ecee0d5321d0'),
+        'created_at': datetime.datetime(2026, 10, 17, 9, 30, tzinfo=utc),
+        'updated_at': datetime.datetime(2026, 10, 17, 9, 30, 0, 123456, tzinfo=cairo),
+        'naive': datetime.datetime(2026, 1, 2, 3, 4, 5),
+        'day': datetime.date(2026, 10, 17),
+        'time': datetime.time(8, 15, 0, 500),
+        'elapsed': datetime.timedelta(minutes=90),
+        'price': decimal.Decimal('12.50'),
+        'tiny': decimal.Decimal('0.1'),
+        'label': lazy(lambda: 'Backend', str)(),
+        'text': 'naïve — 日本語 "quoted" \\ line\u2028sep\u2029end',
+        'flags': (True, False, None),
+        'nested': ReturnList([{'n': 1, 'f': 0.5, 'neg': -3}, []], serializer=None),
+    }, serializer=None)
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def assertRendersLikeDRF(self, data, accepted_media_type=None, renderer_context=None):
+        expected = JSONRenderer().render(data, accepted_media_type, renderer_context)
+        self.assertEqual(FastJSONRenderer().render(data, accepted_media_type, renderer_context), expected)
+
+    def test_output_is_byte_identical_to_drf(self):
+        self.assertRendersLikeDRF(_payload())
+
+    def test_utc_datetimes_use_z(self):
+        rendered = FastJSONRenderer().render({'at': datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)})
+        self.assertEqual(rendered, b'{"at":"2026-01-01T00:00:00Z"}')
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_values_orjson_refuses_fall_back(self):
+        self.assertRendersLikeDRF({'big': 2 ** 70})
+        self.assertRendersLikeDRF({1: 'int key'})
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({'obj': object()})
+
+    def test_indented_output_uses_the_stock_renderer(self):
+        self.assertRendersLikeDRF(_payload(), 'application/json; indent=4')
+        self.assertRendersLikeDRF(_payload(), None, {'indent': 2})
+
+    def test_without_orjson_it_is_the_stock_renderer(self):
+        with patch('api.fast_json.orjson', None):
+            self.assertRendersLikeDRF(_payload())
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def _parse(self, body, parser=None, **context):
+        return (parser or FastJSONParser()).parse(io.BytesIO(body), 'application/json', context)
+
+    def test_parses_like_drf(self):
+        body = '{"content": "naïve  ", "n": 1.5, "ids": [null, true]}'.encode()
+        self.assertEqual(self._parse(body), self._parse(body, JSONParser()))
+
+    def test_malformed_body_is_a_parse_error(self):
+        for body in (b'{"content": ', b'{"n": NaN}', b'\xff'):
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                self._parse(body)
+
+    def test_other_encodings_use_the_stock_parser(self):
+        body = '{"content": "café"}'.encode('latin-1')
+        self.assertEqual(self._parse(body, encoding='latin-1'), {'content': 'café'})
+
+    def test_without_orjson_it_is_the_stock_parser(self):
+        with patch('api.fast_json.orjson', None):
+            self.assertEqual(self._parse(b'{"a": [1, 2]}'), {'a': [1, 2]})
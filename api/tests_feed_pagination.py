@@ -0,0 +1,146 @@
+"""Tests for opt-in keyset (cursor) pagination on the question and post feeds.
+
+`?paginate=cursor` switches GET /api/questions/ and GET /api/posts/ from
+page-number paging to `(created_at, id)` keyset paging: no `count`, opaque
+`next` / `previous` cursors, and no COUNT(*) query."""
+
+import base64
+import json
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import User, Specialization, Question, Post
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='FeedPass123!',
+        first_name='F',
+        last_name='User',
+        phone_number=phone,
+    )
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = _make_user('feed@example.com', 'feeduser', '+1700000001')
+        self.spec = Specialization.objects.create(name='Backend', description='')
+
+        # 45 questions; every 5 share a created_at so ties must be broken by id.
+        base = timezone.now() - timedelta(days=1)
+        for i in range(45):
+            q = Question.objects.create(author=self.user, content=f'question {i}')
+            q.specializations.add(self.spec)
+            Question.objects.filter(pk=q.pk).update(created_at=base + timedelta(minutes=i // 5))
+
+    def tearDown(self):
+        cache.clear()
+
+    def _walk(self, url, params):
+        seen, pages = [], 0
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            seen.extend(item['id'] for item in res.data['results'])
+            pages += 1
+            if not res.data['next']:
+                return seen, pages, res
+            res = self.client.get(res.data['next'])
+
+    def test_default_mode_is_unchanged(self):
+        res = self.client.get(reverse('api:questions'))
+        self.assertEqual(res.data['count'], 45)
+        self.assertEqual(len(res.data['results']), 20)
+
+    def test_cursor_mode_has_no_count_and_opaque_next(self):
+        res = self.client.get(reverse('api:questions'), {'paginate': 'cursor'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', res.data)
+        self.assertIsNone(res.data['previous'])
+        self.assertIn('cursor=', res.data['next'])
+        self.assertEqual(len(res.data['results']), 20)
+
+    def test_walks_every_row_once_in_newest_first_order(self):
+        seen, pages, _ = self._walk(reverse('api:questions'), {'paginate': 'cursor'})
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(seen), 45)
+        self.assertEqual(len(set(seen)), 45)
+
+        expected = [
+            str(pk) for pk in
+            Question.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        ]
+        self.assertEqual(seen, expected)
+
+    def test_previous_returns_the_same_page(self):
+        first = self.client.get(reverse('api:questions'), {'paginate': 'cursor'})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [r['id'] for r in back.data['results']],
+            [r['id'] for r in first.data['results']],
+        )
+        self.assertIsNone(back.data['previous'])
+
+    def test_filters_are_preserved_across_cursors(self):
+        other = _make_user('feed2@example.com', 'feeduser2', '+1700000002')
+        for i in range(3):
+            Question.objects.create(author=other, content=f'other {i}')
+        seen, pages, _ = self._walk(
+            reverse('api:questions'), {'paginate': 'cursor', 'author': str(other.id)},
+        )
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(pages, 1)
+
+    def test_no_count_query_issued(self):
+        first = self.client.get(reverse('api:questions'), {'paginate': 'cursor'})
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(first.data['next'])
+        for query in ctx.captured_queries:
+            self.assertNotIn('COUNT(*)', query['sql'].upper())
+
+    def test_invalid_cursor_404(self):
+        res = self.client.get(reverse('api:questions'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor_404(self):
+        now = timezone.now()
+        for payload in (
+            [now.isoformat(), 'not-a-uuid', 0],
+            [now.isoformat(), 12, 0],
+            [now.replace(tzinfo=None).isoformat(), str(self.user.pk), 0],
+        ):
+            token = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            for route in ('api:questions', 'api:posts'):
+                res = self.client.get(reverse(route), {'cursor': token})
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND, (route, payload))
+
+    def test_search_cannot_be_cursor_paginated(self):
+        for params in ({'q': 'question', 'paginate': 'cursor'}, {'q': 'question', 'cursor': 'abc'}):
+            with self.subTest(params=params):
+                res = self.client.get(reverse('api:questions'), params)
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('q', res.data)
+        res = self.client.get(reverse('api:posts'), {'q': 'post', 'paginate': 'cursor'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_feed_supports_cursor_mode(self):
+        for i in range(25):
+            p = Post.objects.create(author=self.user, content=f'post {i}')
+            p.specializations.add(self.spec)
+        seen, pages, last = self._walk(reverse('api:posts'), {'paginate': 'cursor'})
+        self.assertEqual(len(set(seen)), 25)
+        self.assertEqual(pages, 2)
+        self.assertIn('likes_count', last.data['results'][0])
@@ -22,9 +22,9 @@ class ForgotPasswordTests(TestCase):
     def tearDown(self):
         cache.clear()
 
-    @patch('api.utils.send_mail')
-    def test_full_password_reset_flow(self, mock_send_mail):
-        mock_send_mail.return_value = 1
+    @patch('api.mail.SMTPConnectionPool.send_messages')
+    def test_full_password_reset_flow(self, mock_send_messages):
+        mock_send_messages.return_value = 1
         
         # Step 1: Forgot Password
         url_forgot = reverse('api:forgot-password')
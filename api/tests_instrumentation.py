@@ -0,0 +1,125 @@
+"""Tests for the per-request instrumentation middleware (api/instrumentation.py)."""
+
+import re
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .fast_json import FastJSONRenderer
+from .instrumentation import current_metrics, record_cache
+from .models import Post, Question, Specialization, User
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='InstrPass123!',
+        first_name='I',
+        last_name='Instr',
+        phone_number=phone,
+    )
+
+
+def _timing(response):
+    """`Server-Timing` as {name: {'dur': float, 'desc': str}}."""
+    entries = {}
+    for entry in response['Server-Timing'].split(', '):
+        name, *params = entry.split(';')
+        fields = dict(p.split('=', 1) for p in params)
+        entries[name] = {
+            'dur': float(fields['dur']) if 'dur' in fields else None,
+            'desc': fields.get('desc', '').strip('"'),
+        }
+    return entries
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0, INSTRUMENTATION_SERVER_TIMING=True)
+class RequestInstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = _make_user('instr@example.com', 'instruser', '+1240000001')
+        spec = Specialization.objects.get_or_create(name='Backend', defaults={'description': ''})[0]
+        for n in range(3):
+            Question.objects.create(author=self.user, content=f'Question {n}').specializations.add(spec)
+            Post.objects.create(author=self.user, content=f'Post {n}').specializations.add(spec)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_server_timing_counts_the_queries_the_view_ran(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api:questions'))
+        self.assertEqual(response.status_code, 200)
+        timing = _timing(response)
+        self.assertEqual(timing['db']['desc'], f'{len(queries)} queries')
+        self.assertGreater(timing['db']['dur'], 0)
+        self.assertGreaterEqual(
+            timing['total']['dur'] + 0.2,
+            timing['db']['dur'] + timing['render']['dur'] + timing['app']['dur'],
+        )
+
+    def test_renderer_time_is_reported_as_render(self):
+        real_render = FastJSONRenderer.render
+
+        def slow_render(renderer, *args, **kwargs):
+            time.sleep(0.02)
+            return real_render(renderer, *args, **kwargs)
+
+        with patch.object(FastJSONRenderer, 'render', slow_render):
+            timing = _timing(self.client.get(reverse('api:questions')))
+        self.assertGreaterEqual(timing['render']['dur'], 20)
+        self.assertLess(timing['app']['dur'], timing['total']['dur'] - 19)
+
+    def test_response_cache_hits_and_misses_are_counted(self):
+        first = _timing(self.client.get(reverse('api:posts')))
+        second = _timing(self.client.get(reverse('api:posts')))
+        self.assertEqual(first['cache-response']['desc'], 'hits=0 misses=1')
+        self.assertEqual(second['cache-response']['desc'], 'hits=1 misses=0')
+        self.assertLess(int(second['db']['desc'].split()[0]), int(first['db']['desc'].split()[0]))
+
+    def test_structured_log_record(self):
+        with self.assertLogs('api.requests', 'INFO') as logs:
+            self.client.get(reverse('api:posts'))
+        record = logs.records[0]
+        self.assertEqual(record.route, 'api:posts')
+        self.assertEqual((record.method, record.status), ('GET', 200))
+        self.assertGreater(record.db_queries, 0)
+        self.assertEqual((record.cache_hits, record.cache_misses), (0, 1))
+        for field in ('duration_ms', 'db_ms', 'render_ms', 'app_ms'):
+            self.assertIsInstance(getattr(record, field), float)
+
+    def test_writes_and_errors_are_measured_too(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('api:posts'), {'content': ''}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_left_alone(self):
+        with self.assertNoLogs('api.requests', 'INFO'):
+            response = self.client.get(reverse('api:posts'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(INSTRUMENTATION_SERVER_TIMING=False)
+    def test_header_can_be_turned_off_while_logging_stays_on(self):
+        with self.assertLogs('api.requests', 'INFO'):
+            response = self.client.get(reverse('api:posts'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_record_cache_outside_a_request_is_a_no_op(self):
+        self.assertIsNone(current_metrics())
+        record_cache('response', True)
+        self.assertIsNone(current_metrics())
+
+    def test_header_format(self):
+        header = self.client.get(reverse('api:questions'))['Server-Timing']
+        self.assertRegex(header, r'^db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+, app;dur=[\d.]+, ')
+        self.assertTrue(re.search(r', total;dur=[\d.]+$', header))
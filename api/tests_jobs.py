@@ -0,0 +1,226 @@
+"""Tests for the background job queue (api/jobs.py) and the auth email paths
+that use it."""
+
+import json
+import os
+import time
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .jobs import InProcessJobQueue, RedisJobQueue, get_queue
+from .models import User
+
+
+CALLS = []
+
+
+def record_call(**kwargs):
+    CALLS.append(kwargs)
+
+
+def always_fail(**kwargs):
+    raise ConnectionError('SMTP server unreachable')
+
+
+def fail_once(**kwargs):
+    if not CALLS:
+        CALLS.append('failed')
+        raise ConnectionError('SMTP server busy')
+    CALLS.append(kwargs)
+
+
+class JobQueueSemanticsMixin:
+    """Behaviour every backend must share. Subclasses provide `make_queue`."""
+
+    def setUp(self):
+        CALLS.clear()
+        self.queue = self.make_queue(max_attempts=3, backoff=0.01, max_backoff=0.02)
+
+    def test_enqueued_job_runs_with_kwargs(self):
+        self.queue.enqueue(record_call, to='a@example.com', n=1)
+        self.assertEqual(self.queue.drain(), 1)
+        self.assertEqual(CALLS, [{'to': 'a@example.com', 'n': 1}])
+
+    def test_jobs_run_in_fifo_order(self):
+        for n in range(3):
+            self.queue.enqueue('api.tests_jobs.record_call', n=n)
+        self.queue.drain()
+        self.assertEqual([c['n'] for c in CALLS], [0, 1, 2])
+
+    def test_failed_job_is_retried_after_backoff(self):
+        self.queue.enqueue(fail_once, to='b@example.com')
+        self.assertIs(self.queue.work_one(timeout=0), False)
+        self.assertEqual(len(self.queue), 1)
+        self.assertIs(self.queue.work_one(timeout=2), True)
+        self.assertEqual(CALLS, ['failed', {'to': 'b@example.com'}])
+        self.assertEqual(self.queue.dead_letters(), [])
+
+    def test_exhausted_job_goes_to_dead_letters(self):
+        self.queue.enqueue(always_fail, to='c@example.com')
+        for _ in range(3):
+            self.assertIs(self.queue.work_one(timeout=2), False)
+        self.assertIsNone(self.queue.work_one(timeout=0.1))
+
+        [dead] = self.queue.dead_letters()
+        self.assertEqual(dead['path'], 'api.tests_jobs.always_fail')
+        self.assertEqual(dead['attempts'], 3)
+        self.assertIn('SMTP server unreachable', dead['last_error'])
+        self.assertEqual(len(self.queue), 0)
+
+    def test_requeue_dead_resets_attempts(self):
+        self.queue.enqueue(always_fail)
+        for _ in range(3):
+            self.queue.work_one(timeout=2)
+        self.assertEqual(self.queue.requeue_dead(), 1)
+        self.assertEqual(self.queue.dead_letters(), [])
+        self.assertIs(self.queue.work_one(timeout=0), False)
+        self.assertEqual(len(self.queue), 1)
+
+
+class InProcessJobQueueTests(JobQueueSemanticsMixin, TestCase):
+    def make_queue(self, **kwargs):
+        return InProcessJobQueue(autostart=False, **kwargs)
+
+    def test_backoff_grows_exponentially_up_to_cap(self):
+        queue = InProcessJobQueue(autostart=False, backoff=10, max_backoff=60)
+        delays = [queue.retry_delay(n) for n in range(1, 6)]
+        for delay, base in zip(delays, [10, 20, 40, 60, 60]):
+            self.assertGreaterEqual(delay, base)
+            self.assertLessEqual(delay, base * 1.1)
+
+    def test_autostart_worker_drains_in_background(self):
+        queue = InProcessJobQueue(backoff=0.01)
+        queue.enqueue(record_call, n=1)
+        deadline = time.time() + 2
+        while not CALLS and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(CALLS, [{'n': 1}])
+        self.assertTrue(queue._worker.daemon)
+
+
+@skipUnless(os.environ.get('REDIS_URL'), 'RedisJobQueue tests need REDIS_URL')
+class RedisJobQueueTests(JobQueueSemanticsMixin, TestCase):
+    def make_queue(self, **kwargs):
+        queue = RedisJobQueue(url=os.environ['REDIS_URL'], prefix='xbrain:test-jobs', **kwargs)
+        self._clear(queue)
+        self.addCleanup(self._clear, queue)
+        return queue
+
+    def _clear(self, queue):
+        keys = queue.redis.keys('xbrain:test-jobs:*')
+        if keys:
+            queue.redis.delete(*keys)
+
+    def test_job_reserved_by_a_dead_worker_is_requeued(self):
+        self.queue.enqueue(record_call, n=1)
+        self.assertIsNotNone(self.queue.reserve(timeout=0))  # the worker dies before running it
+        self.assertEqual(len(self.queue), 0)
+
+        restarted = RedisJobQueue(url=os.environ['REDIS_URL'], prefix='xbrain:test-jobs', worker_id='other-worker')
+        self.assertEqual(restarted.recover(), 0)  # the first worker's heartbeat is still live
+        self.queue.redis.delete(self.queue.heartbeat_key)
+        self.assertEqual(restarted.recover(), 1)
+        self.assertEqual(restarted.drain(), 1)
+        self.assertEqual(CALLS, [{'n': 1}])
+        self.assertEqual(restarted.redis.llen(restarted.processing_key), 0)
+
+    def test_dead_letters_expire(self):
+        self.queue.enqueue(always_fail)
+        for _ in range(3):
+            self.queue.work_one(timeout=2)
+        self.assertEqual(len(self.queue.dead_letters()), 1)
+        self.assertGreater(self.queue.redis.ttl(self.queue.dead_key), 0)
+
+
+@override_settings(JOB_QUEUE={
+    'BACKEND': 'api.jobs.InProcessJobQueue',
+    'OPTIONS': {'autostart': False, 'backoff': 0.01},
+})
+class AuthEmailsAreQueuedTests(TestCase):
+    """Auth endpoints only enqueue email; SMTP runs later in the worker."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def tearDown(self):
+        cache.clear()
+
+    def _queued_recipients(self):
+        return [json.loads(raw)['kwargs']['recipient'] for raw in get_queue()._ready]
+
+    @patch('api.mail.SMTPConnectionPool.send_messages')
+    def test_register_does_not_touch_smtp(self, mock_send_messages):
+        data = {
+            'email': 'queued@example.com',
+            'username': 'queueduser',
+            'password': 'SecurePass123!',
+            'first_name': 'Q',
+            'last_name': 'User',
+            'phone_number': '+1920000001',
+        }
+        res = self.client.post(reverse('api:register'), data, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        mock_send_messages.assert_not_called()
+        self.assertEqual(self._queued_recipients(), ['queued@example.com'])
+
+        get_queue().drain()
+        mock_send_messages.assert_called_once()
+        [message] = mock_send_messages.call_args.args[0]
+        self.assertEqual(message.to, ['queued@example.com'])
+
+    def test_forgot_password_queues_reset_email(self):
+        User.objects.create_user(
+            email='forgot@example.com', username='forgotuser',
+            password='OldPassword123!', first_name='F', last_name='User',
+            phone_number='+1920000002',
+        )
+        res = self.client.post(reverse('api:forgot-password'), {'email': 'forgot@example.com'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+
+        get_queue().drain()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(cache.get('reset_otp_forgot@example.com'), mail.outbox[0].body)
+
+    def test_welcome_email_is_queued_after_verification(self):
+        email = 'welcome@example.com'
+        cache.set(f'pending_registration_{email}', {
+            'email': email, 'username': 'welcomeuser', 'password': 'SecurePass123!',
+            'first_name': 'W', 'last_name': 'User', 'phone_number': '+1920000003', 'bio': '',
+        }, timeout=600)
+        cache.set(f'otp_{email}', '111222', timeout=300)
+
+        res = self.client.post(reverse('api:verify-email'), {'email': email, 'otp': '111222'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertEqual(self._queued_recipients(), [email])
+
+    @patch('api.mail.SMTPConnectionPool.send_messages', side_effect=ConnectionError('SMTP down'))
+    def test_smtp_failure_is_retried_not_raised(self, mock_send_messages):
+        User.objects.create_user(
+            email='retry@example.com', username='retryuser',
+            password='OldPassword123!', first_name='R', last_name='User',
+            phone_number='+1920000004',
+        )
+        res = self.client.post(reverse('api:forgot-password'), {'email': 'retry@example.com'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertIs(get_queue().work_one(timeout=0), False)
+        self.assertEqual(len(get_queue()), 1)
+
+
+class RunJobsCommandTests(TestCase):
+    @override_settings(JOB_QUEUE={'BACKEND': 'api.jobs.InProcessJobQueue'})
+    def test_refuses_in_process_backend(self):
+        with self.assertRaises(CommandError):
+            call_command('run_jobs', '--burst', stdout=StringIO())
@@ -3,13 +3,25 @@
 POST /api/auth/logout/ blacklists a refresh token so it can no longer
 be exchanged for a new access token. Access tokens expire naturally."""
 
-from django.test import TestCase
+import os
+import time
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
 from django.urls import reverse
-from django.core.cache import cache
+from django.core.cache import cache, caches
 from rest_framework import status
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from .authentication import (
+    ACCESS_BLACKLIST_KEY_PREFIX,
+    ACCESS_BLACKLIST_CHANNEL,
+    access_blacklist,
+    access_blacklist_key,
+    is_access_token_blacklisted,
+)
 from .models import User
 
 
@@ -168,3 +180,94 @@ class LogoutTests(TestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {new_access}')
         profile = self.client.get(reverse('api:user-profile'))
         self.assertEqual(profile.status_code, status.HTTP_200_OK)
+
+
+class AccessBlacklistMirrorTests(TestCase):
+    """The per-process mirror answers blacklist checks without the cache
+    once it is in sync, and defers to the cache until then."""
+
+    def setUp(self):
+        cache.clear()
+        access_blacklist.reset()
+        self.client = APIClient()
+        self.user = _make_user()
+        self.refresh = RefreshToken.for_user(self.user)
+        self.access = self.refresh.access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def tearDown(self):
+        access_blacklist.reset()
+        cache.clear()
+
+    def _mark_in_sync(self, entries=()):
+        access_blacklist.replace(entries)
+        access_blacklist._in_sync.set()
+
+    def test_in_sync_mirror_skips_cache_for_unknown_tokens(self):
+        self._mark_in_sync()
+        real_get = cache.get
+
+        def no_blacklist_lookups(key, *args, **kwargs):
+            if key.startswith(ACCESS_BLACKLIST_KEY_PREFIX):
+                raise AssertionError('cache hit')
+            return real_get(key, *args, **kwargs)
+
+        with patch('api.authentication.cache.get', side_effect=no_blacklist_lookups):
+            res = self.client.get(reverse('api:user-profile'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_in_sync_mirror_rejects_blacklisted_token(self):
+        self._mark_in_sync([(self.access['jti'], self.access['exp'])])
+        res = self.client.get(reverse('api:user-profile'))
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_updates_local_mirror_immediately(self):
+        self._mark_in_sync()
+        res = self.client.post(reverse('api:logout'), {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_205_RESET_CONTENT)
+        self.assertIn(self.access['jti'], access_blacklist)
+        self.assertEqual(self.client.get(reverse('api:user-profile')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_out_of_sync_mirror_falls_back_to_cache(self):
+        # Another worker blacklisted the token; this worker's mirror hasn't
+        # synced yet, so the cache key must still be honoured.
+        cache.set(access_blacklist_key(self.access['jti']), '1', timeout=60)
+        res = self.client.get(reverse('api:user-profile'))
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_published_message_and_expiry(self):
+        access_blacklist.handle_message(f'abc {time.time() + 60}'.encode())
+        access_blacklist.handle_message(f'old {time.time() - 1}')
+        self.assertIn('abc', access_blacklist)
+        self.assertNotIn('old', access_blacklist)
+        self.assertEqual(len(access_blacklist), 1)
+
+
+@skipUnless(os.environ.get('REDIS_URL'), 'pub/sub sync tests need REDIS_URL')
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', ''),
+        'KEY_PREFIX': 'xbrain-test-blacklist',
+    },
+})
+class AccessBlacklistSyncTests(TestCase):
+    def setUp(self):
+        access_blacklist.reset()
+        access_blacklist._pid = None
+
+    def test_blacklist_from_another_worker_reaches_mirror(self):
+        is_access_token_blacklisted('warmup')  # starts the sync thread
+        deadline = time.time() + 5
+        while not access_blacklist.ready and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(access_blacklist.ready)
+
+        # Simulate another worker: write + publish without touching our mirror.
+        exp = time.time() + 60
+        access_blacklist.replace([])
+        caches['default']._cache.get_client(write=True).publish(ACCESS_BLACKLIST_CHANNEL, f'remote {exp}')
+        deadline = time.time() + 5
+        while 'remote' not in access_blacklist and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(is_access_token_blacklisted('remote'))
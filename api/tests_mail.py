@@ -0,0 +1,113 @@
+"""Tests for the pooled SMTP delivery in api/mail.py, against a local SMTP
+stand-in."""
+
+import smtplib
+import threading
+
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.test import SimpleTestCase, override_settings
+
+from benchmarks.smtp_standin import LocalSMTPServer
+
+from .mail import SMTPConnectionPool
+from .tasks import send_email, send_email_batch
+
+
+def _message(n=0):
+    return EmailMessage(f'Subject {n}', 'Body', 'from@example.com', [f'to{n}@example.com'])
+
+
+class SMTPConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.server = LocalSMTPServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.server.port,
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _pool(self, **kwargs):
+        pool = SMTPConnectionPool(**kwargs)
+        self.addCleanup(pool.close_all)
+        return pool
+
+    def test_connection_is_reused_across_sends(self):
+        pool = self._pool()
+        for n in range(3):
+            self.assertEqual(pool.send_messages([_message(n)]), 1)
+        self.assertEqual(self.server.messages, 3)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(len(pool), 1)
+
+    def test_batch_goes_over_one_connection(self):
+        pool = self._pool()
+        self.assertEqual(pool.send_messages([_message(n) for n in range(5)]), 5)
+        self.assertEqual(self.server.messages, 5)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_empty_batch_opens_nothing(self):
+        self.assertEqual(self._pool().send_messages([]), 0)
+        self.assertEqual(self.server.connections, 0)
+
+    def test_idle_connection_past_timeout_is_replaced(self):
+        pool = self._pool(idle_timeout=0)
+        pool.send_messages([_message(1)])
+        pool.send_messages([_message(2)])
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(self.server.messages, 2)
+
+    def test_health_check_replaces_dropped_connection(self):
+        pool = self._pool(health_check_after=0)
+        pool.send_messages([_message(1)])
+        self.server.drop_connections()
+
+        pool.send_messages([_message(2)])
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(self.server.messages, 2)
+
+    def test_connection_that_failed_mid_send_is_discarded(self):
+        pool = self._pool(health_check_after=60)
+        pool.send_messages([_message(1)])
+        self.server.drop_connections()
+
+        with self.assertRaises((smtplib.SMTPException, OSError)):
+            pool.send_messages([_message(2)])
+        self.assertEqual(len(pool), 0)
+
+        pool.send_messages([_message(3)])
+        self.assertEqual(self.server.messages, 2)
+
+    def test_pool_never_exceeds_its_size(self):
+        pool = self._pool(size=2)
+        threads = [
+            threading.Thread(target=pool.send_messages, args=([_message(n)],))
+            for n in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.server.messages, 8)
+        self.assertLessEqual(self.server.connections, 2)
+        self.assertLessEqual(len(pool), 2)
+
+
+class EmailTasksTests(SimpleTestCase):
+    def test_send_email_task_delivers_through_pool(self):
+        send_email(subject='Hi', message='Your code is 123456', recipient='a@example.com')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['a@example.com'])
+
+    def test_send_email_batch_task(self):
+        send_email_batch([
+            {'subject': 'One', 'message': 'm1', 'recipient': 'a@example.com'},
+            {'subject': 'Two', 'message': 'm2', 'recipient': 'b@example.com'},
+        ])
+        self.assertEqual([m.subject for m in mail.outbox], ['One', 'Two'])
@@ -0,0 +1,197 @@
+"""Tests for the metrics registry and the /metrics endpoint (api/metrics.py)."""
+
+import os
+import re
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from . import metrics
+from .metrics import Counter, Gauge, Histogram, Registry, mark_process_dead
+from .models import Post, Specialization, User
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='MetricsPass123!',
+        first_name='M',
+        last_name='Metrics',
+        phone_number=phone,
+    )
+
+
+def _sample(text, name, **labels):
+    """The value of sample `name{labels}` in an exposition, or None."""
+    wanted = ','.join(f'{k}="{v}"' for k, v in labels.items())
+    pattern = '^' + re.escape(name) + (r'\{' + re.escape(wanted) + r'\}' if labels else '') + r' (\S+)$'
+    match = re.search(pattern, text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+class RegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_text_format(self):
+        requests = Counter('demo_requests_total', 'Requests.', ('route',), registry=self.registry)
+        busy = Gauge('demo_busy', 'Busy "threads".', registry=self.registry)
+        latency = Histogram('demo_seconds', 'Latency.', ('route',), buckets=(0.1, 1), registry=self.registry)
+        requests.inc(route='a"b')
+        requests.inc(2, route='a"b')
+        busy.set(3)
+        for value in (0.05, 0.1, 0.5, 4):
+            latency.observe(value, route='x')
+
+        text = self.registry.exposition()
+        self.assertIn('# TYPE demo_requests_total counter\n', text)
+        self.assertIn('demo_requests_total{route="a\\"b"} 3\n', text)
+        self.assertIn('# HELP demo_busy Busy "threads".\n# TYPE demo_busy gauge\ndemo_busy 3\n', text)
+        self.assertIn(
+            'demo_seconds_bucket{route="x",le="0.1"} 2\n'
+            'demo_seconds_bucket{route="x",le="1"} 3\n'
+            'demo_seconds_bucket{route="x",le="+Inf"} 4\n'
+            'demo_seconds_sum{route="x"} 4.65\n'
+            'demo_seconds_count{route="x"} 4\n',
+            text,
+        )
+
+    def test_labels_must_match(self):
+        requests = Counter('demo_total', 'Requests.', ('route',), registry=self.registry)
+        with self.assertRaises(ValueError):
+            requests.inc(path='/')
+        with self.assertRaises(ValueError):
+            requests.inc(-1, route='a')
+        with self.assertRaises(ValueError):
+            Counter('demo_total', 'Again.', registry=self.registry)
+
+
+class MultiprocessTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        override = override_settings(METRICS_MULTIPROCESS_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.registry = Registry()
+        self.requests = Counter('mp_requests_total', 'Requests.', ('route',), registry=self.registry)
+        self.busy = Gauge('mp_busy', 'Busy.', registry=self.registry)
+
+    def _in_child(self, func):
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the child
+            try:
+                func()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        return pid
+
+    def test_values_of_all_processes_are_summed(self):
+        self.requests.inc(route='a')
+        self.busy.inc()
+
+        def child():
+            self.requests.inc(5, route='a')
+            self.requests.inc(route='b')
+            self.busy.inc(2)
+
+        child_pid = self._in_child(child)
+        text = self.registry.exposition()
+        self.assertEqual(_sample(text, 'mp_requests_total', route='a'), 6)
+        self.assertEqual(_sample(text, 'mp_requests_total', route='b'), 1)
+        self.assertEqual(_sample(text, 'mp_busy'), 3)
+
+        # A reaped worker's gauges go; its totals stay.
+        mark_process_dead(child_pid)
+        text = self.registry.exposition()
+        self.assertEqual(_sample(text, 'mp_busy'), 1)
+        self.assertEqual(_sample(text, 'mp_requests_total', route='a'), 6)
+
+    def test_files_grow_and_reopen(self):
+        for n in range(3000):
+            self.requests.inc(n, route=f'route-{n}')
+        reopened = Registry()
+        Counter('mp_requests_total', 'Requests.', ('route',), registry=reopened)
+        values = reopened.values()
+        self.assertEqual(len(values), 3000)
+        self.assertEqual(values['["mp_requests_total","mp_requests_total",[["route","route-2999"]]]'], 2999)
+
+
+@override_settings(METRICS_ENABLED=True, INSTRUMENTATION_SAMPLE_RATE=0)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        user = _make_user('metrics@example.com', 'metricsuser', '+1250000001')
+        spec = Specialization.objects.get_or_create(name='Backend', defaults={'description': ''})[0]
+        Post.objects.create(author=user, content='Counted').specializations.add(spec)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _scrape(self):
+        with override_settings(DEBUG=True):
+            response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def _value(self, name, **labels):
+        return _sample(self._scrape(), name, **labels) or 0
+
+    def test_requests_are_counted_per_route(self):
+        before = {
+            'requests': self._value('xbrain_http_requests_total', method='GET', route='api:posts', status=200),
+            'latency': self._value('xbrain_http_request_duration_seconds_count', method='GET', route='api:posts'),
+            'queries': self._value('xbrain_db_queries_per_request_count', route='api:posts'),
+            'miss': self._value('xbrain_cache_requests_total', cache='response', result='miss'),
+            'hit': self._value('xbrain_cache_requests_total', cache='response', result='hit'),
+        }
+        self.client.get(reverse('api:posts'))
+        self.client.get(reverse('api:posts'))
+
+        text = self._scrape()
+        labels = {'method': 'GET', 'route': 'api:posts'}
+        self.assertEqual(_sample(text, 'xbrain_http_requests_total', **labels, status=200), before['requests'] + 2)
+        self.assertEqual(_sample(text, 'xbrain_http_request_duration_seconds_count', **labels), before['latency'] + 2)
+        self.assertEqual(_sample(text, 'xbrain_db_queries_per_request_count', route='api:posts'), before['queries'] + 2)
+        self.assertEqual(_sample(text, 'xbrain_cache_requests_total', cache='response', result='miss'), before['miss'] + 1)
+        self.assertEqual(_sample(text, 'xbrain_cache_requests_total', cache='response', result='hit'), before['hit'] + 1)
+        # Only the scrape itself is in flight.
+        self.assertEqual(_sample(text, 'xbrain_http_requests_in_flight'), 1)
+
+    def test_unmatched_routes_share_one_label(self):
+        before = self._value('xbrain_http_requests_total', method='GET', route='unmatched', status=404)
+        self.client.get('/no-such-page/')
+        self.assertEqual(
+            self._value('xbrain_http_requests_total', method='GET', route='unmatched', status=404), before + 1,
+        )
+
+    def test_unknown_methods_share_one_label(self):
+        before = self._value('xbrain_http_requests_total', method='other', route='unmatched', status=404)
+        for method in ('FOO1', 'FOO2', 'FOO3'):
+            self.client.generic(method, '/no-such-page/')
+        text = self._scrape()
+        self.assertEqual(
+            _sample(text, 'xbrain_http_requests_total', method='other', route='unmatched', status=404), before + 3,
+        )
+        self.assertNotIn('FOO', text)
+
+    @override_settings(DEBUG=False, METRICS_TOKEN=None)
+    def test_endpoint_is_hidden_without_a_token_outside_debug(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+    @override_settings(DEBUG=False, METRICS_TOKEN='scrape-secret')
+    def test_endpoint_requires_the_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE xbrain_http_requests_total counter', response.content)
@@ -3,13 +3,17 @@
 Posts mirror the Question shape (no resolve flag) and add a per-user
 like/dislike reaction system."""
 
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models.signals import post_init
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.core.cache import cache
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from .models import User, Specialization, Post, PostReaction
+from .models import User, Specialization, Post, PostReaction, Comment
 
 
 def _make_user(email, username, phone):
@@ -283,3 +287,79 @@ class PostReactionTests(TestCase):
         res = self.client.post(reverse('api:post-like', args=[self.post_id]))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data['my_reaction'], 'like')
+
+
+class PostFeedPrefetchTests(TestCase):
+    """The list path must not load comment rows at all, and the detail path
+    must load a bounded slice of the thread in a fixed number of queries."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.alice = _make_user('qalice@example.com', 'qalice01', '+1200000006')
+        self.spec = _spec('Backend')
+        self.posts = []
+        for i in range(3):
+            post = Post.objects.create(author=self.alice, content=f'post {i}')
+            post.specializations.add(self.spec)
+            self.posts.append(post)
+        # 15 top-level comments with 5 replies each on every post.
+        for post in self.posts:
+            for c in range(15):
+                top = Comment.objects.create(post=post, author=self.alice, content=f'c{c}')
+                Comment.objects.bulk_create([
+                    Comment(post=post, author=self.alice, content=f'r{r}', parent_comment=top)
+                    for r in range(5)
+                ])
+        # The attachments prefetch resolves Post's ContentType once per process;
+        # warm that cache so the counts below are deterministic.
+        ContentType.objects.get_for_model(Post)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _count_loaded_comments(self, fn):
+        loaded = []
+
+        def on_init(sender, instance, **kwargs):
+            loaded.append(instance)
+
+        post_init.connect(on_init, sender=Comment)
+        try:
+            with CaptureQueriesContext(connection) as ctx:
+                res = fn()
+        finally:
+            post_init.disconnect(on_init, sender=Comment)
+        return res, len(loaded), len(ctx.captured_queries)
+
+    def test_list_loads_no_comment_rows(self):
+        res, rows, queries = self._count_loaded_comments(
+            lambda: self.client.get(reverse('api:posts'))
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 3)
+        self.assertEqual(rows, 0)
+        # count + posts + specializations + attachments
+        self.assertEqual(queries, 4)
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        _, _, before = self._count_loaded_comments(lambda: self.client.get(reverse('api:posts')))
+        for i in range(10):
+            Post.objects.create(author=self.alice, content=f'extra {i}').specializations.add(self.spec)
+        _, _, after = self._count_loaded_comments(lambda: self.client.get(reverse('api:posts')))
+        self.assertEqual(before, after)
+
+    def test_detail_loads_bounded_thread(self):
+        post = self.posts[0]
+        res, rows, queries = self._count_loaded_comments(
+            lambda: self.client.get(reverse('api:post-detail', args=[post.id]))
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['comments']), 10)
+        self.assertTrue(all(len(c['replies']) == 2 for c in res.data['comments']))
+        self.assertTrue(all(c['replies_count'] == 5 for c in res.data['comments']))
+        self.assertEqual(res.data['comments_count'], 0)  # ORM writes bypass the counter paths
+        # 10 top-level comments + 2 replies each — never the full 90-row thread.
+        self.assertEqual(rows, 10 + 10 * 2)
+        # validator + post + specializations + attachments + one windowed thread query
+        self.assertEqual(queries, 5)
@@ -6,13 +6,14 @@ Decisions baked in:
 - D3 = question detail embeds first 10 top-level answers, each with first 2 replies inline.
 """
 
+from django.contrib.contenttypes.models import ContentType
 from django.test import TestCase
 from django.urls import reverse
 from django.core.cache import cache
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from .models import User, Specialization, Question, Answer
+from .models import User, Specialization, Question, Answer, Attachment
 
 
 def _make_user(email, username, phone):
@@ -1090,3 +1091,64 @@ class ResolvedAtTimestampTests(TestCase):
         self.client.post(reverse('api:question-resolve', args=[self.q_id]))
         res = self.client.post(reverse('api:question-unresolve', args=[self.q_id]))
         self.assertIsNone(res.data['resolved_at'])
+
+
+class QuestionDetailBatchLoadTests(TestCase):
+    """The question detail embeds 10 answers × 2 replies (with authors and
+    attachments) in a fixed number of queries, however big the thread is."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.asker = _make_user('batch@example.com', 'batchusr', '+1000008001')
+        self.question = Question.objects.create(author=self.asker, content='Big thread')
+        self.question.specializations.add(_spec('Backend'))
+        self.answerers = [
+            _make_user(f'batch{i}@example.com', f'batchans{i}', f'+100000810{i}')
+            for i in range(3)
+        ]
+        ct = ContentType.objects.get_for_model(Answer)
+        for i in range(12):
+            answer = Answer.objects.create(
+                question=self.question, author=self.answerers[i % 3], content=f'a{i}',
+            )
+            for r in range(i % 4):
+                reply = Answer.objects.create(
+                    question=self.question, author=self.answerers[r % 3],
+                    content=f'a{i}-r{r}', parent_answer=answer,
+                )
+                Attachment.objects.create(
+                    content_type=ct, object_id=reply.pk, file='attachments/x.png',
+                    kind='image', mime_type='image/png', size_bytes=1, original_filename='x.png',
+                )
+        ContentType.objects.get_for_model(Question)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_detail_shape(self):
+        res = self.client.get(reverse('api:question-detail', args=[self.question.id]))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        answers = res.data['answers']
+        self.assertEqual([a['content'] for a in answers], [f'a{i}' for i in range(10)])
+        for i, answer in enumerate(answers):
+            self.assertEqual(answer['replies_count'], i % 4)
+            self.assertEqual(
+                [r['content'] for r in answer['replies']],
+                [f'a{i}-r{r}' for r in range(min(i % 4, 2))],
+            )
+            for reply in answer['replies']:
+                self.assertEqual(len(reply['attachments']), 1)
+                self.assertIn('username', reply['author'])
+
+    def test_detail_query_count_is_constant(self):
+        # validator + question + specializations + question attachments
+        # + one windowed thread query + thread attachments
+        with self.assertNumQueries(6):
+            self.client.get(reverse('api:question-detail', args=[self.question.id]))
+
+        for i in range(20):
+            answer = Answer.objects.create(question=self.question, author=self.asker, content=f'late{i}')
+            Answer.objects.create(question=self.question, author=self.asker, content='r', parent_answer=answer)
+        with self.assertNumQueries(6):
+            self.client.get(reverse('api:question-detail', args=[self.question.id]))
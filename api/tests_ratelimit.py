@@ -0,0 +1,169 @@
+"""Tests for the atomic counters in api/ratelimit.py and the OTP / login
+paths built on them.
+
+The concurrency tests hammer one key from many threads at once: with the old
+get → +1 → set pattern they let more than `limit` hits through."""
+
+import os
+import threading
+from unittest import skipUnless
+
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from . import ratelimit
+from .models import User
+from .utils import send_otp_and_store
+
+
+def _hammer(func, threads=16, calls_per_thread=10):
+    """Call `func` threads × calls_per_thread times, all threads released
+    together. Returns every result."""
+    barrier = threading.Barrier(threads)
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        barrier.wait()
+        mine = [func() for _ in range(calls_per_thread)]
+        with lock:
+            results.extend(mine)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return results
+
+
+class CounterSemanticsMixin:
+    """Behaviour every counters backend must share."""
+
+    def setUp(self):
+        cache.clear()
+        self.counters = ratelimit.get_counters()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_incr_counts_and_is_readable_through_cache(self):
+        self.assertEqual(self.counters.incr('rl_incr', 60), 1)
+        self.assertEqual(self.counters.incr('rl_incr', 60), 2)
+        self.assertEqual(cache.get('rl_incr'), 2)
+        cache.delete('rl_incr')
+        self.assertEqual(self.counters.incr('rl_incr', 60), 1)
+
+    def test_consume_stops_at_limit_without_counting(self):
+        results = [self.counters.consume('rl_consume', 3, 60) for _ in range(5)]
+        self.assertEqual(results, [(True, 1), (True, 2), (True, 3), (False, 3), (False, 3)])
+
+    def test_throttle_enforces_cooldown_then_quota(self):
+        first = self.counters.throttle('rl_cool', 30, 'rl_count', 2, 300)
+        self.assertEqual(first, ratelimit.Throttle(True, 0, 1))
+
+        cooling = self.counters.throttle('rl_cool', 30, 'rl_count', 2, 300)
+        self.assertFalse(cooling.allowed)
+        self.assertTrue(0 < cooling.retry_after <= 30)
+        self.assertEqual(cooling.count, 1)
+
+        cache.delete('rl_cool')  # cooldown elapsed
+        self.assertTrue(self.counters.throttle('rl_cool', 30, 'rl_count', 2, 300).allowed)
+        cache.delete('rl_cool')
+        exhausted = self.counters.throttle('rl_cool', 30, 'rl_count', 2, 300)
+        self.assertEqual(exhausted, ratelimit.Throttle(False, 0, 2))
+
+    def test_concurrent_incr_loses_no_updates(self):
+        results = _hammer(lambda: self.counters.incr('rl_race_incr', 60))
+        self.assertEqual(sorted(results), list(range(1, 161)))
+        self.assertEqual(cache.get('rl_race_incr'), 160)
+
+    def test_concurrent_consume_never_exceeds_limit(self):
+        results = _hammer(lambda: self.counters.consume('rl_race_consume', 5, 60))
+        allowed = [count for ok, count in results if ok]
+        self.assertEqual(sorted(allowed), [1, 2, 3, 4, 5])
+
+    def test_concurrent_throttle_lets_exactly_one_through(self):
+        results = _hammer(lambda: self.counters.throttle('rl_race_cool', 60, 'rl_race_count', 3, 300))
+        self.assertEqual(sum(1 for r in results if r.allowed), 1)
+        self.assertEqual(cache.get('rl_race_count'), 1)
+
+
+class LocalCountersTests(CounterSemanticsMixin, TestCase):
+    def test_locmem_uses_local_counters(self):
+        self.assertIsInstance(self.counters, ratelimit.LocalCounters)
+
+
+@skipUnless(os.environ.get('REDIS_URL'), 'RedisCounters tests need REDIS_URL')
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', ''),
+        'KEY_PREFIX': 'xbrain-test-ratelimit',
+    },
+})
+class RedisCountersTests(CounterSemanticsMixin, TestCase):
+    def test_redis_uses_redis_counters(self):
+        self.assertIsInstance(self.counters, ratelimit.RedisCounters)
+
+
+class OTPThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    @override_settings(OTP_RESEND_DELAY_SECONDS=60)
+    def test_second_send_within_cooldown_is_refused(self):
+        ok, otp, error = send_otp_and_store('otp@example.com')
+        self.assertTrue(ok)
+        self.assertEqual(cache.get('otp_otp@example.com'), otp)
+
+        ok, otp, error = send_otp_and_store('otp@example.com')
+        self.assertFalse(ok)
+        self.assertIn('Please wait', error)
+
+    @override_settings(OTP_MAX_RESEND_ATTEMPTS=2)
+    def test_quota_is_enforced_after_cooldown(self):
+        for _ in range(2):
+            self.assertTrue(send_otp_and_store('quota@example.com')[0])
+            cache.delete('otp_last_sent_quota@example.com')
+        ok, _, error = send_otp_and_store('quota@example.com')
+        self.assertFalse(ok)
+        self.assertIn('Maximum OTP resend attempts', error)
+
+    def test_concurrent_sends_issue_one_code(self):
+        results = _hammer(lambda: send_otp_and_store('burst@example.com')[0], threads=8, calls_per_thread=2)
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(caches['default'].get('otp_resend_count_burst@example.com'), 1)
+
+
+class LoginLockoutConcurrencyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(
+            email='lockout@example.com', username='lockoutuser',
+            password='RightPass123!', first_name='L', last_name='User',
+            phone_number='+1930000001',
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_concurrent_wrong_passwords_cannot_exceed_max_attempts(self):
+        from .utils import consume_login_attempt
+
+        results = _hammer(lambda: consume_login_attempt('lockout@example.com')[0])
+        self.assertEqual(results.count(True), 5)
+        self.assertEqual(cache.get('login_attempts_lockout@example.com'), 5)
+
+        res = APIClient().post(reverse('api:login'), {
+            'identifier': 'lockout@example.com',
+            'password': 'RightPass123!',
+        }, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('locked', str(res.data['error']).lower())
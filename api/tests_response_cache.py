@@ -0,0 +1,141 @@
+"""Tests for the shared response cache on question and post reads
+(api/response_cache.py)."""
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import Answer, Post, PostReaction, Question, Specialization, User
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='CachePass123!',
+        first_name='C',
+        last_name='Cache',
+        phone_number=phone,
+    )
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.alice = _make_user('calice@example.com', 'calice01', '+1210000001')
+        self.bob = _make_user('cbob@example.com', 'cbob01', '+1210000002')
+        self.spec = Specialization.objects.get_or_create(name='Backend', defaults={'description': ''})[0]
+        self.question = Question.objects.create(author=self.alice, content='How do I cache?')
+        self.question.specializations.add(self.spec)
+        self.posts = []
+        for n in range(3):
+            post = Post.objects.create(author=self.alice, content=f'Tip {n}')
+            post.specializations.add(self.spec)
+            self.posts.append(post)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_anonymous_reads_are_served_without_queries(self):
+        for url in (
+            reverse('api:questions'),
+            reverse('api:question-detail', args=[self.question.pk]),
+            reverse('api:posts'),
+            reverse('api:post-detail', args=[self.posts[0].pk]),
+        ):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(second.data, first.data)
+            self.assertEqual(second['ETag'], first['ETag'])
+            self.assertEqual(second['Cache-Control'], 'public, no-cache')
+
+    def test_query_params_are_normalized(self):
+        url = reverse('api:posts')
+        self.client.get(url, {'author': str(self.alice.pk), 'specialization': str(self.spec.pk)})
+        with self.assertNumQueries(0):
+            self.client.get(f'{url}?specialization={self.spec.pk}&q=&author={self.alice.pk}')
+
+    def test_if_none_match_returns_304(self):
+        url = reverse('api:questions')
+        etag = self.client.get(url)['ETag']
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_answer_write_invalidates_question_responses(self):
+        detail = reverse('api:question-detail', args=[self.question.pk])
+        etag = self.client.get(detail)['ETag']
+        self.assertEqual(self.client.get(reverse('api:questions')).data['results'][0]['answers_count'], 0)
+
+        self.client.force_authenticate(user=self.bob)
+        res = self.client.post(
+            reverse('api:question-answers', args=[self.question.pk]), {'content': 'Use Redis'}, format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.client.force_authenticate(user=None)
+
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('api:questions')).data['results'][0]['answers_count'], 1)
+
+    def test_post_writes_do_not_invalidate_question_responses(self):
+        url = reverse('api:questions')
+        self.client.get(url)
+        Post.objects.create(author=self.bob, content='Unrelated')
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_deleting_a_question_invalidates(self):
+        url = reverse('api:questions')
+        detail = reverse('api:question-detail', args=[self.question.pk])
+        self.client.get(url)
+        self.client.get(detail)
+        Answer.objects.create(question=self.question, author=self.bob, content='x')
+        self.question.delete()
+        self.assertEqual(self.client.get(url).data['results'], [])
+        self.assertEqual(self.client.get(detail).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_missing_detail_is_not_cached(self):
+        url = reverse('api:post-detail', args=['00000000-0000-0000-0000-000000000000'])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_my_reaction_is_merged_per_viewer_over_the_shared_body(self):
+        PostReaction.objects.create(user=self.bob, post=self.posts[1], reaction='like')
+        url = reverse('api:posts')
+        anonymous = self.client.get(url)
+        self.assertEqual({p['my_reaction'] for p in anonymous.data['results']}, {None})
+
+        self.client.force_authenticate(user=self.bob)
+        with self.assertNumQueries(1):  # the viewer's reactions; the body is cached
+            bob = self.client.get(url)
+        reactions = {p['id']: p['my_reaction'] for p in bob.data['results']}
+        self.assertEqual(reactions[str(self.posts[1].pk)], 'like')
+        self.assertEqual(reactions[str(self.posts[0].pk)], None)
+        self.assertEqual(bob['Cache-Control'], 'private, no-cache')
+        self.assertNotEqual(bob['ETag'], anonymous['ETag'])
+
+        self.client.force_authenticate(user=self.alice)
+        alice = self.client.get(url)
+        self.assertEqual({p['my_reaction'] for p in alice.data['results']}, {None})
+        self.assertEqual(alice['ETag'], anonymous['ETag'])
+
+        self.client.force_authenticate(user=None)
+        self.assertEqual({p['my_reaction'] for p in self.client.get(url).data['results']}, {None})
+
+    def test_reaction_toggle_refreshes_counts_and_my_reaction(self):
+        detail = reverse('api:post-detail', args=[self.posts[0].pk])
+        self.client.force_authenticate(user=self.bob)
+        before = self.client.get(detail)
+        self.assertEqual(before.data['likes_count'], 0)
+
+        self.client.post(reverse('api:post-like', args=[self.posts[0].pk]))
+        after = self.client.get(detail, HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(after.status_code, status.HTTP_200_OK)
+        self.assertEqual(after.data['likes_count'], 1)
+        self.assertEqual(after.data['my_reaction'], 'like')
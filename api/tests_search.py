@@ -0,0 +1,117 @@
+"""Tests for ?q= search on the question and post feeds.
+
+On PostgreSQL, search uses the trigger-maintained `search_vector` column
+(websearch_to_tsquery + rank) with a pg_trgm word-similarity fallback for
+prefixes and short terms. Other backends fall back to icontains, so the
+ranking / prefix tests only run against PostgreSQL."""
+
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import User, Specialization, Question, Post
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='SearchPass123!',
+        first_name='S',
+        last_name='User',
+        phone_number=phone,
+    )
+
+
+class _SearchFixtureMixin:
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = _make_user('search@example.com', 'searchuser', '+1900000001')
+        self.spec = Specialization.objects.create(name='Backend', description='')
+
+    def tearDown(self):
+        cache.clear()
+
+    def _question(self, content):
+        q = Question.objects.create(author=self.user, content=content)
+        q.specializations.add(self.spec)
+        return q
+
+    def _search(self, url_name, term, **extra):
+        res = self.client.get(reverse(url_name), {'q': term, **extra})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [r['content_preview'] for r in res.data['results']]
+
+
+class SearchBasicsTests(_SearchFixtureMixin, TestCase):
+    """Behaviour every backend shares."""
+
+    def test_matches_are_case_insensitive(self):
+        self._question('Deploying Django on Azure')
+        self._question('Best ML libraries')
+        self.assertEqual(self._search('api:questions', 'AZURE'), ['Deploying Django on Azure'])
+
+    def test_blank_query_is_ignored(self):
+        self._question('one')
+        self._question('two')
+        self.assertEqual(len(self._search('api:questions', '   ')), 2)
+
+    def test_search_combines_with_specialization_filter(self):
+        self._question('Django caching tips')
+        other = Specialization.objects.create(name='ML', description='')
+        q = Question.objects.create(author=self.user, content='Django for ML pipelines')
+        q.specializations.add(other)
+        results = self._search('api:questions', 'django', specialization=str(other.id))
+        self.assertEqual(results, ['Django for ML pipelines'])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Full-text search requires PostgreSQL')
+class PostgresFullTextSearchTests(_SearchFixtureMixin, TestCase):
+
+    def test_search_vector_is_maintained_by_trigger(self):
+        q = self._question('Configuring gunicorn workers')
+        q.refresh_from_db(fields=['search_vector'])
+        self.assertIsNotNone(q.search_vector)
+
+        Question.objects.filter(pk=q.pk).update(content='Tuning PostgreSQL indexes')
+        self.assertEqual(self._search('api:questions', 'indexes'), ['Tuning PostgreSQL indexes'])
+        self.assertEqual(self._search('api:questions', 'gunicorn'), [])
+
+    def test_stemming_matches_word_forms(self):
+        self._question('How do I deploy a container?')
+        self.assertEqual(self._search('api:questions', 'deploying'), ['How do I deploy a container?'])
+
+    def test_ranks_better_matches_first(self):
+        self._question('Azure pricing question')
+        self._question('Django on Azure: deploying Django with Azure Postgres')
+        self._question('Unrelated Kubernetes question')
+        results = self._search('api:questions', 'django azure')
+        self.assertEqual(results[0], 'Django on Azure: deploying Django with Azure Postgres')
+        self.assertNotIn('Unrelated Kubernetes question', results)
+
+    def test_websearch_syntax_exclusion(self):
+        self._question('Azure with Django')
+        self._question('Azure with Flask')
+        self.assertEqual(self._search('api:questions', 'azure -django'), ['Azure with Flask'])
+
+    def test_prefix_matches_via_trigram_fallback(self):
+        self._question('Django deployment checklist')
+        self._question('Flask deployment checklist')
+        self.assertEqual(self._search('api:questions', 'djan'), ['Django deployment checklist'])
+
+    def test_misspelling_matches_via_trigram_fallback(self):
+        self._question('Kubernetes autoscaling')
+        self.assertEqual(self._search('api:questions', 'kubernets'), ['Kubernetes autoscaling'])
+
+    def test_post_feed_uses_same_search(self):
+        for content in ('Postgres vacuum tuning', 'React hooks'):
+            p = Post.objects.create(author=self.user, content=content)
+            p.specializations.add(self.spec)
+        self.assertEqual(self._search('api:posts', 'vacuuming'), ['Postgres vacuum tuning'])
+        self.assertEqual(self._search('api:posts', 'vacu'), ['Postgres vacuum tuning'])
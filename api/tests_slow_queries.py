@@ -0,0 +1,227 @@
+"""Tests for slow-query capture and sampled EXPLAIN (api/slow_queries.py)."""
+
+import json
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from . import slow_queries
+from .models import Post, Specialization, User
+from .slow_queries import fingerprint, get_ring, normalize
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='SlowPass123!',
+        first_name='S',
+        last_name='Slow',
+        phone_number=phone,
+    )
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_literals_placeholders_and_lists_collapse(self):
+        self.assertEqual(
+            normalize("SELECT  \"a\".\"id\" FROM \"a\"\n WHERE \"a\".\"b\" = 'x''y' AND \"a\".\"n\" IN (%s, %s, %s) LIMIT 20"),
+            'SELECT "a"."id" FROM "a" WHERE "a"."b" = ? AND "a"."n" IN (...) LIMIT ?',
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s, %s)'),
+        )
+        self.assertEqual(
+            normalize('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)'),
+            'INSERT INTO t (a, b) VALUES (...), ...',
+        )
+
+    def test_identifiers_with_digits_are_kept(self):
+        self.assertEqual(normalize('SELECT t1.col2 FROM "api_v2" t1'), 'SELECT t1.col2 FROM "api_v2" t1')
+
+    def test_distinct_is_a_different_shape(self):
+        self.assertNotEqual(
+            fingerprint('SELECT "p"."id" FROM "p" WHERE "s"."id" = %s'),
+            fingerprint('SELECT DISTINCT "p"."id" FROM "p" WHERE "s"."id" = %s'),
+        )
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_SIZE=200, INSTRUMENTATION_SAMPLE_RATE=0)
+class CaptureTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        slow_queries._explained.clear()
+        get_ring().clear()
+        self.client = APIClient()
+        self.user = _make_user('slow@example.com', 'slowuser', '+1260000001')
+        self.spec = Specialization.objects.get_or_create(name='Backend', defaults={'description': ''})[0]
+        for n in range(3):
+            Post.objects.create(author=self.user, content=f'Post {n}').specializations.add(self.spec)
+
+    def tearDown(self):
+        cache.clear()
+        get_ring().clear()
+
+    def _get_feed(self):
+        with self.assertLogs('api.slow_queries', 'WARNING'):
+            response = self.client.get(reverse('api:posts'), {'specialization': self.spec.pk})
+        self.assertEqual(response.status_code, 200)
+
+    def test_statements_are_captured_with_route_and_plan(self):
+        self._get_feed()
+        entries = get_ring().entries()
+        feed = [e for e in entries if e['sql'].startswith('SELECT DISTINCT "posts"')]
+        self.assertTrue(feed)
+        entry = feed[-1]
+        self.assertEqual(entry['route'], 'api:posts')
+        self.assertEqual(entry['database'], 'default')
+        self.assertTrue(any(self.spec.pk.hex in param.replace('-', '') for param in entry['params']))
+        self.assertRegex(entry['plan'], r'SCAN|SEARCH')
+        self.assertIsNone(entry['explain_error'])
+
+    def test_only_the_first_of_each_shape_is_explained(self):
+        self._get_feed()
+        cache.clear()  # a cold response cache, so the same statements run again
+        self._get_feed()
+        explained = {}
+        for entry in get_ring().entries():
+            if entry['plan']:
+                explained.setdefault(entry['fingerprint'], 0)
+                explained[entry['fingerprint']] += 1
+        self.assertTrue(explained)
+        self.assertEqual(set(explained.values()), {1})
+
+    def test_other_workers_claim_is_respected(self):
+        sql = 'SELECT %s'
+        cache.add(f'{slow_queries.EXPLAINED_KEY_PREFIX}{fingerprint(sql)}', 1)
+        with self.assertLogs('api.slow_queries', 'WARNING'):
+            entry = slow_queries.capture(connection, sql, [1], False, 300.0)
+        self.assertIsNone(entry['plan'])
+
+    def test_shapes_are_explained_again_after_the_ttl(self):
+        sql = 'SELECT %s'
+        with self.assertLogs('api.slow_queries', 'WARNING'):
+            self.assertIsNotNone(slow_queries.capture(connection, sql, [1], False, 300.0)['plan'])
+            self.assertIsNone(slow_queries.capture(connection, sql, [1], False, 300.0)['plan'])
+            cache.delete(f'{slow_queries.EXPLAINED_KEY_PREFIX}{fingerprint(sql)}')  # the shared claim expired
+            slow_queries._explained[fingerprint(sql)] -= slow_queries.EXPLAIN_TTL
+            self.assertIsNotNone(slow_queries.capture(connection, sql, [1], False, 300.0)['plan'])
+
+    def test_explain_stays_out_of_query_counts(self):
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=-1):
+            self.client.get(reverse('api:posts'), {'specialization': self.spec.pk})  # warm per-process caches
+        cache.clear()
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=-1), CaptureQueriesContext(connection) as plain:
+            self.client.get(reverse('api:posts'), {'specialization': self.spec.pk})
+        cache.clear()
+        with self.assertLogs('api.slow_queries', 'WARNING'), CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse('api:posts'), {'specialization': self.spec.pk})
+        self.assertEqual(len(captured), len(plain))
+        self.assertTrue(any(entry['plan'] for entry in get_ring().entries()))
+
+    def test_writes_are_captured_but_not_explained(self):
+        self.client.force_authenticate(self.user)
+        with self.assertLogs('api.slow_queries', 'WARNING'):
+            response = self.client.post(reverse('api:posts'), {
+                'content': 'Slow write', 'specializations': [str(self.spec.pk)],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        inserts = [e for e in get_ring().entries() if e['statement'].startswith('INSERT')]
+        self.assertTrue(inserts)
+        self.assertTrue(all(e['plan'] is None and e['explain_error'] is None for e in inserts))
+
+    def test_a_failing_explain_leaves_the_transaction_usable(self):
+        plan, error = slow_queries.explain(connection, 'SELECT * FROM no_such_table', None)
+        self.assertIsNone(plan)
+        self.assertIn('no_such_table', error)
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+
+    @skipUnless(connection.vendor == 'postgresql', 'statement_timeout is PostgreSQL-only')
+    def test_explain_is_cut_off_by_its_timeout(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            before = cursor.fetchone()[0]
+        plan, error = slow_queries.explain(connection, 'SELECT pg_sleep(%s)', [5], timeout_ms=100)
+        self.assertIsNone(plan)
+        self.assertIn('statement timeout', error)
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            self.assertEqual(cursor.fetchone()[0], before)
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+
+    @override_settings(SLOW_QUERY_LOG_SIZE=3)
+    def test_buffer_keeps_the_newest_entries(self):
+        with self.assertLogs('api.slow_queries', 'WARNING'):
+            for n in range(5):
+                slow_queries.capture(connection, f'SELECT {n}', None, False, 300.0 + n)
+        self.assertEqual([e['duration_ms'] for e in get_ring().entries()], [304.0, 303.0, 302.0])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=-1)
+    def test_negative_threshold_turns_capture_off(self):
+        with self.assertNoLogs('api.slow_queries', 'WARNING'):
+            self.client.get(reverse('api:posts'))
+        self.assertEqual(get_ring().entries(), [])
+
+
+@override_settings(SLOW_QUERY_LOG_SIZE=200)
+class SlowQueryViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        slow_queries._explained.clear()
+        ring = get_ring()
+        ring.clear()
+        self.client = APIClient()
+        self.user = _make_user('member@example.com', 'memberuser', '+1260000002')
+        self.staff = _make_user('staff@example.com', 'staffuser', '+1260000003')
+        User.objects.filter(pk=self.staff.pk).update(is_staff=True)
+        self.staff.refresh_from_db()
+        with self.assertLogs('api.slow_queries', 'WARNING'):
+            self.first = slow_queries.capture(connection, 'SELECT %s', [1], False, 250.0, 'api:posts')
+            self.second = slow_queries.capture(connection, 'SELECT %s, %s', [1, 2], False, 450.0, 'api:questions')
+
+    def tearDown(self):
+        cache.clear()
+        get_ring().clear()
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get(reverse('api:slow-queries')).status_code, 401)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(reverse('api:slow-queries')).status_code, 403)
+        self.assertEqual(self.client.delete(reverse('api:slow-queries')).status_code, 403)
+
+    def test_lists_newest_first_and_filters(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(reverse('api:slow-queries'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertFalse(response.data['shared'])
+        self.assertEqual([e['route'] for e in response.data['results']], ['api:questions', 'api:posts'])
+
+        response = self.client.get(reverse('api:slow-queries'), {'fingerprint': self.first['fingerprint']})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['params'], ['1'])
+
+    def test_delete_clears(self):
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.delete(reverse('api:slow-queries')).status_code, 204)
+        self.assertEqual(self.client.get(reverse('api:slow-queries')).data['count'], 0)
+
+    def test_command_dumps_and_clears(self):
+        out, err = StringIO(), StringIO()
+        call_command('slow_queries', '--json', stdout=out, stderr=err)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([e['fingerprint'] for e in lines], [self.second['fingerprint'], self.first['fingerprint']])
+        self.assertIn('not Redis', err.getvalue())
+
+        out = StringIO()
+        call_command('slow_queries', '--limit', '1', '--clear', stdout=out, stderr=StringIO())
+        self.assertIn('450.0 ms  api:questions', out.getvalue())
+        self.assertIn('1 slow query (buffer cleared)', out.getvalue())
+        self.assertEqual(get_ring().entries(), [])
@@ -0,0 +1,148 @@
+"""Tests for per-request and cross-request storage URL caching
+(api/storage_urls.py)."""
+
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .models import Attachment, Post, Specialization, User
+from .storage_urls import URLCache, storage_url, url_cache
+
+
+class SigningStorage(FileSystemStorage):
+    """FileSystemStorage whose URLs look signed: each `url()` call returns a
+    fresh one and is counted, like AzureStorage with expiring SAS URLs."""
+
+    calls = 0
+
+    def __init__(self, expiration_secs=None, **kwargs):
+        self.expiration_secs = expiration_secs
+        super().__init__(**kwargs)
+
+    def url(self, name):
+        type(self).calls += 1
+        return f'{super().url(name)}?sig={type(self).calls}'
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='UrlPass123!',
+        first_name='U',
+        last_name='Urls',
+        phone_number=phone,
+    )
+
+
+class URLCacheTests(SimpleTestCase):
+    def test_entries_expire_at_their_deadline(self):
+        urls = URLCache()
+        urls.set('a', 'https://x/a', ttl=30, now=100)
+        self.assertEqual(urls.get('a', now=129), 'https://x/a')
+        self.assertIsNone(urls.get('a', now=130))
+        self.assertEqual(len(urls), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        urls = URLCache(max_entries=2)
+        urls.set('a', 'A', ttl=60, now=0)
+        urls.set('b', 'B', ttl=60, now=0)
+        urls.get('a', now=1)
+        urls.set('c', 'C', ttl=60, now=1)
+        self.assertIsNone(urls.get('b', now=2))
+        self.assertEqual(urls.get('a', now=2), 'A')
+
+
+class StorageURLTests(SimpleTestCase):
+    def setUp(self):
+        url_cache.clear()
+        SigningStorage.calls = 0
+        self.addCleanup(url_cache.clear)
+
+    def test_signed_urls_are_reused_for_half_their_lifetime(self):
+        storage = SigningStorage(expiration_secs=60, base_url='/media/')
+        with patch('api.storage_urls.time.monotonic', return_value=1000):
+            first = storage_url(storage, 'a.jpg')
+        with patch('api.storage_urls.time.monotonic', return_value=1029):
+            self.assertEqual(storage_url(storage, 'a.jpg'), first)
+        with patch('api.storage_urls.time.monotonic', return_value=1030):
+            self.assertNotEqual(storage_url(storage, 'a.jpg'), first)
+        self.assertEqual(SigningStorage.calls, 2)
+
+    def test_different_expiry_is_a_different_entry(self):
+        storage = SigningStorage(expiration_secs=60, base_url='/media/')
+        storage_url(storage, 'a.jpg')
+        storage.expiration_secs = 600
+        storage_url(storage, 'a.jpg')
+        self.assertEqual(SigningStorage.calls, 2)
+
+    def test_request_memo_keeps_urls_consistent_within_a_response(self):
+        storage = SigningStorage(expiration_secs=60, base_url='/media/')
+        request = type('Request', (), {})()
+        first = storage_url(storage, 'a.jpg', request)
+        url_cache.clear()
+        self.assertEqual(storage_url(storage, 'a.jpg', request), first)
+        self.assertEqual(SigningStorage.calls, 1)
+
+    def test_changing_storage_settings_clears_the_cache(self):
+        storage_url(default_storage, 'a.jpg')
+        self.assertEqual(len(url_cache), 1)
+        with override_settings(MEDIA_URL='/other/'):
+            self.assertEqual(len(url_cache), 0)
+
+
+class FeedURLResolutionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        url_cache.clear()
+        SigningStorage.calls = 0
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storages = override_settings(STORAGES={
+            'default': {
+                'BACKEND': 'api.tests_storage_urls.SigningStorage',
+                'OPTIONS': {'location': media_root, 'base_url': '/media/', 'expiration_secs': 3600},
+            },
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        storages.enable()
+        self.addCleanup(storages.disable)
+
+        self.user = _make_user('urls@example.com', 'urlsuser', '+1990000001')
+        self.user.profile_image.save('me.jpg', ContentFile(b'\xff\xd8\xff'), save=True)
+        spec = Specialization.objects.get_or_create(name='Backend', defaults={'description': ''})[0]
+        for n in range(5):
+            post = Post.objects.create(author=self.user, content=f'Post {n}')
+            post.specializations.add(spec)
+            Attachment.objects.create(
+                content_type=ContentType.objects.get_for_model(Post),
+                object_id=post.pk,
+                file=default_storage.save(f'p{n}.png', ContentFile(b'x')),
+                kind='image',
+                mime_type='image/png',
+                size_bytes=1,
+                original_filename=f'p{n}.png',
+            )
+        self.client = APIClient()
+
+    def tearDown(self):
+        cache.clear()
+        url_cache.clear()
+
+    def test_each_blob_is_signed_once_per_page_and_reused_across_pages(self):
+        res = self.client.get(reverse('api:posts'))
+        self.assertEqual(len(res.data['results']), 5)
+        avatars = {p['author']['profile_image_url'] for p in res.data['results']}
+        self.assertEqual(len(avatars), 1)
+        self.assertEqual(SigningStorage.calls, 6)  # one avatar + five attachments
+
+        self.client.get(reverse('api:posts'))
+        self.assertEqual(SigningStorage.calls, 6)
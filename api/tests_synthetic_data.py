@@ -0,0 +1,140 @@
+"""Tests for the synthetic data generator (api/synthetic.py) and its
+`generate_synthetic_data` command."""
+
+import random
+import uuid
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from .counters import reconcile_counters
+from .models import (
+    Answer, Comment, PointsWallet, Post, PostReaction, Question, Specialization, User,
+)
+from .synthetic import SYNTHETIC_PASSWORD, Distribution, _copy_value, generate
+
+
+class DistributionTests(SimpleTestCase):
+    def test_fixed_and_uniform(self):
+        rng = random.Random(1)
+        self.assertEqual({Distribution('fixed:3').sample(rng) for _ in range(20)}, {3})
+        self.assertEqual({Distribution('uniform:0:2').sample(rng) for _ in range(200)}, {0, 1, 2})
+
+    def test_powerlaw_is_long_tailed_and_capped(self):
+        rng = random.Random(1)
+        samples = [Distribution('powerlaw:1.2:500').sample(rng) for _ in range(5000)]
+        self.assertEqual(min(samples), 0)
+        self.assertLessEqual(max(samples), 500)
+        self.assertGreater(max(samples), 100)
+        # Most items get little; the median sits far below the mean.
+        samples.sort()
+        self.assertLess(samples[len(samples) // 2], sum(samples) / len(samples))
+
+    def test_bad_specs_are_rejected(self):
+        for spec in ('', 'fixed', 'uniform:1', 'powerlaw:0', 'zipf:1.2', 'fixed:x'):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                Distribution(spec)
+
+
+class CopyFormatTests(SimpleTestCase):
+    def test_values_are_escaped_for_copy_text_format(self):
+        self.assertEqual(_copy_value(None), '\\N')
+        self.assertEqual(_copy_value(''), '')
+        self.assertEqual(_copy_value(True), 't')
+        self.assertEqual(_copy_value('a\tb\nc\\d\r'), 'a\\tb\\nc\\\\d\\r')
+        self.assertEqual(_copy_value({'k': [1]}), '{"k": [1]}')
+        self.assertEqual(
+            _copy_value(datetime(2026, 10, 17, 9, 30, tzinfo=timezone.utc)), '2026-10-17T09:30:00+00:00',
+        )
+        pk = uuid.uuid4()
+        self.assertEqual(_copy_value(pk), str(pk))
+
+
+class GenerateSyntheticDataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for name in ('Backend', 'Frontend', 'Data'):
+            Specialization.objects.create(name=name, description='')
+
+    def tearDown(self):
+        cache.clear()
+
+    def _generate(self, **kwargs):
+        options = {'users': 30, 'questions': 20, 'posts': 20, 'seed': 7, 'tag': '0042', 'batch_size': 100}
+        return generate(**{**options, **kwargs})
+
+    def test_counters_match_the_generated_rows(self):
+        tag, written = self._generate()
+        self.assertEqual(tag, '0042')
+        self.assertEqual(written[User], 30)
+        self.assertEqual(PointsWallet.objects.count(), 30)
+        self.assertEqual(written[Question], Question.objects.count())
+        self.assertGreater(Answer.objects.filter(parent_answer__isnull=False).count(), 0)
+        self.assertGreater(Comment.objects.filter(parent_comment__isnull=False).count(), 0)
+        self.assertGreater(PostReaction.objects.count(), 0)
+        self.assertEqual(reconcile_counters(dry_run=True), {'api.Question': 0, 'api.Post': 0})
+
+    def test_content_needs_users(self):
+        with self.assertRaises(ValueError):
+            self._generate(users=0, posts=0)
+        with self.assertRaises(CommandError):
+            call_command('generate_synthetic_data', users=0, questions=0, posts=1, stdout=StringIO())
+        self.assertEqual(self._generate(users=0, questions=0, posts=0)[1], {})
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY requires PostgreSQL')
+    def test_copy_writes_the_same_rows(self):
+        _, written = self._generate(use_copy=True)
+        self.assertEqual(written[User], User.objects.filter(email__startswith='synth0042.').count())
+        self.assertEqual(written[Question.specializations.through], Question.specializations.through.objects.count())
+        self.assertEqual(written[Post.specializations.through], Post.specializations.through.objects.count())
+        self.assertEqual(reconcile_counters(dry_run=True), {'api.Question': 0, 'api.Post': 0})
+
+    def test_users_can_log_in(self):
+        self._generate(users=3, questions=0, posts=0)
+        user = User.objects.get(email='synth0042.0@example.com')
+        self.assertTrue(user.check_password(SYNTHETIC_PASSWORD))
+        response = self.client.post('/api/auth/login/', {
+            'identifier': user.email, 'password': SYNTHETIC_PASSWORD,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_timestamps_are_spread_and_children_follow_parents(self):
+        self._generate(days=30)
+        created = list(Post.objects.values_list('created_at', flat=True))
+        self.assertGreater(len(set(created)), 1)
+        # The auto_now flags are switched back on afterwards.
+        self.assertTrue(Post._meta.get_field('created_at').auto_now_add)
+        self.assertTrue(Post._meta.get_field('updated_at').auto_now)
+        for answer in Answer.objects.select_related('question', 'parent_answer'):
+            self.assertGreaterEqual(answer.created_at, answer.question.created_at)
+            if answer.parent_answer:
+                self.assertGreaterEqual(answer.created_at, answer.parent_answer.created_at)
+
+    def test_power_law_likes(self):
+        self._generate(users=200, questions=0, posts=200, distributions={
+            'likes': 'powerlaw:1.2:150', 'dislikes': 'fixed:0',
+        })
+        likes = sorted(Post.objects.values_list('likes_count', flat=True))
+        self.assertEqual(sum(likes), PostReaction.objects.filter(reaction='like').count())
+        self.assertLess(likes[len(likes) // 2], 5)
+        self.assertGreater(likes[-1], 20)
+
+    def test_same_seed_same_shape(self):
+        _, first = self._generate(tag='0001')
+        _, second = self._generate(tag='0002')
+        self.assertEqual(first, second)
+
+    def test_command_reports_and_refuses_a_reused_tag(self):
+        out = StringIO()
+        call_command('generate_synthetic_data', users=5, questions=3, posts=3, tag='0007', stdout=out)
+        self.assertIn('tag 0007', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('generate_synthetic_data', users=5, tag='0007', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('generate_synthetic_data', likes='zipf:2', stdout=StringIO())
@@ -0,0 +1,177 @@
+"""Tests for WebP image variants (api/thumbnails.py and the jobs in
+api/tasks.py that run it)."""
+
+import io
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .jobs import get_queue
+from .models import Attachment, Specialization, User
+from .thumbnails import render_variants, variant_name
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='ThumbPass123!',
+        first_name='T',
+        last_name='Thumb',
+        phone_number=phone,
+    )
+
+
+def _image(name, size=(1500, 1000), fmt='JPEG', content_type='image/jpeg'):
+    buf = io.BytesIO()
+    Image.new('RGB', size, color='teal').save(buf, format=fmt)
+    return SimpleUploadedFile(name, buf.getvalue(), content_type=content_type)
+
+
+@override_settings(
+    JOB_QUEUE={'BACKEND': 'api.jobs.InProcessJobQueue', 'OPTIONS': {'autostart': False}},
+    IMAGE_VARIANT_WIDTHS=[320, 640, 1280],
+)
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storages = override_settings(STORAGES={
+            'default': {
+                'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                'OPTIONS': {'location': self.media_root, 'base_url': '/media/'},
+            },
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        storages.enable()
+        self.addCleanup(storages.disable)
+
+        self.user = _make_user('thumbs@example.com', 'thumbuser', '+1980000001')
+        self.spec = Specialization.objects.get_or_create(name='Backend', defaults={'description': ''})[0]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _create_post(self, *files):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                reverse('api:posts'),
+                {'content': 'Pictures', 'specializations': [str(self.spec.id)], 'attachments': list(files)},
+                format='multipart',
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        return res
+
+    def test_image_attachments_get_webp_variants_in_the_background(self):
+        res = self._create_post(_image('photo.jpg'))
+        self.assertEqual(res.data['attachments'][0]['variants'], {})
+
+        self.assertEqual(get_queue().drain(), 1)
+        attachment = Attachment.objects.get()
+        self.assertEqual(sorted(attachment.variants, key=int), ['320', '640', '1280'])
+        for width, name in attachment.variants.items():
+            self.assertEqual(name, variant_name(attachment.file.name, width))
+            with default_storage.open(name) as fh, Image.open(fh) as variant:
+                self.assertEqual(variant.format, 'WEBP')
+                self.assertEqual(variant.size, (int(width), round(1000 * int(width) / 1500)))
+
+        detail = self.client.get(reverse('api:post-detail', args=[res.data['id']]))
+        variants = detail.data['attachments'][0]['variants']
+        self.assertEqual(variants['640'], default_storage.url(attachment.variants['640']))
+
+    def test_non_images_are_not_queued(self):
+        pdf = SimpleUploadedFile('doc.pdf', b'%PDF-1.7\n' + b'x' * 100, content_type='application/pdf')
+        self._create_post(pdf)
+        self.assertEqual(len(get_queue()), 0)
+
+    def test_widths_at_or_above_the_original_are_skipped(self):
+        attachment = Attachment(file=default_storage.save('small.png', _image('small.png', (500, 400), 'PNG')))
+        variants = render_variants(attachment.file)
+        self.assertEqual(list(variants), ['320'])
+
+    def test_unreadable_image_yields_no_variants(self):
+        name = default_storage.save('broken.jpg', io.BytesIO(b'\xff\xd8\xff\xe0' + b'x' * 64))
+        attachment = Attachment(file=name)
+        self.assertEqual(render_variants(attachment.file), {})
+        self.assertEqual(os.listdir(self.media_root), ['broken.jpg'])
+
+    def test_profile_image_variants_appear_on_author_payloads(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(
+                reverse('api:user-profile'), {'profile_image': _image('me.jpg', (800, 800))}, format='multipart'
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['profile_image_variants'], {})
+
+        get_queue().drain()
+        self.user.refresh_from_db()
+        self.assertEqual(sorted(self.user.profile_image_variants, key=int), ['320', '640'])
+
+        post = self._create_post()
+        self.assertEqual(
+            post.data['author']['profile_image_variants']['320'],
+            default_storage.url(self.user.profile_image_variants['320']),
+        )
+
+    def test_replaced_profile_image_discards_stale_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('api:user-profile'), {'profile_image': _image('old.jpg')}, format='multipart')
+        User.objects.filter(pk=self.user.pk).update(profile_image='profile_images/new.jpg')
+
+        get_queue().drain()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_image_variants, {})
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'profile_images', 'old.w320.webp')))
+
+    def test_deleting_an_attachment_removes_its_variants(self):
+        res = self._create_post(_image('gone.jpg'))
+        get_queue().drain()
+        attachment = Attachment.objects.get()
+        stored = [attachment.file.name, *attachment.variants.values()]
+        self.assertTrue(all(default_storage.exists(name) for name in stored))
+
+        res = self.client.delete(reverse('api:attachment-delete', args=[res.data['attachments'][0]['id']]))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(any(default_storage.exists(name) for name in stored))
+
+    def test_replacing_the_profile_image_removes_the_old_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('api:user-profile'), {'profile_image': _image('first.jpg')}, format='multipart')
+        get_queue().drain()
+        self.user.refresh_from_db()
+        old_variants = list(self.user.profile_image_variants.values())
+        self.assertTrue(old_variants)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('api:user-profile'), {'profile_image': _image('second.jpg')}, format='multipart')
+        self.assertFalse(any(default_storage.exists(name) for name in old_variants))
+        get_queue().drain()
+        self.user.refresh_from_db()
+        self.assertTrue(all(default_storage.exists(name) for name in self.user.profile_image_variants.values()))
+
+    def test_backfill_command_queues_images_without_variants(self):
+        self._create_post(_image('a.jpg'), _image('b.jpg'))
+        self.assertEqual(get_queue().drain(), 1)
+        self._create_post(_image('c.jpg'))
+        Attachment.objects.filter(original_filename='a.jpg').update(variants={})
+        get_queue()._ready.clear()
+
+        out = StringIO()
+        call_command('generate_image_variants', stdout=out)
+        self.assertIn('Queued variants for 2 attachment(s) and 0 profile image(s)', out.getvalue())
+        get_queue().drain()
+        self.assertFalse(Attachment.objects.filter(variants={}).exists())
@@ -0,0 +1,132 @@
+"""Tests for content sniffing and streaming validation of inline attachments
+(api/upload_handlers.py, utils.classify_and_validate_attachment)."""
+
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.files.uploadhandler import StopUpload
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import Attachment, Specialization, User
+from .tests_attachments import SIGNATURES, _file
+from .upload_handlers import AttachmentUploadHandler
+from .utils import detect_mime
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='SniffPass123!',
+        first_name='S',
+        last_name='Sniffer',
+        phone_number=phone,
+    )
+
+
+class DetectMimeTests(SimpleTestCase):
+    def test_signatures_win_over_the_declared_type(self):
+        self.assertEqual(detect_mime(SIGNATURES['image/png'], 'image/jpeg'), 'image/png')
+        self.assertEqual(detect_mime(SIGNATURES['application/pdf'], 'image/png'), 'application/pdf')
+        self.assertIsNone(detect_mime(b'<!DOCTYPE html>', 'image/png'))
+
+    def test_declared_type_breaks_ties_between_candidates(self):
+        self.assertEqual(detect_mime(SIGNATURES['video/mp4'], 'audio/mp4'), 'audio/mp4')
+        self.assertEqual(detect_mime(SIGNATURES['video/mp4'], 'image/png'), 'video/mp4')
+        self.assertEqual(detect_mime(SIGNATURES['audio/mp4'], 'video/mp4'), 'audio/mp4')
+
+
+class AttachmentUploadHandlerTests(SimpleTestCase):
+    CHUNK = 1024 * 1024
+
+    def _handler(self, field='attachments', content_type='image/png'):
+        handler = AttachmentUploadHandler()
+        handler.new_file(field, 'f.png', content_type, None)
+        return handler
+
+    def test_stops_as_soon_as_the_kind_limit_is_passed(self):
+        handler = self._handler()
+        first = SIGNATURES['image/png'] + b'x' * (self.CHUNK - len(SIGNATURES['image/png']))
+        received = 0
+        with self.assertRaises(StopUpload) as ctx:
+            for n in range(50):  # a 50 MB body
+                handler.receive_data_chunk(first if n == 0 else b'x' * self.CHUNK, received)
+                received += self.CHUNK
+        self.assertTrue(ctx.exception.connection_reset)
+        self.assertEqual(received, 5 * self.CHUNK)  # the 6th chunk is the first over 5 MB
+        self.assertEqual(handler.errors, ['Image too large (max 5 MB).'])
+
+    def test_unknown_signature_stops_at_the_first_chunk(self):
+        handler = self._handler()
+        with self.assertRaises(StopUpload):
+            handler.receive_data_chunk(SIGNATURES['application/x-msdownload'] + b'x' * 64, 0)
+        self.assertIn('Unsupported file type', handler.errors[0])
+
+    def test_tiny_files_are_checked_on_completion(self):
+        handler = self._handler()
+        handler.receive_data_chunk(b'MZ', 0)
+        with self.assertRaises(StopUpload):
+            handler.file_complete(2)
+
+    def test_other_fields_pass_through(self):
+        handler = self._handler(field='profile_image')
+        self.assertEqual(handler.receive_data_chunk(b'MZ' * 64, 0), b'MZ' * 64)
+        self.assertIsNone(handler.file_complete(128))
+        self.assertEqual(handler.errors, [])
+
+
+class SniffedUploadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storages = override_settings(STORAGES={
+            'default': {
+                'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                'OPTIONS': {'location': media_root},
+            },
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        storages.enable()
+        self.addCleanup(storages.disable)
+
+        self.user = _make_user('sniff@example.com', 'sniffuser', '+1970000001')
+        self.spec = Specialization.objects.get_or_create(name='Backend', defaults={'description': ''})[0]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _create_post(self, *files):
+        return self.client.post(
+            reverse('api:posts'),
+            {'content': 'Sniffed', 'specializations': [str(self.spec.id)], 'attachments': list(files)},
+            format='multipart',
+        )
+
+    def test_stored_mime_type_is_the_detected_one(self):
+        png = _file('photo.jpg', 'image/png')
+        png.content_type = 'image/jpeg'
+        res = self._create_post(png)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertEqual(res.data['attachments'][0]['mime_type'], 'image/png')
+        self.assertEqual(Attachment.objects.get().mime_type, 'image/png')
+
+    def test_disguised_file_is_rejected(self):
+        exe = _file('photo.png', 'application/x-msdownload')
+        exe.content_type = 'image/png'
+        res = self._create_post(exe)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('attachments', res.data)
+        self.assertFalse(Attachment.objects.exists())
+
+    def test_oversized_file_is_rejected_while_streaming(self):
+        res = self._create_post(_file('big.png', 'image/png', size_bytes=6 * 1024 * 1024))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Image too large', str(res.data['attachments']))
+        self.assertFalse(Attachment.objects.exists())
@@ -0,0 +1,273 @@
+"""Tests for upload sessions (api/upload_sessions.py): large attachments
+uploaded ahead of their parent and referenced by id on create."""
+
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from .models import Attachment, Post, Specialization, UploadSession, User
+from .tests_attachments import SIGNATURES, _file
+
+
+# A 16-byte MP4: just the ftyp box header, enough to sniff.
+CLIP = SIGNATURES['video/mp4']
+from .upload_sessions import AzureUploadBackend, attach_uploads
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='SessionPass123!',
+        first_name='U',
+        last_name='Session',
+        phone_number=phone,
+    )
+
+
+class UploadSessionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.staging = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.staging, ignore_errors=True)
+        overrides = override_settings(
+            STORAGES={
+                'default': {
+                    'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                    'OPTIONS': {'location': self.media_root},
+                },
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+            UPLOAD_SESSIONS={
+                'BACKEND': 'api.upload_sessions.LocalUploadBackend',
+                'OPTIONS': {'expiry': 600, 'chunk_size': 4, 'location': self.staging},
+            },
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.user = _make_user('session@example.com', 'sessionuser', '+1960000001')
+        self.other = _make_user('session2@example.com', 'sessionusr2', '+1960000002')
+        self.spec = Specialization.objects.get_or_create(name='Backend', defaults={'description': ''})[0]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _begin(self, size=len(CLIP), content_type='video/mp4', filename='clip.mp4'):
+        return self.client.post(
+            reverse('api:upload-sessions'),
+            {'filename': filename, 'content_type': content_type, 'size': size},
+            format='json',
+        )
+
+    def _chunk(self, session_id, data, start, total):
+        return self.client.put(
+            reverse('api:upload-session-detail', args=[session_id]),
+            data=data,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{start + len(data) - 1}/{total}',
+        )
+
+    def _finalize(self, session_id):
+        return self.client.post(reverse('api:upload-session-finalize', args=[session_id]))
+
+    def _finished_session(self, payload=CLIP, **kwargs):
+        session_id = self._begin(size=len(payload), **kwargs).data['id']
+        self._chunk(session_id, payload, 0, len(payload))
+        self.assertEqual(self._finalize(session_id).status_code, status.HTTP_200_OK)
+        return session_id
+
+    def test_begin_returns_chunk_endpoint_instructions(self):
+        res = self._begin()
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertEqual(res.data['status'], 'pending')
+        self.assertEqual(res.data['kind'], 'video')
+        self.assertEqual(res.data['upload']['method'], 'PUT')
+        self.assertTrue(res.data['upload']['url'].endswith(f"/api/uploads/{res.data['id']}/"))
+        self.assertEqual(res.data['upload']['chunk_size'], 4)
+
+    def test_begin_rejects_declared_size_over_limit_and_unknown_type(self):
+        self.assertEqual(self._begin(size=51 * 1024 * 1024).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._begin(content_type='text/html').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_chunked_upload_resumes_from_received_bytes(self):
+        session_id = self._begin().data['id']
+        self.assertEqual(self._chunk(session_id, CLIP[:8], 0, 16).data['received_bytes'], 8)
+
+        detail = self.client.get(reverse('api:upload-session-detail', args=[session_id]))
+        self.assertEqual(detail.data['received_bytes'], 8)
+
+        # A gap is refused; an overlapping resend is accepted.
+        self.assertEqual(self._chunk(session_id, CLIP[12:], 12, 16).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._chunk(session_id, CLIP[4:], 4, 16).data['received_bytes'], 16)
+
+        finalized = self._finalize(session_id)
+        self.assertEqual(finalized.status_code, status.HTTP_200_OK, finalized.data)
+        self.assertEqual(finalized.data['status'], 'complete')
+        blob = UploadSession.objects.get(pk=session_id).blob_name
+        with open(os.path.join(self.media_root, blob), 'rb') as fh:
+            self.assertEqual(fh.read(), CLIP)
+
+    def test_chunk_needs_a_consistent_content_range(self):
+        session_id = self._begin().data['id']
+        url = reverse('api:upload-session-detail', args=[session_id])
+        no_range = self.client.put(url, data=b'abcd', content_type='application/octet-stream')
+        self.assertEqual(no_range.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._chunk(session_id, CLIP[:8], 0, 17).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_finalize_refuses_incomplete_upload(self):
+        session_id = self._begin().data['id']
+        self._chunk(session_id, CLIP[:8], 0, 16)
+        res = self._finalize(session_id)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('received 8 of 16', str(res.data))
+
+    def test_finalize_validates_what_storage_actually_holds(self):
+        session_id = self._begin().data['id']
+        self._chunk(session_id, CLIP, 0, 16)
+        with open(os.path.join(self.staging, f'{UploadSession.objects.get(pk=session_id).id.hex}.part'), 'ab') as fh:
+            fh.write(b'smuggled')
+        self.assertEqual(self._finalize(session_id).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_finalize_sniffs_the_received_bytes(self):
+        session_id = self._begin(content_type='video/quicktime', filename='clip.mov').data['id']
+        self._chunk(session_id, CLIP, 0, 16)
+        res = self._finalize(session_id)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.assertEqual(UploadSession.objects.get(pk=session_id).mime_type, 'video/mp4')
+
+        disguised = self._begin().data['id']
+        self._chunk(disguised, b'<html>' + b'x' * 10, 0, 16)
+        res = self._finalize(disguised)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Unsupported file type', str(res.data))
+
+    def test_finalized_upload_becomes_a_post_attachment(self):
+        session_id = self._finished_session(filename='talk.mp4')
+        res = self.client.post(
+            reverse('api:posts'),
+            {'content': 'Watch this', 'specializations': [str(self.spec.id)], 'uploads': [session_id]},
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertEqual(len(res.data['attachments']), 1)
+        attachment = res.data['attachments'][0]
+        self.assertEqual(attachment['original_filename'], 'talk.mp4')
+        self.assertEqual(attachment['kind'], 'video')
+        self.assertEqual(attachment['size_bytes'], 16)
+        self.assertFalse(UploadSession.objects.filter(pk=session_id).exists())
+
+    def test_long_filenames_fit_the_attachment_file_column(self):
+        filename = 'a-very-long-recording-name-' + 'x' * 49 + '.mp4'
+        session_id = self._finished_session(filename=filename)
+        blob_name = UploadSession.objects.get(pk=session_id).blob_name
+        self.assertLessEqual(len(blob_name), Attachment._meta.get_field('file').max_length)
+        self.assertTrue(blob_name.endswith('.mp4'))
+
+        res = self.client.post(
+            reverse('api:posts'),
+            {'content': 'Long name', 'specializations': [str(self.spec.id)], 'uploads': [session_id]},
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        attachment = Attachment.objects.get()
+        self.assertEqual(attachment.file.name, blob_name)
+        self.assertEqual(attachment.original_filename, filename)
+
+    def test_a_session_is_attached_only_once(self):
+        session = UploadSession.objects.get(pk=self._finished_session())
+        first = Post.objects.create(author=self.user, content='First')
+        second = Post.objects.create(author=self.user, content='Second')
+
+        # Both requests validated the session before either attached it.
+        attach_uploads(first, [session, session])
+        with self.assertRaises(ValidationError):
+            attach_uploads(second, [session])
+        self.assertEqual(Attachment.objects.get().object_id, first.pk)
+
+    def test_uploads_can_be_mixed_with_inline_files(self):
+        session_id = self._finished_session()
+        res = self.client.post(
+            reverse('api:posts'),
+            {
+                'content': 'Mixed',
+                'specializations': [str(self.spec.id)],
+                'uploads': [session_id],
+                'attachments': [_file('p.png', 'image/png', 16)],
+            },
+            format='multipart',
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertEqual(Attachment.objects.count(), 2)
+
+    def test_pending_or_foreign_sessions_cannot_be_referenced(self):
+        pending = self._begin().data['id']
+        self.client.force_authenticate(user=self.other)
+        foreign = self._finished_session()
+        self.client.force_authenticate(user=self.user)
+
+        for session_id in (pending, foreign):
+            res = self.client.post(
+                reverse('api:posts'),
+                {'content': 'Nope', 'specializations': [str(self.spec.id)], 'uploads': [session_id]},
+                format='json',
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('uploads', res.data)
+        self.assertEqual(
+            self.client.get(reverse('api:upload-session-detail', args=[foreign])).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+
+    def test_total_attachment_cap_counts_uploads(self):
+        session_id = self._finished_session()
+        files = [_file(f'p{n}.png', 'image/png', 16) for n in range(4)]
+        res = self.client.post(
+            reverse('api:posts'),
+            {'content': 'Too many', 'specializations': [str(self.spec.id)], 'uploads': [session_id], 'attachments': files},
+            format='multipart',
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('uploads', res.data)
+
+    def test_purge_removes_expired_sessions_and_their_bytes(self):
+        self._begin()
+        finished = self._finished_session()
+        UploadSession.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        blob = UploadSession.objects.get(pk=finished).blob_name
+
+        out = StringIO()
+        call_command('purge_upload_sessions', stdout=out)
+        self.assertIn('Removed 2', out.getvalue())
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(self.staging), [])
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, blob)))
+
+
+class AzureUploadBackendTests(TestCase):
+    def test_start_issues_a_write_only_sas_url(self):
+        storage = MagicMock()
+        storage.url.return_value = 'https://acct.blob.core.windows.net/media/a.mp4?sig=x'
+        session = UploadSession(blob_name='attachments/2026/10/a.mp4', mime_type='video/mp4')
+        with patch('api.upload_sessions._attachment_storage', return_value=storage):
+            upload = AzureUploadBackend(expiry=900).start(session, request=None)
+        storage.url.assert_called_once_with('attachments/2026/10/a.mp4', expire=900, mode='cw')
+        self.assertEqual(upload['url'], storage.url.return_value)
+        self.assertEqual(upload['headers']['x-ms-blob-type'], 'BlockBlob')
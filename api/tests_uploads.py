@@ -0,0 +1,189 @@
+"""Tests for the concurrent attachment upload path in api/uploads.py, against
+FileSystemStorage and a deliberately slow stand-in storage."""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import Attachment, Post, Question, Specialization, User
+from .tests_attachments import _file as attachment_file
+from .uploads import store_attachments, upload_scope
+
+
+class SlowStorage(FileSystemStorage):
+    """FileSystemStorage whose writes take `delay` seconds and fail for any
+    file named `fail*`. Records the peak number of concurrent writes."""
+
+    active = 0
+    peak = 0
+    _lock = threading.Lock()
+
+    def __init__(self, delay=0.2, **kwargs):
+        self.delay = delay
+        super().__init__(**kwargs)
+
+    @classmethod
+    def reset(cls):
+        cls.active = cls.peak = 0
+
+    def _save(self, name, content):
+        cls = type(self)
+        with cls._lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            time.sleep(self.delay)
+            if os.path.basename(name).startswith('fail'):
+                raise OSError('simulated upload failure')
+            return super()._save(name, content)
+        finally:
+            with cls._lock:
+                cls.active -= 1
+
+
+def _make_user(email, username, phone):
+    return User.objects.create_user(
+        email=email,
+        username=username,
+        password='UploadPass123!',
+        first_name='U',
+        last_name='User',
+        phone_number=phone,
+    )
+
+
+def _file(name, content_type='image/png', size_bytes=1024):
+    return attachment_file(name, content_type, size_bytes)
+
+
+def _stored_files(root):
+    return sorted(
+        os.path.join(dirpath, f)
+        for dirpath, _, files in os.walk(root)
+        for f in files
+    )
+
+
+class UploadTestMixin:
+    storage_backend = 'django.core.files.storage.FileSystemStorage'
+    storage_options = {}
+
+    def setUp(self):
+        cache.clear()
+        SlowStorage.reset()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        storages = override_settings(STORAGES={
+            'default': {
+                'BACKEND': self.storage_backend,
+                'OPTIONS': {'location': self.media_root, **self.storage_options},
+            },
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        storages.enable()
+        self.addCleanup(storages.disable)
+
+        self.user = _make_user('uploads@example.com', 'uploaduser', '+1950000001')
+        self.spec = Specialization.objects.get_or_create(name='Backend', defaults={'description': ''})[0]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _post(self):
+        post = Post.objects.create(author=self.user, content='Parent')
+        post.specializations.add(self.spec)
+        return post
+
+
+class FileSystemUploadTests(UploadTestMixin, TestCase):
+    def test_create_uploads_every_file_and_inserts_rows_once(self):
+        files = [_file(f'photo{n}.png') for n in range(3)]
+        with CaptureQueriesContext(connection) as captured:
+            res = self.client.post(
+                reverse('api:posts'),
+                {'content': 'With files', 'specializations': [str(self.spec.id)], 'attachments': files},
+                format='multipart',
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        inserts = [q for q in captured.captured_queries if q['sql'].startswith('INSERT INTO "attachments"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            [a['original_filename'] for a in res.data['attachments']],
+            ['photo0.png', 'photo1.png', 'photo2.png'],
+        )
+        self.assertEqual(len(_stored_files(self.media_root)), 3)
+
+    def test_failed_parent_transaction_deletes_uploaded_blobs(self):
+        with self.assertRaises(RuntimeError):
+            with upload_scope():
+                store_attachments(self._post(), [_file('a.png'), _file('b.png')])
+                raise RuntimeError('parent create failed')
+        self.assertEqual(_stored_files(self.media_root), [])
+
+    def test_outer_scope_owns_blobs_of_inner_scope(self):
+        with self.assertRaises(RuntimeError):
+            with upload_scope():
+                with upload_scope():
+                    store_attachments(self._post(), [_file('a.png')])
+                self.assertEqual(len(_stored_files(self.media_root)), 1)
+                raise RuntimeError('counter update failed')
+        self.assertEqual(_stored_files(self.media_root), [])
+
+    def test_successful_scope_keeps_blobs(self):
+        with upload_scope():
+            rows = store_attachments(self._post(), [_file('a.png')])
+        self.assertEqual(len(_stored_files(self.media_root)), 1)
+        self.assertTrue(Attachment.objects.filter(pk=rows[0].pk).exists())
+
+    def test_answer_create_rolled_back_by_view_leaves_no_blobs(self):
+        question = Question.objects.create(author=self.user, content='Q')
+        self.client.raise_request_exception = False
+        with patch('api.views.adjust_counters', side_effect=RuntimeError('boom')):
+            res = self.client.post(
+                reverse('api:question-answers', args=[question.pk]),
+                {'content': 'An answer', 'attachments': [_file('a.png'), _file('b.png')]},
+                format='multipart',
+            )
+        self.assertEqual(res.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(_stored_files(self.media_root), [])
+        self.assertFalse(Attachment.objects.exists())
+
+
+class SlowStorageUploadTests(UploadTestMixin, TestCase):
+    storage_backend = 'api.tests_uploads.SlowStorage'
+    storage_options = {'delay': 0.3}
+
+    @override_settings(ATTACHMENT_UPLOAD_WORKERS=4)
+    def test_uploads_run_concurrently(self):
+        started = time.monotonic()
+        rows = store_attachments(self._post(), [_file(f'p{n}.png') for n in range(4)])
+        elapsed = time.monotonic() - started
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(SlowStorage.peak, 4)
+        self.assertLess(elapsed, 4 * 0.3)
+
+    @override_settings(ATTACHMENT_UPLOAD_WORKERS=2)
+    def test_pool_bounds_concurrency(self):
+        store_attachments(self._post(), [_file(f'p{n}.png') for n in range(4)])
+        self.assertEqual(SlowStorage.peak, 2)
+
+    def test_one_failed_upload_deletes_the_others_and_writes_no_rows(self):
+        files = [_file('ok1.png'), _file('fail.png'), _file('ok2.png')]
+        with self.assertRaises(OSError):
+            store_attachments(self._post(), files)
+        self.assertEqual(_stored_files(self.media_root), [])
+        self.assertFalse(Attachment.objects.exists())
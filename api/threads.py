@@ -0,0 +1,86 @@
+"""Batch loader for depth-1 threads (Question → Answers/Replies, Post → Comments/Replies).
+
+Detail screens embed the first few top-level items of a thread, each with
+its first couple of replies. Loading that naively costs one query for the
+top-level items plus one per item for its replies (and more for authors /
+attachments). `load_thread` fetches the whole visible slice in ONE windowed
+query:
+
+    SELECT ..., ROW_NUMBER() OVER (PARTITION BY parent_id ORDER BY created_at, id),
+                COUNT(*)     OVER (PARTITION BY parent_id)
+    FROM <children> JOIN users ...
+    WHERE id IN (<first N top-level>) OR parent_id IN (<first N top-level>)
+
+then keeps only the first K replies per partition. Authors come in through
+the same query (select_related) and any `prefetch` lookups (e.g. attachments)
+are bulk-loaded once for every row."""
+
+from collections import defaultdict
+
+from django.db.models import Count, F, Q, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber
+
+
+THREAD_TOP_LEVEL_LIMIT = 10
+THREAD_REPLIES_PER_ITEM = 2
+
+
+def load_thread(
+    queryset,
+    parent_field,
+    top_level_limit=THREAD_TOP_LEVEL_LIMIT,
+    replies_per_item=THREAD_REPLIES_PER_ITEM,
+    prefetch=(),
+):
+    """Return the first `top_level_limit` top-level rows of `queryset`.
+
+    `queryset` is already scoped to one thread (e.g. `question.answers.all()`)
+    and `parent_field` names its self-referencing FK ('parent_answer' /
+    'parent_comment'). Each returned row gets:
+
+    - `first_replies`: its first `replies_per_item` replies, oldest first.
+    - `replies_count`: the total number of replies it has.
+    """
+    parent_id = f'{parent_field}_id'
+    top_level_ids = (
+        queryset
+        .filter(**{f'{parent_field}__isnull': True})
+        .order_by('created_at', 'pk')
+        .values('pk')[:top_level_limit]
+    )
+    rows = list(
+        queryset
+        .filter(Q(pk__in=top_level_ids) | Q(**{f'{parent_field}__in': top_level_ids}))
+        .select_related('author')
+        .annotate(
+            thread_position=Window(
+                RowNumber(),
+                partition_by=F(parent_field),
+                order_by=[F('created_at').asc(), F('pk').asc()],
+            ),
+            thread_siblings=Window(Count('pk'), partition_by=F(parent_field)),
+        )
+        .filter(
+            Q(**{f'{parent_field}__isnull': True})
+            | Q(thread_position__lte=replies_per_item)
+        )
+        .order_by('created_at', 'pk')
+    )
+
+    if prefetch:
+        prefetch_related_objects(rows, *prefetch)
+
+    replies = defaultdict(list)
+    top_level = []
+    for row in rows:
+        parent = getattr(row, parent_id)
+        if parent is None:
+            top_level.append(row)
+        else:
+            replies[parent].append(row)
+
+    for item in top_level:
+        item.first_replies = replies.get(item.pk, [])
+        # Every reply row carries the size of its partition = total replies.
+        item.replies_count = item.first_replies[0].thread_siblings if item.first_replies else 0
+    return top_level
@@ -0,0 +1,113 @@
+"""WebP thumbnails ("variants") of image attachments and profile images.
+
+Feed screens render images a few hundred pixels wide, but `url` /
+`profile_image_url` point at the original — up to 5 MB, four per post. After
+an image is stored, a background job (api/jobs.py) writes a WebP copy at each
+of `settings.IMAGE_VARIANT_WIDTHS` next to the original:
+
+    attachments/2026/10/photo.jpg
+    attachments/2026/10/photo.w320.webp
+    attachments/2026/10/photo.w640.webp
+
+and records their storage names on the row (`Attachment.variants`,
+`User.profile_image_variants`, both `{"<width>": "<name>"}`). Serializers
+expose them as a `{width: url}` map; until the job has run the map is empty
+and clients fall back to the original. Widths at or above the original's are
+skipped — there is nothing to gain from upscaling."""
+
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .jobs import enqueue
+from .storage_urls import storage_url
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (320, 640, 1280)
+
+
+def variant_widths():
+    return sorted(getattr(settings, 'IMAGE_VARIANT_WIDTHS', DEFAULT_WIDTHS))
+
+
+def variant_name(name, width):
+    """Storage name of the `width` variant of the file stored as `name`."""
+    return f'{os.path.splitext(name)[0]}.w{width}.webp'
+
+
+def _decode(data, max_width):
+    image = Image.open(BytesIO(data))
+    # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale, which is much cheaper
+    # than decoding full size and resizing everything down.
+    image.draft(None, (max_width, max_width))
+    image = ImageOps.exif_transpose(image)
+    image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    return image
+
+
+def render_variants(field_file, widths=None):
+    """Write a WebP of `field_file` at each width narrower than the image.
+    Returns `{"<width>": storage name}`; empty if the file isn't a readable
+    image."""
+    widths = widths or variant_widths()
+    # Storage errors propagate so the job is retried.
+    with field_file.open('rb') as fh:
+        data = fh.read()
+    try:
+        image = _decode(data, max(widths))
+    except (OSError, Image.DecompressionBombError) as exc:
+        # Not a decodable image (UnidentifiedImageError is an OSError too);
+        # retrying won't help, and the original is still served.
+        logger.warning('No variants for %s: %s', field_file.name, exc)
+        return {}
+
+    quality = getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+    variants = {}
+    for width in widths:
+        if width >= image.width:
+            break
+        height = max(1, round(image.height * width / image.width))
+        buffer = BytesIO()
+        image.resize((width, height), Image.LANCZOS).save(buffer, 'WEBP', quality=quality)
+        variants[str(width)] = field_file.storage.save(
+            variant_name(field_file.name, width), ContentFile(buffer.getvalue())
+        )
+    return variants
+
+
+def delete_variants(storage, variants):
+    for name in variants.values():
+        storage.delete(name)
+
+
+def variant_urls(storage, variants, request=None):
+    """`{width: url}` for a row's stored variants."""
+    return {width: storage_url(storage, name, request) for width, name in variants.items()}
+
+
+def schedule_attachment_variants(attachments):
+    """Queue variant generation for the image attachments among
+    `attachments` once the surrounding transaction commits."""
+    ids = [str(a.pk) for a in attachments if a.kind == 'image']
+    if ids:
+        transaction.on_commit(
+            lambda: enqueue('api.tasks.make_attachment_variants', attachment_ids=ids)
+        )
+
+
+def schedule_profile_image_variants(user):
+    transaction.on_commit(lambda: enqueue(
+        'api.tasks.make_profile_image_variants',
+        user_id=str(user.pk),
+        name=user.profile_image.name,
+    ))
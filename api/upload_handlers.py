@@ -0,0 +1,88 @@
+"""Streaming validation of inline attachments.
+
+Django's default handlers receive the whole multipart body — spooling up to
+50 MB per file to memory or temp disk — before `classify_and_validate_attachment`
+ever sees the file, and that check used to trust the client's Content-Type.
+`AttachmentUploadHandler` runs first in the handler chain and looks at each
+`attachments` file as it streams in:
+
+- the MIME type is detected from the first bytes (see `utils.detect_mime`);
+  an unrecognized signature stops the upload at the first chunk;
+- the running byte count is checked against that kind's `max_bytes` and the
+  upload stops as soon as it is exceeded.
+
+Stopping uses `StopUpload(connection_reset=True)`, so the rest of the request
+body is never read. `AttachmentMultiPartParser` installs the handler and turns
+its verdict into a 400 on the `attachments` field. Files that pass are handed
+on unchanged to the default handlers."""
+
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+
+from .utils import (
+    ATTACHMENT_LIMITS,
+    SNIFF_BYTES,
+    attachment_kind,
+    attachment_too_large_message,
+    detect_mime,
+    unsupported_attachment_message,
+)
+
+
+class AttachmentUploadHandler(FileUploadHandler):
+    field_names = ('attachments',)
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.errors = []
+        self._checking = False
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self._checking = field_name in self.field_names
+        self._head = b''
+        self._kind = None
+        self._received = 0
+
+    def _classify(self):
+        mime = detect_mime(self._head, self.content_type)
+        self._kind = attachment_kind(mime) if mime else None
+        if self._kind is None:
+            self._stop(unsupported_attachment_message(mime))
+
+    def _stop(self, message):
+        self.errors.append(message)
+        raise StopUpload(connection_reset=True)
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self._checking:
+            return raw_data
+        self._received += len(raw_data)
+        if self._kind is None:
+            self._head += raw_data[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) < SNIFF_BYTES:
+                return raw_data  # decided at file_complete for tiny files
+            self._classify()
+        if self._received > ATTACHMENT_LIMITS[self._kind]['max_bytes']:
+            self._stop(attachment_too_large_message(self._kind))
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self._checking and self._kind is None:
+            self._classify()
+        # Let the next handler (memory / temp file) build the file object.
+        return None
+
+
+class AttachmentMultiPartParser(MultiPartParser):
+    """MultiPartParser that validates `attachments` files while they stream."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        handler = AttachmentUploadHandler(request._request)
+        request.upload_handlers.insert(0, handler)
+        data_and_files = super().parse(stream, media_type, parser_context)
+        if handler.errors:
+            raise ValidationError({'attachments': handler.errors})
+        return data_and_files
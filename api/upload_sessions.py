@@ -0,0 +1,292 @@
+"""Upload sessions: attachments uploaded ahead of their parent, without
+streaming the file through a create request.
+
+Sending a 50 MB video inline with `POST /api/posts/` ties up a gunicorn worker
+for the whole transfer and spools the file to temp disk. Instead the client:
+
+1. `POST /api/uploads/` with the file's name, MIME type and size. The
+   declared values are checked against `ATTACHMENT_LIMITS` and the response
+   says where to send the bytes;
+2. sends them there. Which "there" depends on `settings.UPLOAD_SESSIONS`:
+   - `AzureUploadBackend`: a write-only SAS URL for the final blob, so the
+     bytes go straight to Blob Storage and never touch a worker;
+   - `LocalUploadBackend` (local dev, tests): `PUT /api/uploads/{id}/` in
+     chunks with a `Content-Range` header. Each chunk is a short request, and
+     an interrupted upload resumes from `received_bytes`;
+3. `POST /api/uploads/{id}/finalize/`, which re-validates against
+   `ATTACHMENT_LIMITS` using what storage actually holds: its size, and the
+   MIME type sniffed from its first bytes;
+4. references the finished session by id in the parent's `uploads` field.
+   The session becomes an ordinary Attachment on that parent.
+
+Sessions not attached before `expires_at` are removed, along with their
+bytes, by `manage.py purge_upload_sessions`."""
+
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files import File
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ValidationError
+
+from .models import Attachment, UploadSession
+from .thumbnails import schedule_attachment_variants
+from .utils import SNIFF_BYTES, classify_and_validate_attachment
+
+
+COPY_BUFFER = 64 * 1024
+
+
+class _FileFacts(NamedTuple):
+    """Just enough of an UploadedFile for `classify_and_validate_attachment`."""
+    content_type: str
+    size: int
+
+
+def _attachment_storage():
+    return Attachment._meta.get_field('file').storage
+
+
+class BaseUploadBackend:
+    supports_chunks = False
+
+    def __init__(self, expiry=3600):
+        self.expiry = expiry
+
+    def start(self, session, request):
+        """Prepare to receive `session`'s bytes. Returns how the client sends
+        them: method, url, headers."""
+        raise NotImplementedError
+
+    def write_chunk(self, session, offset, stream, length):
+        raise NotImplementedError
+
+    def received_size(self, session):
+        """Bytes storage currently holds for `session`."""
+        raise NotImplementedError
+
+    def read_head(self, session, size=SNIFF_BYTES):
+        """The first `size` bytes received, for content sniffing."""
+        raise NotImplementedError
+
+    def commit(self, session):
+        """Make the received bytes the final file. Returns its storage name."""
+        raise NotImplementedError
+
+    def discard(self, session):
+        """Remove whatever was stored for an abandoned session."""
+        raise NotImplementedError
+
+
+class LocalUploadBackend(BaseUploadBackend):
+    """Chunks are written to a staging file under `location`, then saved to
+    the attachment storage on finalize."""
+
+    supports_chunks = True
+
+    def __init__(self, expiry=3600, chunk_size=4 * 1024 * 1024, location=None):
+        super().__init__(expiry)
+        self.chunk_size = chunk_size
+        self.location = location or os.path.join(tempfile.gettempdir(), 'xbrain-upload-sessions')
+
+    def _path(self, session):
+        return os.path.join(self.location, f'{session.id.hex}.part')
+
+    def start(self, session, request):
+        os.makedirs(self.location, exist_ok=True)
+        open(self._path(session), 'wb').close()
+        return {
+            'method': 'PUT',
+            'url': request.build_absolute_uri(reverse('api:upload-session-detail', args=[session.pk])),
+            'headers': {'Content-Type': 'application/octet-stream'},
+            'chunk_size': self.chunk_size,
+        }
+
+    def write_chunk(self, session, offset, stream, length):
+        remaining = length
+        fd = os.open(self._path(session), os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, 'r+b') as fh:
+            fh.seek(offset)
+            while remaining:
+                data = stream.read(min(COPY_BUFFER, remaining))
+                if not data:
+                    break
+                fh.write(data)
+                remaining -= len(data)
+        return length - remaining
+
+    def received_size(self, session):
+        try:
+            return os.path.getsize(self._path(session))
+        except FileNotFoundError:
+            return 0
+
+    def read_head(self, session, size=SNIFF_BYTES):
+        with open(self._path(session), 'rb') as fh:
+            return fh.read(size)
+
+    def commit(self, session):
+        path = self._path(session)
+        with open(path, 'rb') as fh:
+            max_length = Attachment._meta.get_field('file').max_length
+            name = _attachment_storage().save(session.blob_name, File(fh), max_length=max_length)
+        os.remove(path)
+        return name
+
+    def discard(self, session):
+        try:
+            os.remove(self._path(session))
+        except FileNotFoundError:
+            pass
+        if session.status == 'complete':
+            _attachment_storage().delete(session.blob_name)
+
+
+class AzureUploadBackend(BaseUploadBackend):
+    """The client PUTs the file to its final blob with a write-only SAS URL
+    that expires with the session."""
+
+    def start(self, session, request):
+        url = _attachment_storage().url(session.blob_name, expire=self.expiry, mode='cw')
+        return {
+            'method': 'PUT',
+            'url': url,
+            'headers': {'x-ms-blob-type': 'BlockBlob', 'Content-Type': session.mime_type},
+        }
+
+    def received_size(self, session):
+        storage = _attachment_storage()
+        if not storage.exists(session.blob_name):
+            return 0
+        return storage.size(session.blob_name)
+
+    def read_head(self, session, size=SNIFF_BYTES):
+        blob = _attachment_storage().client.get_blob_client(session.blob_name)
+        return blob.download_blob(offset=0, length=size).readall()
+
+    def commit(self, session):
+        return session.blob_name
+
+    def discard(self, session):
+        _attachment_storage().delete(session.blob_name)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The process-wide backend configured by `settings.UPLOAD_SESSIONS`."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = getattr(settings, 'UPLOAD_SESSIONS', {})
+                backend = import_string(config.get('BACKEND', 'api.upload_sessions.LocalUploadBackend'))
+                _backend = backend(**config.get('OPTIONS', {}))
+    return _backend
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    global _backend
+    if setting == 'UPLOAD_SESSIONS':
+        _backend = None
+
+
+def _blob_name(session, filename):
+    """The final storage name: unique per session (so the SAS URL can name
+    it up front), keeping as much of the client's basename as
+    `Attachment.file` has room for, extension included."""
+    field = Attachment._meta.get_field('file')
+    stem, ext = os.path.splitext(os.path.basename(filename))
+    ext = ext[:16]
+    name = field.generate_filename(None, f'{session.id.hex}_{stem}{ext}')
+    excess = len(name) - field.max_length
+    if excess > 0:
+        name = field.generate_filename(None, f'{session.id.hex}_{stem[:max(len(stem) - excess, 0)]}{ext}')
+    return name
+
+
+def begin_upload(owner, filename, content_type, size, request):
+    """Open a session for a file of the declared type and size. Returns the
+    session and the client's upload instructions."""
+    kind, mime = classify_and_validate_attachment(_FileFacts(content_type, size))
+    session = UploadSession(
+        owner_id=owner.pk,
+        original_filename=filename[:255],
+        kind=kind,
+        mime_type=mime,
+        size_bytes=size,
+        expires_at=timezone.now() + timedelta(seconds=get_backend().expiry),
+    )
+    session.blob_name = _blob_name(session, filename)
+    session.save()
+    return session, get_backend().start(session, request)
+
+
+def finalize_upload(session):
+    """Validate what storage actually received and mark the session complete."""
+    if session.expires_at <= timezone.now():
+        raise ValidationError('Upload session has expired.')
+    backend = get_backend()
+    received = backend.received_size(session)
+    if received != session.size_bytes:
+        raise ValidationError(
+            f'Upload incomplete: received {received} of {session.size_bytes} bytes.'
+        )
+    session.kind, session.mime_type = classify_and_validate_attachment(
+        _FileFacts(session.mime_type, received), head=backend.read_head(session),
+    )
+    session.received_bytes = received
+    session.blob_name = backend.commit(session)
+    session.status = 'complete'
+    session.save(update_fields=['kind', 'mime_type', 'received_bytes', 'blob_name', 'status'])
+    return session
+
+
+def attach_uploads(parent, sessions):
+    """Turn finished sessions into Attachment rows on `parent` (one INSERT)
+    and close the sessions. Call inside a transaction."""
+    sessions = list({session.pk: session for session in sessions}.values())
+    # Close the sessions first: a concurrent request naming one of them
+    # waits on the row lock here, then finds it gone and fails instead of
+    # attaching the same blob a second time.
+    _, deleted = UploadSession.objects.filter(pk__in=[s.pk for s in sessions], status='complete').delete()
+    if deleted.get(UploadSession._meta.label, 0) != len(sessions):
+        raise ValidationError({'uploads': 'An upload was already attached by another request.'})
+    ct = ContentType.objects.get_for_model(parent.__class__)
+    rows = Attachment.objects.bulk_create([
+        Attachment(
+            content_type=ct,
+            object_id=parent.pk,
+            file=session.blob_name,
+            kind=session.kind,
+            mime_type=session.mime_type,
+            size_bytes=session.received_bytes,
+            original_filename=session.original_filename,
+        )
+        for session in sessions
+    ])
+    schedule_attachment_variants(rows)
+    return rows
+
+
+def purge_expired_sessions(now=None):
+    """Delete sessions past `expires_at` and the bytes stored for them.
+    Returns how many were removed."""
+    backend = get_backend()
+    expired = list(UploadSession.objects.filter(expires_at__lte=now or timezone.now()))
+    for session in expired:
+        backend.discard(session)
+    UploadSession.objects.filter(pk__in=[s.pk for s in expired]).delete()
+    return len(expired)
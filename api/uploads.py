@@ -0,0 +1,139 @@
+"""Concurrent attachment uploads.
+
+Each `Attachment.objects.create` pushes its file through the storage backend
+before the INSERT, so a parent with four attachments used to upload them one
+after another (up to 4 × 50 MB to Azure Blob) and then issue four INSERTs.
+`store_attachments` instead:
+
+- validates every file up front, before anything is uploaded;
+- uploads them concurrently on a process-wide thread pool bounded by
+  `settings.ATTACHMENT_UPLOAD_WORKERS`;
+- writes all the rows with one `bulk_create`.
+
+Blobs are not transactional. If any upload fails, the ones that already
+finished are deleted before the error propagates. To also clean up when the
+surrounding transaction fails later (the parent's INSERT, a counter update),
+create the parent inside `upload_scope()`: a `transaction.atomic()` block
+that deletes every blob stored within it if the block exits with an error.
+Nested scopes defer to the outermost one, so a view can wrap a serializer
+that opens its own scope."""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+
+from .models import Attachment
+from .thumbnails import schedule_attachment_variants
+from .utils import classify_and_validate_attachment
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_scopes = threading.local()
+
+
+def get_upload_executor():
+    """The process-wide upload pool, sized by `settings.ATTACHMENT_UPLOAD_WORKERS`."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'ATTACHMENT_UPLOAD_WORKERS', 4),
+                    thread_name_prefix='attachment-upload',
+                )
+    return _executor
+
+
+@receiver(setting_changed)
+def _reset_executor(setting, **kwargs):
+    global _executor
+    if setting == 'ATTACHMENT_UPLOAD_WORKERS' and _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def _delete_blobs(blobs):
+    for storage, name in blobs:
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.warning('Could not delete orphaned attachment blob %s', name, exc_info=True)
+
+
+@contextmanager
+def upload_scope():
+    """`transaction.atomic()` that also deletes the blobs uploaded inside it
+    if it exits with an exception."""
+    if getattr(_scopes, 'blobs', None) is not None:
+        # An outer scope owns the blobs; it alone knows whether they survive.
+        with transaction.atomic():
+            yield
+        return
+
+    _scopes.blobs = []
+    try:
+        with transaction.atomic():
+            yield
+    except BaseException:
+        _delete_blobs(_scopes.blobs)
+        raise
+    finally:
+        _scopes.blobs = None
+
+
+def _upload(row, uploaded_file):
+    # FieldFile.save(save=False) stores the blob and sets row.file.name to
+    # the final (possibly de-duplicated) name, without touching the DB.
+    row.file.save(uploaded_file.name, uploaded_file, save=False)
+    return row.file.storage, row.file.name
+
+
+def store_attachments(parent, files):
+    """Upload `files` in parallel and persist them as Attachment rows on
+    `parent` (Question / Answer / Post) with a single INSERT. Returns the
+    rows. Caller is expected to have already enforced the per-parent cap."""
+    ct = ContentType.objects.get_for_model(parent.__class__)
+    rows = []
+    for f in files:
+        kind, mime = classify_and_validate_attachment(f)
+        rows.append(Attachment(
+            content_type=ct,
+            object_id=parent.pk,
+            kind=kind,
+            mime_type=mime,
+            size_bytes=f.size,
+            original_filename=f.name[:255],
+        ))
+    if not rows:
+        return rows
+
+    executor = get_upload_executor()
+    futures = [executor.submit(_upload, row, f) for row, f in zip(rows, files)]
+    wait(futures)
+    stored = [fut.result() for fut in futures if fut.exception() is None]
+    failed = [fut.exception() for fut in futures if fut.exception() is not None]
+    if failed:
+        _delete_blobs(stored)
+        raise failed[0]
+
+    scope_blobs = getattr(_scopes, 'blobs', None)
+    if scope_blobs is not None:
+        scope_blobs.extend(stored)
+    try:
+        rows = Attachment.objects.bulk_create(rows)
+    except BaseException:
+        if scope_blobs is None:
+            _delete_blobs(stored)
+        raise
+    schedule_attachment_variants(rows)
+    return rows
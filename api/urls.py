@@ -31,6 +31,9 @@ from .views import (
     AnswerDetailView,
     ReplyListCreateView,
     AttachmentDeleteView,
+    UploadSessionCreateView,
+    UploadSessionDetailView,
+    UploadSessionFinalizeView,
     PostListCreateView,
     PostDetailView,
     PostLikeView,
@@ -41,6 +44,7 @@ from .views import (
     CommentListCreateView,
     CommentDetailView,
     CommentReplyListCreateView,
+    SlowQueryListView,
 )
 
 app_name = 'api'
@@ -71,6 +75,10 @@ urlpatterns = [
 
     path('attachments/<uuid:pk>/', AttachmentDeleteView.as_view(), name='attachment-delete'),
 
+    path('uploads/', UploadSessionCreateView.as_view(), name='upload-sessions'),
+    path('uploads/<uuid:pk>/', UploadSessionDetailView.as_view(), name='upload-session-detail'),
+    path('uploads/<uuid:pk>/finalize/', UploadSessionFinalizeView.as_view(), name='upload-session-finalize'),
+
     path('posts/', PostListCreateView.as_view(), name='posts'),
     path('posts/<uuid:pk>/', PostDetailView.as_view(), name='post-detail'),
     path('posts/<uuid:pk>/like/', PostLikeView.as_view(), name='post-like'),
@@ -85,4 +93,6 @@ urlpatterns = [
     path('posts/<uuid:post_id>/comments/', CommentListCreateView.as_view(), name='post-comments'),
     path('comments/<uuid:pk>/', CommentDetailView.as_view(), name='comment-detail'),
     path('comments/<uuid:pk>/replies/', CommentReplyListCreateView.as_view(), name='comment-replies'),
+
+    path('admin/slow-queries/', SlowQueryListView.as_view(), name='slow-queries'),
 ]
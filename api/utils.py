@@ -1,11 +1,12 @@
 import secrets
 import string
-from django.core.mail import send_mail
 from django.conf import settings
 from django.core.cache import cache
-from django.utils import timezone
 from datetime import timedelta
 
+from . import ratelimit
+from .jobs import enqueue
+
 
 def generate_otp(length=6):
     return ''.join(secrets.choice(string.digits) for _ in range(length))
@@ -45,9 +46,73 @@ ATTACHMENT_LIMITS = {
 MAX_ATTACHMENTS_PER_PARENT = 4
 
 
-def classify_and_validate_attachment(uploaded_file):
+# Enough leading bytes for every signature in sniff_mime_types().
+SNIFF_BYTES = 32
+
+
+def sniff_mime_types(head):
+    """MIME types the file's first bytes are consistent with, most likely
+    first. Empty if the signature isn't one we accept.
+
+    Only ftyp containers are ambiguous (an .mp4 may be video or audio only);
+    there the caller's declared type picks between the candidates."""
+    if head.startswith(b'\xff\xd8\xff'):
+        return ['image/jpeg']
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return ['image/png']
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return ['image/webp']
+    if head.startswith(b'%PDF-'):
+        return ['application/pdf']
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand == b'qt  ':
+            return ['video/quicktime']
+        if brand in (b'M4A ', b'M4B ', b'M4P '):
+            return ['audio/mp4']
+        return ['video/mp4', 'audio/mp4']
+    if head[4:8] in (b'moov', b'mdat', b'wide', b'free'):
+        return ['video/quicktime']
+    if head.startswith(b'OggS'):
+        return ['audio/ogg']
+    if head.startswith(b'\x1a\x45\xdf\xa3'):
+        return ['audio/webm']
+    if head.startswith(b'ID3'):
+        return ['audio/mpeg']
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xF0 == 0xF0:
+        # 12-bit frame sync; layer bits 00 mean ADTS AAC, anything else MPEG audio.
+        return ['audio/aac'] if head[1] & 0x06 == 0 else ['audio/mpeg']
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        return ['audio/mpeg']
+    return []
+
+
+def detect_mime(head, declared=''):
+    """The MIME type to trust for a file starting with `head`, or None."""
+    candidates = sniff_mime_types(head)
+    if not candidates:
+        return None
+    declared = (declared or '').lower()
+    return declared if declared in candidates else candidates[0]
+
+
+def read_head(uploaded_file, size=SNIFF_BYTES):
+    """First `size` bytes of an uploaded file, leaving it rewound."""
+    uploaded_file.seek(0)
+    head = uploaded_file.read(size)
+    uploaded_file.seek(0)
+    return head
+
+
+def classify_and_validate_attachment(uploaded_file, head=None):
     """Classify an uploaded file by MIME type and validate its size.
 
+    The MIME type is detected from the file's first bytes (`head`, or read
+    from the file itself); the client-supplied `content_type` only breaks
+    ties between candidates. Objects without content to read (an upload
+    session that has only declared its type) are classified by
+    `content_type` alone.
+
     Returns the tuple (kind, mime_type) where kind is one of 'image', 'video',
     'audio', 'pdf'. Raises rest_framework.exceptions.ValidationError with a
     user-friendly message if the file is too large or has an unsupported type.
@@ -55,21 +120,38 @@ def classify_and_validate_attachment(uploaded_file):
     from rest_framework.exceptions import ValidationError as DRFValidationError
 
     mime = (uploaded_file.content_type or '').lower()
-    for kind, limits in ATTACHMENT_LIMITS.items():
-        if mime in limits['mime_types']:
-            if uploaded_file.size > limits['max_bytes']:
-                max_mb = limits['max_bytes'] // (1024 * 1024)
-                raise DRFValidationError(
-                    f'{kind.capitalize()} too large (max {max_mb} MB).'
-                )
-            return kind, mime
-    raise DRFValidationError(
+    if head is None and hasattr(uploaded_file, 'read'):
+        head = read_head(uploaded_file)
+    if head is not None:
+        mime = detect_mime(head, mime) or ''
+    kind = attachment_kind(mime)
+    if kind is None:
+        raise DRFValidationError(unsupported_attachment_message(mime))
+    if uploaded_file.size > ATTACHMENT_LIMITS[kind]['max_bytes']:
+        raise DRFValidationError(attachment_too_large_message(kind))
+    return kind, mime
+
+
+def attachment_too_large_message(kind):
+    max_mb = ATTACHMENT_LIMITS[kind]['max_bytes'] // (1024 * 1024)
+    return f'{kind.capitalize()} too large (max {max_mb} MB).'
+
+
+def unsupported_attachment_message(mime):
+    return (
         f'Unsupported file type: {mime or "unknown"}. '
         f'Allowed: image (jpeg/png/webp), video (mp4/quicktime), '
         f'audio (mpeg/mp4/aac/ogg/webm), pdf.'
     )
 
 
+def attachment_kind(mime):
+    for kind, limits in ATTACHMENT_LIMITS.items():
+        if mime in limits['mime_types']:
+            return kind
+    return None
+
+
 def verify_otp(email, otp, consume=True):
     """Verify the OTP for an email. By default, consumes (deletes) the OTP on success."""
     cache_key = f'otp_{email}'
@@ -83,38 +165,28 @@ def verify_otp(email, otp, consume=True):
     return False
 
 
-def can_resend_otp(email):
-    cache_key = f'otp_last_sent_{email}'
-    last_sent = cache.get(cache_key)
-    
-    if last_sent is None:
-        return True, 0
-    
-    elapsed = (timezone.now() - last_sent).total_seconds()
-    delay_seconds = getattr(settings, 'OTP_RESEND_DELAY_SECONDS', 60)
-    
-    if elapsed >= delay_seconds:
-        return True, 0
-    else:
-        return False, int(delay_seconds - elapsed)
-
-
-def mark_otp_sent(email):
-    cache_key = f'otp_last_sent_{email}'
-    cache.set(cache_key, timezone.now(), timeout=300)  # 5 minutes
-
-
-def get_otp_resend_count(email):
-    cache_key = f'otp_resend_count_{email}'
-    count = cache.get(cache_key, 0)
-    return count
+def throttle_otp_send(email):
+    """Atomically enforce the resend cooldown and the resend quota for `email`
+    and, if both allow it, count this send. Returns a ratelimit.Throttle."""
+    return ratelimit.throttle(
+        cooldown_key=f'otp_last_sent_{email}',
+        cooldown=getattr(settings, 'OTP_RESEND_DELAY_SECONDS', 60),
+        count_key=f'otp_resend_count_{email}',
+        limit=getattr(settings, 'OTP_MAX_RESEND_ATTEMPTS', 3),
+        window=300,  # 5 minutes
+    )
 
 
-def increment_otp_resend_count(email):
-    cache_key = f'otp_resend_count_{email}'
-    count = cache.get(cache_key, 0) + 1
-    cache.set(cache_key, count, timeout=300)
-    return count
+def queue_email(subject, message, recipient):
+    """Hand an email to the background job queue (api.tasks.send_email), which
+    retries delivery on SMTP errors. Returns False only if it couldn't be
+    queued at all."""
+    try:
+        enqueue('api.tasks.send_email', subject=subject, message=message, recipient=recipient)
+        return True
+    except Exception as e:
+        print(f"Error queueing email: {e}")
+        return False
 
 
 def send_verification_email(email, otp, first_name=None):
@@ -136,42 +208,25 @@ Best regards,
 The xBrain Team
 """
     
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
+    return queue_email(subject, message, email)
 
 
 def send_otp_and_store(email, first_name=None):
-    can_resend, seconds_remaining = can_resend_otp(email)
-    if not can_resend:
-        return False, None, f"Please wait {seconds_remaining} seconds before requesting a new code"
-    
-    resend_count = get_otp_resend_count(email)
-    max_resends = getattr(settings, 'OTP_MAX_RESEND_ATTEMPTS', 3)
-    if resend_count >= max_resends:
+    throttle = throttle_otp_send(email)
+    if not throttle.allowed:
+        if throttle.retry_after:
+            return False, None, f"Please wait {throttle.retry_after} seconds before requesting a new code"
         return False, None, "Maximum OTP resend attempts reached. Please try again later."
     
     otp = generate_otp(getattr(settings, 'OTP_LENGTH', 6))
     validity = getattr(settings, 'OTP_VALIDITY_MINUTES', 5)
     store_otp(email, otp, validity)
     
-    # Try to send email, but don't fail if it can't be sent
+    # Queue the email, but don't fail if it can't be queued
     email_sent = send_verification_email(email, otp, first_name)
     if not email_sent:
         print(f"[WARNING] Email could not be sent to {email}. OTP is stored and returned in response.")
     
-    mark_otp_sent(email)
-    increment_otp_resend_count(email)
-    
     return True, otp, None
 
 
@@ -204,18 +259,7 @@ The xBrain Team
 © 2026 xBrain. All rights reserved.
 """
     
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print(f"Error sending welcome email: {e}")
-        return False
+    return queue_email(subject, message, email)
 
 
 def validate_password_strength(password):
@@ -238,17 +282,16 @@ def validate_password_strength(password):
     return True, None
 
 
-def get_login_attempts(identifier):
+def consume_login_attempt(identifier):
+    """Atomically reserve one login attempt for `identifier` before the
+    password is checked. Returns (allowed, attempts, max_attempts); once
+    `max_attempts` are used up further attempts are refused without being
+    counted, so concurrent guesses can't overshoot the limit."""
     cache_key = f'login_attempts_{identifier}'
-    return cache.get(cache_key, 0)
-
-
-def increment_login_attempts(identifier):
-    cache_key = f'login_attempts_{identifier}'
-    attempts = cache.get(cache_key, 0) + 1
     lockout_minutes = getattr(settings, 'LOGIN_LOCKOUT_MINUTES', 15)
-    cache.set(cache_key, attempts, timeout=lockout_minutes * 60)
-    return attempts
+    max_attempts = getattr(settings, 'MAX_LOGIN_ATTEMPTS', 5)
+    allowed, attempts = ratelimit.consume(cache_key, max_attempts, window=lockout_minutes * 60)
+    return allowed, attempts, max_attempts
 
 
 def reset_login_attempts(identifier):
@@ -256,16 +299,6 @@ def reset_login_attempts(identifier):
     cache.delete(cache_key)
 
 
-def is_account_locked(identifier):
-    attempts = get_login_attempts(identifier)
-    max_attempts = getattr(settings, 'MAX_LOGIN_ATTEMPTS', 5)
-    
-    if attempts >= max_attempts:
-        return True, attempts, max_attempts
-    
-    return False, attempts, max_attempts
-
-
 def send_password_reset_email(email, otp, first_name=None):
     subject = 'Password Reset Request - xBrain'
     
@@ -285,18 +318,7 @@ Best regards,
 The xBrain Team
 """
     
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print(f"Error sending password reset email: {e}")
-        return False
+    return queue_email(subject, message, email)
 
 
 def send_reset_otp_and_store(email, first_name=None):
@@ -1,19 +1,24 @@
+import re
+import uuid
+from functools import partial
+
 from rest_framework import status, generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.exceptions import ValidationError as DRFValidationError, PermissionDenied
 from rest_framework_simplejwt.tokens import RefreshToken
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 from django.contrib.auth import authenticate
-from django.core.cache import cache
 from django.db import transaction
-from django.db.models import Count, Q, OuterRef, Subquery, CharField
+from django.db.models import Count, OuterRef, Subquery, CharField
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.http import parse_etags
 
-from .authentication import access_blacklist_key
+from .authentication import blacklist_access_token
 
 from .serializers import (
     UserRegistrationSerializer,
@@ -40,12 +45,28 @@ from .serializers import (
     CommentCreateSerializer,
     CommentUpdateSerializer,
     CertificateSerializer,
+    UploadSessionCreateSerializer,
+    UploadSessionSerializer,
 )
 from .models import (
-    User, Specialization, UserSpecialization,
-    Question, Answer, Post, PostReaction, Comment, Certificate,
+    User, UserSpecialization,
+    Question, Answer, Post, PostReaction, Comment, Certificate, UploadSession,
 )
 from .permissions import IsAuthorOrReadOnly, IsQuestionAuthor, IsCommentDeletable
+from .pagination import FeedPagination
+from .counters import adjust_counters
+from .search import apply_search
+from .catalogue import get_catalogue
+from .uploads import upload_scope
+from .upload_handlers import AttachmentMultiPartParser
+from .fast_json import FastJSONParser
+from .upload_sessions import begin_upload, finalize_upload, get_backend
+from .response_cache import POSTS, QUESTIONS, cached_read
+from .slow_queries import get_ring
+from .thumbnails import delete_variants
+from .conditional import (
+    answer_validator, comment_validator, conditional_read, post_validator, question_validator,
+)
 
 
 class RegisterView(APIView):
@@ -188,7 +209,7 @@ class ResendOTPView(APIView):
 
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    parser_classes = [MultiPartParser, FormParser, FastJSONParser]
 
     @extend_schema(
         tags=['Users'],
@@ -235,31 +256,80 @@ class SpecializationListView(APIView):
         tags=['Specializations'],
         operation_id='specializations_01_list',
         summary="List all specializations",
-        description="Returns a list of all available specializations in the system.",
+        description=(
+            "Returns a list of all available specializations in the system. "
+            "Responses carry an `ETag`; send it back in `If-None-Match` to get "
+            "an empty 304 when the catalogue hasn't changed."
+        ),
         responses={
-            200: OpenApiResponse(description="List of specializations or an empty response if none exist")
+            200: OpenApiResponse(description="List of specializations or an empty response if none exist"),
+            304: OpenApiResponse(description="Catalogue unchanged since the given ETag"),
         }
     )
     def get(self, request):
-        specializations = Specialization.objects.all()
-        serializer = SpecializationSerializer(specializations, many=True)
+        catalogue = get_catalogue()
+        headers = {'ETag': catalogue.etag, 'Cache-Control': 'private, no-cache'}
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            client_etags = [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+            if '*' in client_etags or catalogue.etag in client_etags:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
-        if not specializations.exists():
+        if not catalogue.results:
             return Response(
                 {
                     "message": "No specializations are currently available in the system.",
                     "results": []
                 },
-                status=status.HTTP_200_OK
+                status=status.HTTP_200_OK,
+                headers=headers,
             )
 
         return Response(
             {
-                "count": specializations.count(),
-                "results": serializer.data
+                "count": len(catalogue.results),
+                "results": catalogue.results
             },
-            status=status.HTTP_200_OK
+            status=status.HTTP_200_OK,
+            headers=headers,
+        )
+
+
+def _replace_user_specializations(user, specialization_ids):
+    """Make `specialization_ids` the user's exact set and stamp the form as
+    completed, in one transaction.
+
+    Three statements whatever the size of the change: delete the rows that are
+    no longer wanted, insert the wanted ones (existing rows are skipped via the
+    user/specialization unique constraint), and update the timestamp. Readers
+    never see a half-replaced or momentarily empty set."""
+    with transaction.atomic():
+        UserSpecialization.objects.filter(user=user).exclude(
+            specialization_id__in=specialization_ids
+        ).delete()
+        UserSpecialization.objects.bulk_create(
+            [
+                UserSpecialization(user=user, specialization_id=spec_id)
+                for spec_id in specialization_ids
+            ],
+            ignore_conflicts=True,
         )
+        user.specialization_form_completed_at = timezone.now()
+        user.save(update_fields=['specialization_form_completed_at'])
+
+    # The catalogue already holds every validated ID, in name order.
+    specialization_data = [
+        row for row in get_catalogue().results
+        if uuid.UUID(row['id']) in specialization_ids
+    ]
+    return Response(
+        {
+            "specialization_form_completed_at": user.specialization_form_completed_at,
+            "specializations": specialization_data
+        },
+        status=status.HTTP_200_OK
+    )
 
 
 class UserSpecializationView(APIView):
@@ -302,37 +372,14 @@ class UserSpecializationView(APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        user = request.user
-        specialization_ids = list(set(serializer.validated_data.get('specialization_ids', [])))
-
-        UserSpecialization.objects.filter(user=user).delete()
-
-        for spec_id in specialization_ids:
-            UserSpecialization.objects.create(
-                user=user,
-                specialization_id=spec_id
-            )
-
-        from django.utils import timezone
-        user.specialization_form_completed_at = timezone.now()
-        user.save(update_fields=['specialization_form_completed_at'])
-
-        specializations = user.specializations.all()
-        specialization_data = SpecializationSerializer(specializations, many=True).data
-
-        return Response(
-            {
-                "specialization_form_completed_at": user.specialization_form_completed_at,
-                "specializations": specialization_data
-            },
-            status=status.HTTP_200_OK
-        )
+        specialization_ids = set(serializer.validated_data.get('specialization_ids', []))
+        return _replace_user_specializations(request.user, specialization_ids)
 
     @extend_schema(
         tags=['Users'],
         operation_id='users_05_my_specializations_skip',
         summary="Skip specialization selection",
-        description="Allows the user to skip selecting specializations. Marks the specialization form as completed but assigns no specializations.",
+        description="Allows the user to skip selecting specializations. Marks the specialization form as completed and clears any previously selected specializations.",
         request=UserSpecializationSerializer,
         responses={
             200: OpenApiResponse(description="Form skipped successfully"),
@@ -353,17 +400,7 @@ class UserSpecializationView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        from django.utils import timezone
-        user.specialization_form_completed_at = timezone.now()
-        user.save(update_fields=['specialization_form_completed_at'])
-
-        return Response(
-            {
-                "specialization_form_completed_at": user.specialization_form_completed_at,
-                "specializations": []
-            },
-            status=status.HTTP_200_OK
-        )
+        return _replace_user_specializations(user, set())
 
 
 class ForgotPasswordView(APIView):
@@ -479,25 +516,22 @@ class LogoutView(APIView):
             jti = access.get('jti')
             exp = access.get('exp')
             if jti and exp:
-                ttl = int(exp - timezone.now().timestamp())
-                if ttl > 0:
-                    cache.set(access_blacklist_key(jti), '1', timeout=ttl)
+                blacklist_access_token(jti, exp)
 
         return Response(status=status.HTTP_205_RESET_CONTENT)
 
 
 def _question_queryset_with_counts():
-    """Annotated queryset used by both list and detail to avoid N+1 on counts.
+    """Queryset used by both list and detail to avoid N+1.
 
     `answers_count` is a Facebook-style total: counts top-level answers PLUS replies.
-    Same shape as "X comments" on a social media post."""
+    Same shape as "X comments" on a social media post. It's a denormalized column
+    on Question (see api/counters.py), so no join against `answers` is needed."""
     return (
         Question.objects
         .select_related('author')
         .prefetch_related('specializations', 'attachments')
-        .annotate(
-            answers_count=Count('answers', distinct=True),
-        )
+        .defer('search_vector')
     )
 
 def _answer_queryset_with_counts():
@@ -515,7 +549,8 @@ class QuestionListCreateView(generics.ListCreateAPIView):
     or multipart/form-data; in the multipart case, optional file `attachments`
     are stored alongside the question."""
     permission_classes = [IsAuthenticatedOrReadOnly]
-    parser_classes = [JSONParser, MultiPartParser, FormParser]
+    parser_classes = [FastJSONParser, AttachmentMultiPartParser, FormParser]
+    pagination_class = FeedPagination
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -543,7 +578,7 @@ class QuestionListCreateView(generics.ListCreateAPIView):
 
         q = params.get('q')
         if q:
-            qs = qs.filter(content__icontains=q)
+            qs = apply_search(qs, q)
 
         return qs
 
@@ -554,11 +589,18 @@ class QuestionListCreateView(generics.ListCreateAPIView):
         tags=['Q&A'],
         operation_id='qa_01_questions_list',
         summary="List questions",
-        description="Paginated newest-first list of questions. Filters: ?author=, ?specialization=, ?is_resolved=, ?q=.",
-        responses={200: QuestionListSerializer(many=True)},
+        description=(
+            "Paginated newest-first list of questions. Filters: ?author=, ?specialization=, ?is_resolved=, ?q= (full-text search, best matches first; page-number paging only). "
+            "Send ?paginate=cursor for keyset pagination (opaque next/previous cursors, no count). "
+            "Responses carry an `ETag`; send it back in `If-None-Match` to get an empty 304 when nothing changed."
+        ),
+        responses={
+            200: QuestionListSerializer(many=True),
+            304: OpenApiResponse(description="Unchanged since the given ETag"),
+        },
     )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return cached_read(request, QUESTIONS, partial(super().get, request, *args, **kwargs))
 
     @extend_schema(
         tags=['Q&A'],
@@ -611,9 +653,17 @@ class QuestionDetailView(generics.RetrieveUpdateDestroyAPIView):
         tags=['Q&A'],
         operation_id='qa_03_question_detail',
         summary="Get a question with its first 10 answers (and 2 replies each).",
+        description="Responses carry an `ETag`; send it back in `If-None-Match` to get an empty 304 when nothing changed.",
+        responses={
+            200: QuestionDetailSerializer,
+            304: OpenApiResponse(description="Unchanged since the given ETag"),
+        },
     )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return cached_read(
+            request, QUESTIONS, partial(super().get, request, *args, **kwargs),
+            validator=partial(question_validator, pk=kwargs['pk']),
+        )
 
     @extend_schema(
         tags=['Q&A'],
@@ -703,7 +753,7 @@ class AnswerListCreateView(generics.ListCreateAPIView):
     POST same URL — create a top-level answer. Accepts JSON or multipart/form-data
     with optional file `attachments`."""
     permission_classes = [IsAuthenticatedOrReadOnly]
-    parser_classes = [JSONParser, MultiPartParser, FormParser]
+    parser_classes = [FastJSONParser, AttachmentMultiPartParser, FormParser]
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -723,11 +773,13 @@ class AnswerListCreateView(generics.ListCreateAPIView):
         question = get_object_or_404(Question, pk=self.kwargs['question_id'])
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        answer = serializer.save(
-            author=request.user,
-            question=question,
-            parent_answer=None,
-        )
+        with upload_scope():
+            answer = serializer.save(
+                author=request.user,
+                question=question,
+                parent_answer=None,
+            )
+            adjust_counters(Question, question.pk, answers_count=1)
         answer = _answer_queryset_with_counts().get(pk=answer.pk)
         return Response(
             AnswerSerializer(answer, context={'request': request}).data,
@@ -774,13 +826,29 @@ class AnswerDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance = self.get_queryset().get(pk=instance.pk)
         return Response(AnswerSerializer(instance, context={'request': request}).data)
 
+    def perform_destroy(self, instance):
+        # Deleting a top-level answer cascades to its replies; they all leave
+        # the question's Facebook-style total together.
+        with transaction.atomic():
+            removed = 1 + (instance.replies.count() if instance.parent_answer_id is None else 0)
+            instance.delete()
+            adjust_counters(Question, instance.question_id, answers_count=-removed)
+
     @extend_schema(
         tags=['Q&A'],
         operation_id='qa_10_answer_detail',
         summary="Get a single answer or reply.",
+        description="Responses carry an `ETag`; send it back in `If-None-Match` to get an empty 304 when nothing changed.",
+        responses={
+            200: AnswerSerializer,
+            304: OpenApiResponse(description="Unchanged since the given ETag"),
+        },
     )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return conditional_read(
+            request, partial(answer_validator, pk=kwargs['pk']),
+            partial(super().get, request, *args, **kwargs),
+        )
 
     @extend_schema(
         tags=['Q&A'],
@@ -830,17 +898,169 @@ class AttachmentDeleteView(APIView):
         if parent is None or getattr(parent, 'author_id', None) != request.user.id:
             raise PermissionDenied("Only the parent's author can delete this attachment.")
         if attachment.file:
+            delete_variants(attachment.file.storage, attachment.variants)
             attachment.file.delete(save=False)
         attachment.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+def _own_upload_session(request, pk):
+    return get_object_or_404(UploadSession, pk=pk, owner_id=request.user.pk)
+
+
+class UploadSessionCreateView(APIView):
+    """POST /api/uploads/ — start uploading a large attachment ahead of its
+    parent. See api/upload_sessions.py for the whole flow."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['Uploads'],
+        operation_id='uploads_01_create',
+        summary="Start an upload session",
+        description=(
+            "Declare the file's name, MIME type and size. They are checked against the "
+            "attachment limits (image 5 MB, video 50 MB, audio 15 MB, pdf 10 MB). "
+            "`upload` says where to send the bytes: a SAS URL straight to Blob Storage, "
+            "or this API's chunk endpoint (PUT /api/uploads/{id}/ with Content-Range). "
+            "Then call finalize and pass the id in the parent's `uploads` list."
+        ),
+        request=UploadSessionCreateSerializer,
+        responses={
+            201: OpenApiResponse(description="Session created; body has the session plus `upload` instructions."),
+            400: OpenApiResponse(description="Unsupported type or over the size limit."),
+        },
+    )
+    def post(self, request):
+        serializer = UploadSessionCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        session, upload = begin_upload(
+            request.user, data['filename'], data['content_type'], data['size'], request,
+        )
+        return Response(
+            {**UploadSessionSerializer(session).data, 'upload': upload},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class UploadSessionDetailView(APIView):
+    """GET /api/uploads/{id}/ — session status (and resume offset).
+    PUT same URL — send one chunk (local backend only).
+    DELETE same URL — abandon the session."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['Uploads'],
+        operation_id='uploads_02_detail',
+        summary="Get an upload session",
+        description="Owner only. `received_bytes` is the offset to resume a chunked upload from.",
+        responses={200: UploadSessionSerializer, 404: OpenApiResponse(description="Not found.")},
+    )
+    def get(self, request, pk):
+        return Response(UploadSessionSerializer(_own_upload_session(request, pk)).data)
+
+    @extend_schema(
+        tags=['Uploads'],
+        operation_id='uploads_03_chunk',
+        summary="Upload one chunk",
+        description=(
+            "Raw bytes in the body with `Content-Range: bytes <start>-<end>/<total>`. "
+            "`<start>` must not be past `received_bytes` and `<total>` must equal the "
+            "declared size. Only available when `upload.url` points here."
+        ),
+        request={'application/octet-stream': OpenApiTypes.BINARY},
+        responses={
+            200: UploadSessionSerializer,
+            400: OpenApiResponse(description="Missing or inconsistent Content-Range."),
+            409: OpenApiResponse(description="Session is not accepting chunks."),
+        },
+    )
+    def put(self, request, pk):
+        backend = get_backend()
+        match = _CONTENT_RANGE.match(request.META.get('HTTP_CONTENT_RANGE', ''))
+        if match is None:
+            raise DRFValidationError({'Content-Range': 'Expected "bytes <start>-<end>/<total>".'})
+        start, end, total = (int(g) for g in match.groups())
+        length = end - start + 1
+
+        with transaction.atomic():
+            session = get_object_or_404(
+                UploadSession.objects.select_for_update(), pk=pk, owner_id=request.user.pk,
+            )
+            if not backend.supports_chunks or session.status != 'pending':
+                return Response(
+                    {'error': 'This session does not accept chunks.'},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            if total != session.size_bytes or length <= 0 or end >= total:
+                raise DRFValidationError({'Content-Range': f'Range must lie within 0-{session.size_bytes - 1}.'})
+            if start > session.received_bytes:
+                raise DRFValidationError(
+                    {'Content-Range': f'Chunk starts past the received bytes ({session.received_bytes}).'}
+                )
+            if int(request.META.get('CONTENT_LENGTH') or 0) != length:
+                raise DRFValidationError({'Content-Range': 'Range length does not match the body length.'})
+
+            written = backend.write_chunk(session, start, request.stream, length)
+            if written != length:
+                raise DRFValidationError({'detail': f'Body ended after {written} of {length} bytes.'})
+            session.received_bytes = max(session.received_bytes, end + 1)
+            session.save(update_fields=['received_bytes'])
+        return Response(UploadSessionSerializer(session).data)
+
+    @extend_schema(
+        tags=['Uploads'],
+        operation_id='uploads_04_delete',
+        summary="Abandon an upload session",
+        responses={204: OpenApiResponse(description="Deleted."), 404: OpenApiResponse(description="Not found.")},
+        request=None,
+    )
+    def delete(self, request, pk):
+        session = _own_upload_session(request, pk)
+        get_backend().discard(session)
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionFinalizeView(APIView):
+    """POST /api/uploads/{id}/finalize/ — check the received file and make the
+    session usable in a parent's `uploads`."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['Uploads'],
+        operation_id='uploads_05_finalize',
+        summary="Finalize an upload session",
+        description=(
+            "Validates the bytes actually received against the declared size and the "
+            "attachment limits. On success the session is `complete` and can be "
+            "referenced once, before `expires_at`, in a Question/Answer/Reply/Post create."
+        ),
+        request=None,
+        responses={
+            200: UploadSessionSerializer,
+            400: OpenApiResponse(description="Incomplete, expired, or over the limit."),
+        },
+    )
+    def post(self, request, pk):
+        with transaction.atomic():
+            session = get_object_or_404(
+                UploadSession.objects.select_for_update(), pk=pk, owner_id=request.user.pk,
+            )
+            if session.status != 'complete':
+                finalize_upload(session)
+        return Response(UploadSessionSerializer(session).data)
+
+
 class ReplyListCreateView(generics.ListCreateAPIView):
     """GET /api/answers/{id}/replies/ — list replies under a top-level answer.
     POST same URL — post a reply to that answer (depth-1). Accepts JSON
     or multipart/form-data with optional file `attachments`."""
     permission_classes = [IsAuthenticatedOrReadOnly]
-    parser_classes = [JSONParser, MultiPartParser, FormParser]
+    parser_classes = [FastJSONParser, AttachmentMultiPartParser, FormParser]
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -866,11 +1086,13 @@ class ReplyListCreateView(generics.ListCreateAPIView):
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        reply = serializer.save(
-            author=request.user,
-            question=parent.question,
-            parent_answer=parent,
-        )
+        with upload_scope():
+            reply = serializer.save(
+                author=request.user,
+                question=parent.question,
+                parent_answer=parent,
+            )
+            adjust_counters(Question, parent.question_id, answers_count=1)
         reply = _answer_queryset_with_counts().get(pk=reply.pk)
         return Response(
             AnswerSerializer(reply, context={'request': request}).data,
@@ -904,41 +1126,52 @@ class ReplyListCreateView(generics.ListCreateAPIView):
 def _post_queryset_with_counts(viewer=None):
     """Annotated Post queryset.
 
-    `likes_count` and `dislikes_count` are computed in SQL (default 0 for new
-    posts with no reactions yet). `my_reaction` is per-viewer — populated only
-    when the viewer is authenticated; otherwise null."""
+    `likes_count`, `dislikes_count` and `comments_count` are denormalized
+    columns on Post (see api/counters.py), kept in step by the reaction toggle
+    and the comment write paths. `my_reaction` is per-viewer — populated only
+    when the viewer is authenticated; otherwise null.
+
+    Only prefetches what PostListSerializer renders. The detail shape's
+    embedded comment thread is batch-loaded by the serializer itself
+    (see api/threads.py)."""
     qs = (
         Post.objects
         .select_related('author')
-        .prefetch_related('specializations', 'attachments', 'comments')
-        .annotate(
-            likes_count=Count(
-                'reactions',
-                filter=Q(reactions__reaction='like'),
-                distinct=True,
-            ),
-            dislikes_count=Count(
-                'reactions',
-                filter=Q(reactions__reaction='dislike'),
-                distinct=True,
-            ),
-            comments_count=Count('comments', distinct=True),
-        )
+        .prefetch_related('specializations', 'attachments')
+        .defer('search_vector')
     )
     if viewer is not None and getattr(viewer, 'is_authenticated', False):
         my = (
             PostReaction.objects
-            .filter(post=OuterRef('pk'), user=viewer)
+            .filter(post=OuterRef('pk'), user_id=viewer.pk)
             .values('reaction')[:1]
         )
         qs = qs.annotate(my_reaction=Subquery(my, output_field=CharField()))
     return qs
 
 
+def _merge_my_reactions(request, data):
+    """`personalize` hook for cached post responses (api/response_cache.py):
+    fill in the viewer's `my_reaction` on a post list page or a post detail
+    body with one query."""
+    posts = data['results'] if 'results' in data else [data]
+    reactions = {
+        str(post_id): reaction
+        for post_id, reaction in PostReaction.objects.filter(
+            user_id=request.user.pk, post_id__in=[p['id'] for p in posts],
+        ).values_list('post_id', 'reaction')
+    }
+    merged = [{**p, 'my_reaction': reactions.get(str(p['id']))} for p in posts]
+    if 'results' in data:
+        return {**data, 'results': merged}, reactions
+    return merged[0], reactions
+
+
 class PostListCreateView(generics.ListCreateAPIView):
     """GET /api/posts/ — paginated list. POST /api/posts/ — create (auth)."""
     permission_classes = [IsAuthenticatedOrReadOnly]
-    parser_classes = [JSONParser, MultiPartParser, FormParser]
+    parser_classes = [FastJSONParser, AttachmentMultiPartParser, FormParser]
+    pagination_class = FeedPagination
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -946,8 +1179,8 @@ class PostListCreateView(generics.ListCreateAPIView):
         return PostListSerializer
 
     def get_queryset(self):
-        viewer = self.request.user if self.request.user.is_authenticated else None
-        qs = _post_queryset_with_counts(viewer=viewer).order_by('-created_at')
+        # GET renders the viewer-independent list; see get().
+        qs = _post_queryset_with_counts().order_by('-created_at')
         params = self.request.query_params
 
         author = params.get('author')
@@ -960,7 +1193,7 @@ class PostListCreateView(generics.ListCreateAPIView):
 
         q = params.get('q')
         if q:
-            qs = qs.filter(content__icontains=q)
+            qs = apply_search(qs, q)
 
         return qs
 
@@ -968,11 +1201,21 @@ class PostListCreateView(generics.ListCreateAPIView):
         tags=['Posts'],
         operation_id='posts_01_list',
         summary="List posts",
-        description="Paginated newest-first list of posts. Filters: ?author=, ?specialization=, ?q=. Each post carries likes/dislikes counts and (if authenticated) the viewer's `my_reaction`.",
-        responses={200: PostListSerializer(many=True)},
+        description=(
+            "Paginated newest-first list of posts. Filters: ?author=, ?specialization=, ?q= (full-text search, best matches first; page-number paging only). Each post carries likes/dislikes counts and (if authenticated) the viewer's `my_reaction`. "
+            "Send ?paginate=cursor for keyset pagination (opaque next/previous cursors, no count). "
+            "Responses carry an `ETag`; send it back in `If-None-Match` to get an empty 304 when nothing changed."
+        ),
+        responses={
+            200: PostListSerializer(many=True),
+            304: OpenApiResponse(description="Unchanged since the given ETag"),
+        },
     )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return cached_read(
+            request, POSTS, partial(super().get, request, *args, **kwargs),
+            personalize=_merge_my_reactions,
+        )
 
     @extend_schema(
         tags=['Posts'],
@@ -1003,7 +1246,8 @@ class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
     http_method_names = ['get', 'patch', 'delete', 'head', 'options']
 
     def get_queryset(self):
-        viewer = self.request.user if self.request.user.is_authenticated else None
+        # GET renders the viewer-independent body; see get().
+        viewer = self.request.user if self.request.method != 'GET' else None
         return _post_queryset_with_counts(viewer=viewer)
 
     def get_serializer_class(self):
@@ -1020,9 +1264,22 @@ class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance = self.get_queryset().get(pk=instance.pk)
         return Response(PostDetailSerializer(instance, context={'request': request}).data)
 
-    @extend_schema(tags=['Posts'], operation_id='posts_03_detail', summary="Get a post.")
+    @extend_schema(
+        tags=['Posts'],
+        operation_id='posts_03_detail',
+        summary="Get a post.",
+        description="Responses carry an `ETag`; send it back in `If-None-Match` to get an empty 304 when nothing changed.",
+        responses={
+            200: PostDetailSerializer,
+            304: OpenApiResponse(description="Unchanged since the given ETag"),
+        },
+    )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return cached_read(
+            request, POSTS, partial(super().get, request, *args, **kwargs),
+            personalize=_merge_my_reactions,
+            validator=partial(post_validator, pk=kwargs['pk']),
+        )
 
     @extend_schema(
         tags=['Posts'],
@@ -1056,15 +1313,20 @@ class _PostReactionToggleView(APIView):
                 .filter(user=request.user, post=post)
                 .first()
             )
+            target_field = f'{self.target_reaction}s_count'
             if existing is None:
                 PostReaction.objects.create(
                     user=request.user, post=post, reaction=self.target_reaction,
                 )
+                adjust_counters(Post, post.pk, **{target_field: 1})
             elif existing.reaction == self.target_reaction:
                 existing.delete()
+                adjust_counters(Post, post.pk, **{target_field: -1})
             else:
+                previous_field = f'{existing.reaction}s_count'
                 existing.reaction = self.target_reaction
                 existing.save(update_fields=['reaction', 'updated_at'])
+                adjust_counters(Post, post.pk, **{target_field: 1, previous_field: -1})
 
         post = _post_queryset_with_counts(viewer=request.user).get(pk=pk)
         return Response(
@@ -1131,7 +1393,7 @@ class MyCertificatesListCreateView(generics.ListCreateAPIView):
     serializer_class = CertificateSerializer
 
     def get_queryset(self):
-        return Certificate.objects.filter(user=self.request.user).order_by('-issue_date')
+        return Certificate.objects.filter(user_id=self.request.user.pk).order_by('-issue_date')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -1171,7 +1433,7 @@ class MyCertificateDeleteView(generics.DestroyAPIView):
     serializer_class = CertificateSerializer
 
     def get_queryset(self):
-        return Certificate.objects.filter(user=self.request.user)
+        return Certificate.objects.filter(user_id=self.request.user.pk)
 
     @extend_schema(
         tags=['Users'],
@@ -1240,11 +1502,13 @@ class CommentListCreateView(generics.ListCreateAPIView):
         post = get_object_or_404(Post, pk=self.kwargs['post_id'])
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        comment = serializer.save(
-            author=request.user,
-            post=post,
-            parent_comment=None,
-        )
+        with transaction.atomic():
+            comment = serializer.save(
+                author=request.user,
+                post=post,
+                parent_comment=None,
+            )
+            adjust_counters(Post, post.pk, comments_count=1)
         comment = _comment_queryset_with_counts().get(pk=comment.pk)
         return Response(
             CommentSerializer(comment, context={'request': request}).data,
@@ -1298,9 +1562,28 @@ class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance = self.get_queryset().get(pk=instance.pk)
         return Response(CommentSerializer(instance, context={'request': request}).data)
 
-    @extend_schema(tags=['Posts'], operation_id='posts_10_comment_detail', summary="Get a comment or reply.")
+    def perform_destroy(self, instance):
+        # Top-level comments take their replies with them (CASCADE).
+        with transaction.atomic():
+            removed = 1 + (instance.replies.count() if instance.parent_comment_id is None else 0)
+            instance.delete()
+            adjust_counters(Post, instance.post_id, comments_count=-removed)
+
+    @extend_schema(
+        tags=['Posts'],
+        operation_id='posts_10_comment_detail',
+        summary="Get a comment or reply.",
+        description="Responses carry an `ETag`; send it back in `If-None-Match` to get an empty 304 when nothing changed.",
+        responses={
+            200: CommentSerializer,
+            304: OpenApiResponse(description="Unchanged since the given ETag"),
+        },
+    )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return conditional_read(
+            request, partial(comment_validator, pk=kwargs['pk']),
+            partial(super().get, request, *args, **kwargs),
+        )
 
     @extend_schema(
         tags=['Posts'],
@@ -1349,11 +1632,13 @@ class CommentReplyListCreateView(generics.ListCreateAPIView):
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        reply = serializer.save(
-            author=request.user,
-            post=parent.post,
-            parent_comment=parent,
-        )
+        with transaction.atomic():
+            reply = serializer.save(
+                author=request.user,
+                post=parent.post,
+                parent_comment=parent,
+            )
+            adjust_counters(Post, parent.post_id, comments_count=1)
         reply = _comment_queryset_with_counts().get(pk=reply.pk)
         return Response(
             CommentSerializer(reply, context={'request': request}).data,
@@ -1378,4 +1663,49 @@ class CommentReplyListCreateView(generics.ListCreateAPIView):
         },
     )
     def post(self, request, *args, **kwargs):
-        return super().post(request, *args, **kwargs)
\ No newline at end of file
+        return super().post(request, *args, **kwargs)
+
+
+class SlowQueryListView(APIView):
+    """GET / DELETE /api/admin/slow-queries/ — the slow-query ring buffer (staff only)."""
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        tags=['Admin'],
+        operation_id='admin_01_slow_queries_list',
+        summary="List captured slow queries",
+        description=(
+            "Statements that took `SLOW_QUERY_THRESHOLD_MS` or longer while serving a request, "
+            "newest first. Each entry has the query's fingerprint (its shape with literals and "
+            "placeholders collapsed), normalized statement, SQL, parameters, duration and route. "
+            "The first entry of each fingerprint also has the `EXPLAIN (ANALYZE, BUFFERS)` plan. "
+            "Filter with `?fingerprint=`. Staff only."
+        ),
+        responses={
+            200: OpenApiResponse(description="`{count, shared, results}`; `shared` is false when only this worker's buffer is visible."),
+            401: OpenApiResponse(description="Authentication required."),
+            403: OpenApiResponse(description="Staff only."),
+        },
+    )
+    def get(self, request):
+        ring = get_ring()
+        entries = ring.entries()
+        fingerprint = request.query_params.get('fingerprint')
+        if fingerprint:
+            entries = [entry for entry in entries if entry['fingerprint'] == fingerprint]
+        return Response({'count': len(entries), 'shared': ring.shared, 'results': entries})
+
+    @extend_schema(
+        tags=['Admin'],
+        operation_id='admin_02_slow_queries_clear',
+        summary="Clear captured slow queries",
+        description="Empties the slow-query buffer. Staff only.",
+        responses={
+            204: OpenApiResponse(description="Buffer emptied."),
+            401: OpenApiResponse(description="Authentication required."),
+            403: OpenApiResponse(description="Staff only."),
+        },
+    )
+    def delete(self, request):
+        get_ring().clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
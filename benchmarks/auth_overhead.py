@@ -0,0 +1,79 @@
+"""Benchmark: per-request cost of access-token validation.
+
+Compares plain SimpleJWT validation, the blacklist check through the cache
+(one GET per request) and the in-process blacklist mirror. Uses the real
+Redis cache when REDIS_URL is set; otherwise LocMemCache with
+`--simulated-rtt-ms` of sleep added to each cache GET to stand in for the
+network round trip.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.auth_overhead --requests 5000
+"""
+
+import argparse
+import os
+import time
+from unittest.mock import patch
+
+import django
+
+
+def _time_per_call(func, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        func()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--simulated-rtt-ms', type=float, default=0.3)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xBrain.settings')
+    django.setup()
+
+    from django.core.cache import caches
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from api import authentication
+    from api.authentication import BlacklistAwareJWTAuthentication, access_blacklist
+
+    token = AccessToken()
+    token['user_id'] = 1
+    raw = str(token).encode()
+
+    plain = JWTAuthentication()
+    aware = BlacklistAwareJWTAuthentication()
+    access_blacklist.ensure_syncing = lambda: None  # benchmark drives the mode
+
+    backend = caches['default']
+    uses_redis = 'redis' in type(backend).__module__
+    real_get = backend.get
+
+    def cache_get(*a, **kw):
+        if not uses_redis:
+            time.sleep(args.simulated_rtt_ms / 1000)
+        return real_get(*a, **kw)
+
+    print(f'{args.requests} validations, cache: '
+          f'{"Redis" if uses_redis else f"LocMem + {args.simulated_rtt_ms:g} ms simulated RTT"}')
+
+    base = _time_per_call(lambda: plain.get_validated_token(raw), args.requests)
+    print(f'{"JWT validation only":<34} {base:8.1f} µs/request')
+
+    access_blacklist.reset()
+    with patch.object(authentication.cache, 'get', cache_get):
+        via_cache = _time_per_call(lambda: aware.get_validated_token(raw), args.requests)
+    print(f'{"+ blacklist check via cache":<34} {via_cache:8.1f} µs/request  (+{via_cache - base:.1f})')
+
+    access_blacklist.replace([(f'revoked-{i}', time.time() + 3600) for i in range(1000)])
+    access_blacklist._in_sync.set()
+    via_mirror = _time_per_call(lambda: aware.get_validated_token(raw), args.requests)
+    print(f'{"+ blacklist check via mirror":<34} {via_mirror:8.1f} µs/request  (+{via_mirror - base:.1f})')
+    access_blacklist.reset()
+
+
+if __name__ == '__main__':
+    main()
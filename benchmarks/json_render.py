@@ -0,0 +1,65 @@
+"""Benchmark: JSON rendering of `PostListSerializer` feed pages.
+
+Builds an in-memory page (no database) like benchmarks/serializer_urls.py,
+serializes it once, wrapped in the paginated envelope the feed returns, and
+then times DRF's stock `JSONRenderer` against `FastJSONRenderer`
+(api/fast_json.py) on the same data. Checks that both produce the same
+bytes first.
+
+    python -m benchmarks.json_render --pages 500
+"""
+
+import argparse
+import os
+import time
+
+import django
+
+
+def _time_per_page(render, data, pages):
+    start = time.perf_counter()
+    for _ in range(pages):
+        render(data)
+    return (time.perf_counter() - start) / pages * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=500)
+    parser.add_argument('--posts', type=int, default=20)
+    parser.add_argument('--attachments', type=int, default=4)
+    parser.add_argument('--authors', type=int, default=8)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xBrain.settings')
+    django.setup()
+
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.utils.serializer_helpers import ReturnDict
+
+    from api import fast_json
+    from api.serializers import PostListSerializer
+    from benchmarks.serializer_urls import _page
+
+    page = _page(args.posts, args.attachments, args.authors)
+    data = ReturnDict({
+        'next': 'https://api.example.com/api/posts/?cursor=cD0yMDI2LTEwLTE3',
+        'previous': None,
+        'results': PostListSerializer(page, many=True, context={'request': None}).data,
+    }, serializer=None)
+
+    stock = JSONRenderer().render
+    fast = fast_json.FastJSONRenderer().render
+    body = stock(data)
+    assert fast(data) == body, 'renderers disagree'
+    print(f'{args.pages} pages of {args.posts} posts × {args.attachments} attachments '
+          f'({len(body) / 1024:.1f} KiB each), orjson {"present" if fast_json.orjson else "missing"}')
+
+    baseline = _time_per_page(stock, data, args.pages)
+    print(f'{"JSONRenderer (stdlib json)":<28} {baseline:8.3f} ms/page')
+    faster = _time_per_page(fast, data, args.pages)
+    print(f'{"FastJSONRenderer":<28} {faster:8.3f} ms/page  ({baseline / faster:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""Benchmark: in-process latency and throughput of the main API endpoints.
+
+Drives the read and write endpoints through Django's test client — the full
+middleware, authentication, view, serializer and renderer stack, minus the
+network and the WSGI server — against whatever database DATABASE_URL points
+at, typically one filled by `manage.py generate_synthetic_data`. Detail and
+thread requests pick items at random from the `--sample` most recent
+questions and posts, so the response cache sees a realistic mix of hits
+and misses rather than one hot key.
+
+Reports p50 / p95 / p99 latency and single-worker throughput per endpoint.
+`--json` saves the results and `--compare` prints the change against a
+saved run. Writes are rolled back at the end unless `--keep-writes` is
+given, so repeated runs see the same data.
+
+    DATABASE_URL=postgres://... python -m benchmarks.load --requests 500 --json before.json
+    DATABASE_URL=postgres://... python -m benchmarks.load --requests 500 --compare before.json
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import time
+from datetime import datetime, timezone
+
+import django
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentile(sorted_ms, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, min(len(sorted_ms) - 1, math.ceil(fraction * len(sorted_ms)) - 1))
+    return sorted_ms[index]
+
+
+def _summarize(samples, errors, elapsed):
+    samples.sort()
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'p50_ms': round(_percentile(samples, 0.50), 3),
+        'p95_ms': round(_percentile(samples, 0.95), 3),
+        'p99_ms': round(_percentile(samples, 0.99), 3),
+        'mean_ms': round(sum(samples) / len(samples), 3),
+        'rps': round(len(samples) / elapsed, 1),
+    }
+
+
+def _endpoints(ids, spec_id):
+    """`name -> (method, url_name, kwargs(), body())`. Reads first, then
+    writes, so the writes don't skew the read numbers."""
+    q = lambda: {'pk': random.choice(ids['questions'])}
+    p = lambda: {'pk': random.choice(ids['posts'])}
+    specs = [spec_id] if spec_id else []
+    return {
+        'questions list': ('GET', 'questions', dict, None),
+        'questions list (cursor)': ('GET', 'questions', dict, {'paginate': 'cursor'}),
+        'questions search': ('GET', 'questions', dict, {'q': 'cache'}),
+        'question detail': ('GET', 'question-detail', q, None),
+        'question answers': ('GET', 'question-answers', lambda: {'question_id': q()['pk']}, None),
+        'posts list': ('GET', 'posts', dict, None),
+        'posts list (cursor)': ('GET', 'posts', dict, {'paginate': 'cursor'}),
+        'post detail': ('GET', 'post-detail', p, None),
+        'post comments': ('GET', 'post-comments', lambda: {'post_id': p()['pk']}, None),
+        'profile': ('GET', 'user-profile', dict, None),
+        'create question': ('POST', 'questions', dict,
+                            {'content': 'How should I index this query?', 'specializations': specs}),
+        'create answer': ('POST', 'question-answers', lambda: {'question_id': q()['pk']},
+                          {'content': 'Add a composite index.'}),
+        'create post': ('POST', 'posts', dict,
+                        {'content': 'Notes from tuning the feed.', 'specializations': specs}),
+        'create comment': ('POST', 'post-comments', lambda: {'post_id': p()['pk']},
+                           {'content': 'Useful, thanks.'}),
+        'like post': ('POST', 'post-like', p, None),
+    }
+
+
+def _run(client, method, url_name, kwargs, body, requests, warmup):
+    from django.urls import reverse
+
+    samples, errors = [], 0
+    started = None
+    for n in range(warmup + requests):
+        if n == warmup:
+            started = time.perf_counter()
+        url = reverse(f'api:{url_name}', kwargs=kwargs())
+        begin = time.perf_counter()
+        if method == 'GET':
+            response = client.get(url, body or {})
+        else:
+            response = client.post(url, body, content_type='application/json')
+        ms = (time.perf_counter() - begin) * 1e3
+        if n >= warmup:
+            samples.append(ms)
+            errors += response.status_code >= 400
+    return _summarize(samples, errors, time.perf_counter() - started)
+
+
+def _print(results, baseline=None):
+    header = f'{"endpoint":<26} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"req/s":>9} {"errors":>7}'
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        line = (f'{name:<26} {r["p50_ms"]:9.2f} {r["p95_ms"]:9.2f} {r["p99_ms"]:9.2f} '
+                f'{r["rps"]:9.1f} {r["errors"]:7d}')
+        old = (baseline or {}).get(name)
+        if old:
+            change = lambda key: f'{(r[key] - old[key]) / old[key] * 100:+.0f}%' if old[key] else 'n/a'
+            line += f'   p50 {change("p50_ms")}, p99 {change("p99_ms")}, req/s {change("rps")}'
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per endpoint first')
+    parser.add_argument('--sample', type=int, default=1000,
+                        help='Pick detail items from this many of the newest questions / posts')
+    parser.add_argument('--only', action='append', metavar='ENDPOINT',
+                        help='Run only endpoints whose name contains this (repeatable)')
+    parser.add_argument('--read-only', action='store_true', help='Skip the write endpoints')
+    parser.add_argument('--keep-writes', action='store_true', help="Commit the writes instead of rolling back")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='PATH', help='Save the results here')
+    parser.add_argument('--compare', metavar='PATH', help='Compare against results saved with --json')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xBrain.settings')
+    django.setup()
+
+    from django.db import connection, transaction
+    from django.test import Client
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from api.models import Post, Question, Specialization, User
+    from api.response_cache import bump_generation
+
+    random.seed(args.seed)
+    ids = {
+        'questions': list(Question.objects.order_by('-created_at').values_list('pk', flat=True)[:args.sample]),
+        'posts': list(Post.objects.order_by('-created_at').values_list('pk', flat=True)[:args.sample]),
+    }
+    viewer = User.objects.filter(email__startswith='synth').order_by('email').first() or User.objects.first()
+    if not (ids['questions'] and ids['posts'] and viewer):
+        parser.error('the database needs users, questions and posts; run manage.py generate_synthetic_data')
+
+    client = Client()
+    client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(viewer).access_token}'
+    endpoints = _endpoints(ids, Specialization.objects.values_list('pk', flat=True).first())
+    selected = {
+        name: endpoint for name, endpoint in endpoints.items()
+        if (not args.read_only or endpoint[0] == 'GET')
+        and (not args.only or any(term in name for term in args.only))
+    }
+
+    counts = {'users': User.objects.count(), 'questions': Question.objects.count(), 'posts': Post.objects.count()}
+    print(f'{connection.vendor}: {counts["users"]} users, {counts["questions"]} questions, '
+          f'{counts["posts"]} posts; {args.requests} requests per endpoint as {viewer.username}')
+
+    results = {}
+    try:
+        with transaction.atomic():
+            for name, (method, url_name, kwargs, body) in selected.items():
+                results[name] = _run(client, method, url_name, kwargs, body, args.requests, args.warmup)
+            if not args.keep_writes:
+                raise _Rollback
+    except _Rollback:
+        # Cached responses may describe the rolled-back rows.
+        bump_generation()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['endpoints']
+    _print(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'meta': {
+                    'at': datetime.now(timezone.utc).isoformat(),
+                    'python': platform.python_version(),
+                    'database': connection.vendor,
+                    'rows': counts,
+                    'requests': args.requests,
+                    'warmup': args.warmup,
+                },
+                'endpoints': results,
+            }, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
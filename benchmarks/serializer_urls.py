@@ -0,0 +1,136 @@
+"""Benchmark: serializer throughput for a 20-post feed page with Azure URLs.
+
+Serializes `PostListSerializer(many=True)` over an in-memory page (no
+database) whose attachments and avatars live on an `AzureStorage` with
+`expiration_secs` set, so every URL is a SAS signature. Compares:
+
+- per-row `storage.url()` (URL caching disabled, what the serializers used
+  to do);
+- the per-request memo alone (process cache cold on every page);
+- the memo plus a warm process-wide cache (steady state).
+
+Signing is local HMAC work; no Azure account or network is needed.
+
+    python -m benchmarks.serializer_urls --pages 200
+"""
+
+import argparse
+import base64
+import os
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import django
+
+
+class _NoCache:
+    def get(self, key, now=None):
+        return None
+
+    def set(self, key, url, ttl, now=None):
+        pass
+
+    def clear(self):
+        pass
+
+
+def _page(posts, attachments_per_post, authors):
+    from django.contrib.contenttypes.models import ContentType
+
+    from api.models import Attachment, Post, User
+
+    # The generic `attachments` manager looks up Post's content type; seed
+    # ContentType's cache so the page needs no database.
+    ContentType.objects._add_to_cache('default', ContentType(pk=1, app_label='api', model='post'))
+
+    widths = ['320', '640', '1280']
+    people = []
+    for n in range(authors):
+        user = User(username=f'author{n}', profile_image=f'profile_images/author{n}.jpg')
+        user.profile_image_variants = {w: f'profile_images/author{n}.w{w}.webp' for w in widths[:1]}
+        people.append(user)
+
+    page = []
+    for n in range(posts):
+        post = Post(author=people[n % authors], content='x' * 400)
+        files = []
+        for a in range(attachments_per_post):
+            name = f'attachments/2026/10/post{n}_{a}.jpg'
+            files.append(Attachment(
+                object_id=post.pk,
+                file=name,
+                kind='image',
+                mime_type='image/jpeg',
+                size_bytes=1024,
+                original_filename=os.path.basename(name),
+                variants={w: name.replace('.jpg', f'.w{w}.webp') for w in widths},
+            ))
+        post._prefetched_objects_cache = {'specializations': [], 'attachments': files}
+        page.append(post)
+    return page
+
+
+def _time_per_page(serialize, pages):
+    start = time.perf_counter()
+    for _ in range(pages):
+        serialize()
+    return (time.perf_counter() - start) / pages * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--posts', type=int, default=20)
+    parser.add_argument('--attachments', type=int, default=4)
+    parser.add_argument('--authors', type=int, default=8)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'xBrain.settings')
+    django.setup()
+
+    from storages.backends.azure_storage import AzureStorage
+
+    from api import storage_urls
+    from api.models import Attachment, User
+    from api.serializers import PostListSerializer
+
+    azure = AzureStorage(
+        account_name='benchaccount',
+        account_key=base64.b64encode(b'0' * 64).decode(),
+        azure_container='media',
+        expiration_secs=3600,
+    )
+    Attachment._meta.get_field('file').storage = azure
+    User._meta.get_field('profile_image').storage = azure
+
+    page = _page(args.posts, args.attachments, args.authors)
+    signs = args.posts * args.attachments * 4 + args.posts * 2
+    print(f'{args.pages} pages of {args.posts} posts × {args.attachments} attachments '
+          f'({signs} URLs per page, {args.authors} distinct authors)')
+
+    def serialize(request=None):
+        return PostListSerializer(page, many=True, context={'request': request}).data
+
+    with patch.object(storage_urls, 'url_cache', _NoCache()):
+        per_row = _time_per_page(serialize, args.pages)
+    print(f'{"per-row storage.url()":<30} {per_row:8.2f} ms/page')
+
+    def memo_only():
+        storage_urls.url_cache.clear()
+        serialize(SimpleNamespace())
+
+    memo = _time_per_page(memo_only, args.pages)
+    print(f'{"per-request memo, cold cache":<30} {memo:8.2f} ms/page  ({per_row / memo:.1f}x)')
+
+    storage_urls.url_cache.clear()
+    serialize(SimpleNamespace())
+    warm = _time_per_page(lambda: serialize(SimpleNamespace()), args.pages)
+    print(f'{"memo + warm TTL cache":<30} {warm:8.2f} ms/page  ({per_row / warm:.1f}x)')
+
+    urls = {a['url'] for post in serialize(SimpleNamespace()) for a in post['attachments']}
+    assert all('sig=' in url for url in urls), 'expected SAS-signed URLs'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark: per-message SMTP connections vs. the pooled connection.
+
+Runs against a local SMTP stand-in whose `--handshake-ms` delay on each new
+connection approximates TCP + STARTTLS + AUTH to a real provider.
+
+    python -m benchmarks.smtp_pool --messages 200 --handshake-ms 50
+"""
+
+import argparse
+import time
+
+import django
+from django.conf import settings
+
+from benchmarks.smtp_standin import LocalSMTPServer
+
+
+def _configure(port):
+    settings.configure(
+        EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_HOST='127.0.0.1',
+        EMAIL_PORT=port,
+        EMAIL_USE_TLS=False,
+        DEFAULT_FROM_EMAIL='bench@xbrain.local',
+    )
+    django.setup()
+
+
+def _messages(count):
+    from django.core.mail import EmailMessage
+
+    return [
+        EmailMessage(f'Code {i}', f'Your code is {i:06d}', to=[f'user{i}@example.com'])
+        for i in range(count)
+    ]
+
+
+def _run(label, server, func):
+    before = server.connections, server.messages
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    sent = server.messages - before[1]
+    opened = server.connections - before[0]
+    print(f'{label:<32} {elapsed * 1000:9.1f} ms  {sent / elapsed:8.1f} msg/s  {opened:4d} connection(s)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--handshake-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    with LocalSMTPServer(handshake_delay=args.handshake_ms / 1000) as server:
+        _configure(server.port)
+        from django.core.mail import send_mail
+        from api.mail import SMTPConnectionPool
+
+        def one_connection_each():
+            for message in _messages(args.messages):
+                send_mail(message.subject, message.body, None, message.to)
+
+        pool = SMTPConnectionPool(size=2)
+
+        def pooled_one_by_one():
+            for message in _messages(args.messages):
+                pool.send_messages([message])
+
+        def pooled_batch():
+            pool.send_messages(_messages(args.messages))
+
+        print(f'{args.messages} messages, {args.handshake_ms:g} ms simulated handshake')
+        _run('send_mail (connection per msg)', server, one_connection_each)
+        _run('pool, one message per call', server, pooled_one_by_one)
+        _run('pool, one batch', server, pooled_batch)
+        pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
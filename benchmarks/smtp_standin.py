@@ -0,0 +1,94 @@
+"""Minimal local SMTP server for benchmarks and tests.
+
+Speaks just enough SMTP for Django's SMTP email backend (EHLO/HELO, MAIL,
+RCPT, DATA, RSET, NOOP, QUIT) and accepts every message. `handshake_delay`
+is slept before the greeting of each new connection, which stands in for
+the TCP + STARTTLS + AUTH round trips of a real provider."""
+
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.open_sockets.add(self.request)
+        try:
+            time.sleep(server.handshake_delay)
+            self._reply('220 localhost stand-in ready')
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                verb = line.decode(errors='replace').strip().split(' ', 1)[0].upper()
+                if verb == 'EHLO':
+                    self.wfile.write(b'250-localhost\r\n250 8BITMIME\r\n')
+                elif verb in ('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                    self._reply('250 OK')
+                elif verb == 'DATA':
+                    self._reply('354 End data with <CR><LF>.<CR><LF>')
+                    while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                        pass
+                    with server.lock:
+                        server.messages += 1
+                    self._reply('250 OK queued')
+                elif verb == 'QUIT':
+                    self._reply('221 Bye')
+                    return
+                else:
+                    self._reply('502 Command not implemented')
+        except OSError:
+            return
+        finally:
+            with server.lock:
+                server.open_sockets.discard(self.request)
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handshake_delay=0.0):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.handshake_delay = handshake_delay
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.open_sockets = set()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def drop_connections(self):
+        """Close every client socket, like a server timing out idle sessions."""
+        with self.lock:
+            sockets = list(self.open_sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(2)
+            except OSError:
+                pass
+
+    def stop(self):
+        self.drop_connections()
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
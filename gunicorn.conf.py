@@ -1,6 +1,9 @@
 # Gunicorn configuration file
 # This file is auto-detected by gunicorn regardless of how it's started
 
+import os
+import tempfile
+
 timeout = 180
 # Multi-worker concurrency. Safe because shared state (OTPs, login lockout
 # counters, password reset tokens, pending registrations) lives in Redis,
@@ -8,3 +11,25 @@ timeout = 180
 workers = 2
 threads = 2
 bind = "0.0.0.0:10000"
+
+# Each worker keeps its metrics (api/metrics.py) in a file here, so /metrics
+# reports every worker whichever one serves the scrape.
+os.environ.setdefault("METRICS_MULTIPROCESS_DIR", os.path.join(tempfile.gettempdir(), "xbrain-metrics"))
+
+
+def on_starting(server):
+    from api.metrics import clear_multiprocess_dir
+
+    clear_multiprocess_dir(os.environ["METRICS_MULTIPROCESS_DIR"])
+
+
+def post_worker_init(worker):
+    from api.metrics import WORKER_THREADS
+
+    WORKER_THREADS.set(worker.cfg.threads)
+
+
+def child_exit(server, worker):
+    from api.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid, os.environ["METRICS_MULTIPROCESS_DIR"])
@@ -2,5 +2,10 @@ python manage.py migrate --noinput
 python manage.py collectstatic --noinput
 python manage.py seed_specializations 2>/dev/null || true
 
+# Background job worker (outgoing email); needs the Redis-backed queue.
+if [ -n "$REDIS_URL" ]; then
+    python manage.py run_jobs &
+fi
+
 gunicorn xBrain.wsgi --bind=0.0.0.0:8000 --workers=1 --timeout=120 --capture-output --log-level info --error-logfile -
  
\ No newline at end of file
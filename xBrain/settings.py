@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.instrumentation.RequestInstrumentationMiddleware",  # first, so it times the whole stack
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # Add Whitenoise for static files
     "corsheaders.middleware.CorsMiddleware",
@@ -124,6 +126,17 @@ else:
         }
     }
 
+# Background job queue (outgoing email, image thumbnails). With Redis, jobs go on a Redis list
+# drained by `python manage.py run_jobs`. Without it, an in-process queue is
+# drained by a daemon thread in each web worker (local dev only).
+JOB_QUEUE = {
+    'BACKEND': 'api.jobs.RedisJobQueue' if REDIS_URL else 'api.jobs.InProcessJobQueue',
+    'OPTIONS': {
+        'max_attempts': 5,
+        'backoff': 30,  # seconds before the first retry, doubled each attempt
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -187,6 +200,59 @@ if USE_AZURE_STORAGE:
     AZURE_ACCOUNT_KEY = config('AZURE_ACCOUNT_KEY')
     AZURE_CONTAINER = config('AZURE_CONTAINER', default='media')
 
+# Attachments of one parent upload concurrently on a process-wide pool of
+# this many threads (api/uploads.py).
+ATTACHMENT_UPLOAD_WORKERS = config('ATTACHMENT_UPLOAD_WORKERS', default=4, cast=int)
+
+# Image attachments and profile images get WebP thumbnails at these widths,
+# written next to the original by a background job (api/thumbnails.py).
+IMAGE_VARIANT_WIDTHS = [320, 640, 1280]
+IMAGE_VARIANT_QUALITY = 80
+
+# Serializers resolve file URLs through api/storage_urls.py: memoized per
+# request and cached per process, signed (SAS) URLs for half their lifetime.
+STORAGE_URL_CACHE_SIZE = 10000
+STORAGE_URL_CACHE_TTL = 3600
+
+# Anonymous-shared bodies of the question/post feeds and detail pages are
+# cached this long at most; writes retire them sooner (api/response_cache.py).
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Per-request query / timing / cache instrumentation (api/instrumentation.py):
+# the share of requests measured, and whether the numbers are sent back in a
+# Server-Timing header (which tells clients how many queries a view runs).
+INSTRUMENTATION_SAMPLE_RATE = config('INSTRUMENTATION_SAMPLE_RATE', default=1.0 if DEBUG else 0.1, cast=float)
+INSTRUMENTATION_SERVER_TIMING = config('INSTRUMENTATION_SERVER_TIMING', default=DEBUG, cast=bool)
+
+# Prometheus-style metrics served at /metrics (api/metrics.py). Set
+# METRICS_MULTIPROCESS_DIR under gunicorn so every worker's numbers are
+# aggregated; outside DEBUG the endpoint needs `Bearer <METRICS_TOKEN>`.
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_MULTIPROCESS_DIR = config('METRICS_MULTIPROCESS_DIR', default=None)
+METRICS_TOKEN = config('METRICS_TOKEN', default=None)
+
+# Slow-query capture (api/slow_queries.py): statements taking this long or
+# longer during a request are kept in a ring buffer of the newest
+# SLOW_QUERY_LOG_SIZE, and the first of each shape is re-run under EXPLAIN
+# (ANALYZE, BUFFERS), with a statement_timeout of twice the captured
+# duration (at least 1 s). A negative threshold turns capture off.
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=200, cast=float)
+SLOW_QUERY_LOG_SIZE = config('SLOW_QUERY_LOG_SIZE', default=200, cast=int)
+SLOW_QUERY_EXPLAIN = config('SLOW_QUERY_EXPLAIN', default=True, cast=bool)
+
+# Upload sessions (api/upload_sessions.py): with Azure the client PUTs large
+# attachments straight to Blob Storage with a SAS URL; locally they arrive in
+# chunks through /api/uploads/{id}/. Unused sessions expire after `expiry`
+# seconds and are removed by `manage.py purge_upload_sessions`.
+UPLOAD_SESSIONS = {
+    'BACKEND': (
+        'api.upload_sessions.AzureUploadBackend'
+        if USE_AZURE_STORAGE
+        else 'api.upload_sessions.LocalUploadBackend'
+    ),
+    'OPTIONS': {'expiry': 3600},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -196,8 +262,11 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         # Wraps SimpleJWT's auth with a Redis-backed access-token blacklist
-        # so logout takes effect immediately (not just at access-token expiry).
-        'api.authentication.BlacklistAwareJWTAuthentication',
+        # so logout takes effect immediately (not just at access-token expiry),
+        # and builds request.user from the token's claims so authenticating
+        # costs no DB query. Use BlacklistAwareJWTAuthentication to load the
+        # full User on every request instead.
+        'api.authentication.StatelessJWTAuthentication',
     ],
     
     'DEFAULT_PERMISSION_CLASSES': [
@@ -212,8 +281,17 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     
+    # orjson-backed JSON with the same output as DRF's JSONRenderer/JSONParser;
+    # both fall back to the stock classes when orjson isn't installed
+    # (see api/fast_json.py).
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.fast_json.FastJSONRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.fast_json.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
@@ -232,6 +310,8 @@ SPECTACULAR_SETTINGS = {
         {'name': 'Specializations', 'description': 'Predefined areas of expertise.'},
         {'name': 'Q&A', 'description': 'Questions, answers, and replies.'},
         {'name': 'Posts', 'description': 'Knowledge-sharing posts with likes, dislikes, and (later) comments.'},
+        {'name': 'Uploads', 'description': 'Upload large attachments ahead of the Question / Answer / Post that uses them.'},
+        {'name': 'Admin', 'description': 'Staff-only diagnostics.'},
     ],
 }
 
@@ -260,6 +340,10 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# How long StatelessJWTAuthentication may serve a cached User row (seconds).
+# Saving or deleting the user drops it immediately.
+AUTH_USER_CACHE_TIMEOUT = 60
+
 
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
@@ -307,6 +391,14 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='xBrain <noreply@xbrain.com>')
 
+# Job-queue email goes through a pool of persistent SMTP connections
+# (api/mail.py) instead of one TLS handshake + login per message.
+EMAIL_POOL = {
+    'size': config('EMAIL_POOL_SIZE', default=2, cast=int),
+    'idle_timeout': 60,        # close connections idle longer than this (s)
+    'health_check_after': 5,   # NOOP-probe connections idle longer than this (s)
+}
+
 
 # OTP Settings
 OTP_LENGTH = config('OTP_LENGTH', default=6, cast=int)
@@ -5,6 +5,8 @@ from django.views.static import serve
 from django.http import JsonResponse
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from api.metrics import metrics_view
+
 
 def api_root(request):
     return JsonResponse({
@@ -25,6 +27,7 @@ urlpatterns = [
     path("", api_root),  # Root URL - API info
     path("admin/", admin.site.urls),
     path("api/", include('api.urls')),
+    path("metrics", metrics_view, name="metrics"),
     
     # Swagger Documentation
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),